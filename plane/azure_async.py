@@ -0,0 +1,150 @@
+import asyncio
+import atexit
+import os
+import threading
+import time
+from typing import List, Optional
+
+try:
+    import aiohttp
+except ImportError:  # the async backend is optional; plane.ocr falls back to the SDK client
+    aiohttp = None
+
+# Azure Computer Vision Read API (v3.2) over one shared aiohttp session. Submissions run
+# concurrently up to `max_in_flight` operations (submitted but not finished), and results
+# are polled with exponential backoff instead of a fixed sleep.
+READ_PATH = "/vision/v3.2/read/analyze"
+MAX_IN_FLIGHT = int(os.environ.get("PLANE_AZURE_IN_FLIGHT", "8"))
+
+
+class AsyncAzureReader:
+    def __init__(self, endpoint: Optional[str] = None, key: Optional[str] = None,
+                 max_in_flight: int = MAX_IN_FLIGHT, poll_initial: float = 0.05, poll_max: float = 1.0,
+                 timeout: float = 30.0):
+        if aiohttp is None:
+            raise RuntimeError("Async Azure OCR requires aiohttp. Install aiohttp.")
+        self.endpoint = (endpoint or os.environ.get("AZURE_CV_ENDPOINT") or "").rstrip("/")
+        self.key = key or os.environ.get("AZURE_CV_KEY")
+        if not self.endpoint or not self.key:
+            raise RuntimeError("Azure OCR requires AZURE_CV_ENDPOINT and AZURE_CV_KEY.")
+        self.max_in_flight = max_in_flight
+        self.poll_initial = poll_initial
+        self.poll_max = poll_max
+        self.timeout = timeout
+        self._sem = None
+        self._session = None
+
+    async def open(self) -> "AsyncAzureReader":
+        if self._session is None:
+            self._sem = asyncio.Semaphore(self.max_in_flight)
+            self._session = aiohttp.ClientSession(
+                headers={"Ocp-Apim-Subscription-Key": self.key},
+                connector=aiohttp.TCPConnector(limit=self.max_in_flight * 2))
+        return self
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _submit(self, data: bytes, deadline: float) -> Optional[str]:
+        delay = self.poll_initial
+        while True:
+            async with self._session.post(self.endpoint + READ_PATH, data=data,
+                                          headers={"Content-Type": "application/octet-stream"}) as r:
+                if r.status == 429 and time.monotonic() < deadline:
+                    # Throttled: honour Retry-After, else back off
+                    await asyncio.sleep(float(r.headers.get("Retry-After", delay)))
+                    delay = min(delay * 2, self.poll_max)
+                    continue
+                r.raise_for_status()
+                return r.headers.get("Operation-Location")
+
+    async def read_text(self, data: bytes) -> str:
+        """Submit one image and return its recognized lines joined by newlines.
+
+        Returns "" on timeout, a failed operation, or an HTTP/connection error.
+        """
+        await self.open()
+        async with self._sem:
+            try:
+                return await self._read(data, time.monotonic() + self.timeout)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                return ""
+
+    async def _read(self, data: bytes, deadline: float) -> str:
+        location = await self._submit(data, deadline)
+        if not location:
+            return ""
+        delay = self.poll_initial
+        while time.monotonic() < deadline:
+            await asyncio.sleep(delay)
+            async with self._session.get(location) as r:
+                if r.status == 429:
+                    delay = min(delay * 2, self.poll_max)
+                    continue
+                r.raise_for_status()
+                body = await r.json()
+            status = body.get("status")
+            if status == "succeeded":
+                lines = []
+                for rr in body.get("analyzeResult", {}).get("readResults", []):
+                    for l in rr.get("lines", []):
+                        lines.append(l.get("text", ""))
+                return "\n".join(lines)
+            if status not in ("notStarted", "running"):
+                return ""
+            delay = min(delay * 1.5, self.poll_max)
+        return ""
+
+    async def read_many(self, images: List[bytes]) -> List[str]:
+        await self.open()
+        return list(await asyncio.gather(*(self.read_text(d) for d in images)))
+
+
+class AzureOCRWorker:
+    """Synchronous facade: one reader and session living on a background event loop.
+
+    submit() is thread-safe and returns a concurrent.futures.Future, so thread pools and
+    the Tk GUI can share a single open session.
+    """
+
+    def __init__(self, endpoint: Optional[str] = None, key: Optional[str] = None, **kwargs):
+        self.reader = AsyncAzureReader(endpoint, key, **kwargs)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="azure-ocr", daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.reader.open(), self._loop).result()
+
+    def submit(self, data: bytes):
+        return asyncio.run_coroutine_threadsafe(self.reader.read_text(data), self._loop)
+
+    def read_text(self, data: bytes) -> str:
+        return self.submit(data).result()
+
+    def close(self) -> None:
+        asyncio.run_coroutine_threadsafe(self.reader.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+_workers = {}
+_workers_lock = threading.Lock()
+
+
+def get_worker(endpoint: Optional[str] = None, key: Optional[str] = None) -> AzureOCRWorker:
+    """Process-wide worker per (endpoint, key), created on first use."""
+    ep = endpoint or os.environ.get("AZURE_CV_ENDPOINT")
+    k = key or os.environ.get("AZURE_CV_KEY")
+    with _workers_lock:
+        w = _workers.get((ep, k))
+        if w is None:
+            w = _workers[(ep, k)] = AzureOCRWorker(ep, k)
+            atexit.register(w.close)
+        return w
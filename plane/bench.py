@@ -0,0 +1,333 @@
+import gc
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+# Benchmarks for the hot paths on synthetic data: each stage is timed `repeat` times (best and
+# median wall time) and then run once more under tracemalloc for its peak allocation, which
+# numpy reports too. Results are plain JSON so runs can be saved as baselines and compared.
+SCALES = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+DEFAULT_SCALES = (1_000, 10_000, 100_000, 1_000_000)
+REPEAT = 3
+# A stage is flagged when its best time or peak memory grows by more than this factor
+THRESHOLD = 1.25
+# Times and peaks this small are dominated by noise and never flagged
+MIN_SECONDS = 1e-3
+MIN_PEAK_MB = 1.0
+# Light commands must start within this budget without importing any HEAVY_MODULES
+STARTUP_BUDGET_MS = 100.0
+HEAVY_MODULES = ("numpy", "pandas", "scipy", "matplotlib", "PIL")
+STARTUP_COMMANDS = {
+    "pf": ["pf", "--server", "bench-server-seed", "--client", "bench-client-seed", "--rounds", "1"],
+    "add": ["add", "--out", "{tmp}/add.csv", "--values", "1.5", "2.25", "--session", "bench"],
+    "merge": ["merge", "--inputs", "{tmp}/add.csv", "{tmp}/add.csv", "--out", "{tmp}/merged.csv"],
+}
+# Screenshots hold a grid of SHOT_ROWS x SHOT_COLS multipliers
+SHOT_ROWS = 10
+SHOT_COLS = 5
+
+
+def crash_multipliers(n: int, seed: int = 0, house_edge: float = 0.99, decimals: Optional[int] = 2) -> np.ndarray:
+    """Crash-distributed multipliers max(1, edge / (1 - U)), floored to `decimals` places as games show them."""
+    u = np.random.default_rng(seed).random(n)
+    x = np.maximum(house_edge / (1.0 - u), 1.0)
+    if decimals is not None:
+        scale = 10.0 ** decimals
+        x = np.maximum(np.floor(x * scale) / scale, 1.0)
+    return x
+
+
+def write_dataset(path: str, x: np.ndarray, sessions: int = 4) -> str:
+    """Write multipliers with `sessions` equal-sized session ids to CSV or .npy (structured)."""
+    sid = np.repeat(np.arange(sessions), -(-x.size // sessions))[:x.size]
+    if path.lower().endswith(".npy"):
+        rec = np.empty(x.size, dtype=[("session_id", "<i8"), ("multiplier", "<f8")])
+        rec["session_id"], rec["multiplier"] = sid, x
+        np.save(path, rec)
+    else:
+        import pandas as pd
+        pd.DataFrame({"session_id": sid, "multiplier": x}).to_csv(path, index=False, float_format="%.2f")
+    return path
+
+
+def render_screenshot(values, cols: int = SHOT_COLS, font_size: int = 28, dark: bool = True) -> Image.Image:
+    """Render multipliers as a grid of "1.23x" labels, like a game's round history."""
+    font = ImageFont.load_default(size=font_size)
+    rows = -(-len(values) // cols)
+    cell_w, cell_h = font_size * 5, int(font_size * 1.8)
+    bg, fg = ((24, 24, 32), (235, 235, 235)) if dark else ((255, 255, 255), (0, 0, 0))
+    img = Image.new("RGB", (cols * cell_w + 20, rows * cell_h + 20), bg)
+    draw = ImageDraw.Draw(img)
+    for i, v in enumerate(values):
+        r, c = divmod(i, cols)
+        draw.text((10 + c * cell_w, 10 + r * cell_h), f"{v:.2f}x", fill=fg, font=font)
+    return img
+
+
+# Stages: setup(n, seed, tmp) -> context, run(context). Setup is not timed.
+
+def _setup_values(n, seed, tmp):
+    return crash_multipliers(n, seed)
+
+
+def _setup_csv(n, seed, tmp):
+    return write_dataset(os.path.join(tmp, f"bench-{n}.csv"), crash_multipliers(n, seed))
+
+
+def _setup_npy(n, seed, tmp):
+    return write_dataset(os.path.join(tmp, f"bench-{n}.npy"), crash_multipliers(n, seed))
+
+
+def _setup_shots(n, seed, tmp):
+    # n multipliers spread over screenshots of SHOT_ROWS x SHOT_COLS
+    x = crash_multipliers(n, seed)
+    per = SHOT_ROWS * SHOT_COLS
+    return [render_screenshot(x[i:i + per]) for i in range(0, n, per)]
+
+
+def _run_load(path):
+    from .data import load_sessions
+    return load_sessions(path, multiplier_col="multiplier", session_col="session_id")
+
+
+def _run_survival(x):
+    from .survival import empirical_survival
+    return empirical_survival(x)
+
+
+def _run_fit(x):
+    from .fit import fit_models
+    return fit_models(x)
+
+
+def _run_pf(n):
+    from .fair import sequence_array
+    return sequence_array("bench-server-seed", "bench-client-seed", 0, n, workers=1)
+
+
+def _run_ocr(images):
+    from .ocr import _preprocess, _segment_lines
+    return sum(len(_segment_lines(_preprocess(img, invert=True), columns=True)) for img in images)
+
+
+STAGES = {
+    "load_csv": {"setup": _setup_csv, "run": _run_load, "max_n": SCALES[-1]},
+    "load_npy": {"setup": _setup_npy, "run": _run_load, "max_n": SCALES[-1]},
+    "survival": {"setup": _setup_values, "run": _run_survival, "max_n": SCALES[-1]},
+    "fit": {"setup": _setup_values, "run": _run_fit, "max_n": SCALES[-1]},
+    "pf": {"setup": lambda n, seed, tmp: n, "run": _run_pf, "max_n": SCALES[-1]},
+    # n is the number of rendered multipliers (SHOT_ROWS * SHOT_COLS per screenshot)
+    "ocr_segment": {"setup": _setup_shots, "run": _run_ocr, "max_n": 10_000},
+}
+
+
+def _measure(run, ctx, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        run(ctx)
+        times.append(time.perf_counter() - t0)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run(ctx)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds_min": min(times), "seconds_median": float(np.median(times)), "peak_mb": peak / 2 ** 20}
+
+
+def run_benchmarks(stages=None, scales=DEFAULT_SCALES, repeat: int = REPEAT, seed: int = 0,
+                   progress=None) -> dict:
+    """Time every stage at every scale up to the stage's max_n; returns {"meta", "results"}."""
+    names = list(stages or STAGES)
+    for name in names:
+        if name not in STAGES:
+            raise ValueError(f"Unknown stage {name!r}; choose from {', '.join(STAGES)}")
+    results = []
+    tmp = tempfile.mkdtemp(prefix="plane-bench-")
+    try:
+        for name in names:
+            st = STAGES[name]
+            for n in sorted(int(s) for s in scales):
+                if n > st["max_n"]:
+                    continue
+                ctx = st["setup"](n, seed, tmp)
+                row = {"stage": name, "n": n, **_measure(st["run"], ctx, repeat)}
+                row["items_per_s"] = n / row["seconds_min"] if row["seconds_min"] > 0 else float("inf")
+                results.append(row)
+                del ctx
+                if progress:
+                    progress(row)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    meta = {"date": datetime.now(timezone.utc).isoformat(timespec="seconds"), "python": platform.python_version(),
+            "numpy": np.__version__, "platform": platform.platform(), "cpus": os.cpu_count(),
+            "repeat": repeat, "seed": seed, "scales": sorted(int(s) for s in scales)}
+    return {"meta": meta, "results": results}
+
+
+_STARTUP_PROBE = """
+import json, sys
+from plane.cli import main
+main(sys.argv[1:])
+print(json.dumps([m for m in %r if m in sys.modules]))
+""" % (HEAVY_MODULES,)
+
+
+def check_startup(commands=None, repeat: int = 5, budget_ms: float = STARTUP_BUDGET_MS) -> List[dict]:
+    """Run light CLI commands in fresh interpreters: best wall time and heavy modules they imported.
+
+    A row's "ok" is False when the command is over budget_ms or imported a HEAVY_MODULES entry.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")])))
+    rows = []
+    tmp = tempfile.mkdtemp(prefix="plane-startup-")
+    try:
+        for name in commands or STARTUP_COMMANDS:
+            argv = [a.replace("{tmp}", tmp) for a in STARTUP_COMMANDS[name]]
+            times, heavy = [], []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                out = subprocess.run([sys.executable, "-c", _STARTUP_PROBE, *argv], env=env, cwd=tmp,
+                                     capture_output=True, text=True, check=True).stdout
+                times.append(time.perf_counter() - t0)
+                heavy = json.loads(out.strip().splitlines()[-1])
+            ms = 1000 * min(times)
+            rows.append({"command": name, "ms": ms, "heavy": heavy, "budget_ms": budget_ms,
+                         "ok": ms <= budget_ms and not heavy})
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return rows
+
+
+def format_startup(rows: List[dict]) -> str:
+    lines = [f"{'command':<8} {'ms':>8}  heavy imports"]
+    for r in rows:
+        flag = "" if r["ok"] else "  FAIL"
+        lines.append(f"{r['command']:<8} {r['ms']:>8.1f}  {', '.join(r['heavy']) or '-'}{flag}")
+    return "\n".join(lines)
+
+
+def _stress_worker(args):
+    from .writer import append, metrics
+    path, wid, appends, per, fsync = args
+    lat = []
+    for i in range(appends):
+        # Values encode (worker, append, position) so lost or repeated rows can be found
+        vals = [1 + (i * per + j + 1) / 1e6 for j in range(per)]
+        t0 = time.perf_counter()
+        append(path, vals, session_id=f"w{wid}", fsync=fsync)
+        lat.append(time.perf_counter() - t0)
+    return lat, metrics()
+
+
+def stress_writers(writers: int = 8, appends: int = 100, per: int = 5, fmt: str = "csv",
+                   fsync: bool = True, path: Optional[str] = None) -> dict:
+    """Append from `writers` processes at once, then check that every row landed exactly once.
+
+    Returns counts ("expected", "rows", "lost", "duplicated"), wall time, throughput, the
+    append latency percentiles in ms and how many group commits carried the appends.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from .data import load_sessions
+    tmp = None
+    if path is None:
+        tmp = tempfile.mkdtemp(prefix="plane-stress-")
+        path = os.path.join(tmp, f"stress.{fmt}")
+    try:
+        t0 = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=writers) as ex:
+            parts = list(ex.map(_stress_worker, [(path, w, appends, per, fsync) for w in range(writers)]))
+        wall = time.perf_counter() - t0
+        df = load_sessions(path, multiplier_col="multiplier", session_col="session_id")
+        expected = {(f"w{w}", k) for w in range(writers) for k in range(1, appends * per + 1)}
+        got = list(zip(df["session_id"].astype(str), np.rint((df["multiplier"].to_numpy() - 1) * 1e6).astype(int)))
+        seen = set(got)
+        lat = np.sort(np.concatenate([p[0] for p in parts])) * 1000
+        commits = sum(p[1]["commits"] for p in parts)
+        n = writers * appends * per
+        return {"writers": writers, "appends": writers * appends, "expected": n, "rows": len(got),
+                "lost": len(expected - seen), "duplicated": len(got) - len(seen), "format": fmt, "fsync": fsync,
+                "seconds": wall, "rows_per_s": n / wall, "appends_per_s": writers * appends / wall,
+                "commits": commits, "appends_per_commit": writers * appends / commits if commits else None,
+                "latency_p50_ms": float(np.percentile(lat, 50)), "latency_p99_ms": float(np.percentile(lat, 99)),
+                "latency_max_ms": float(lat[-1])}
+    finally:
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+def format_stress(r: dict) -> str:
+    ok = "OK" if r["lost"] == 0 and r["duplicated"] == 0 and r["rows"] == r["expected"] else "FAIL"
+    return "\n".join([
+        f"{r['writers']} writers, {r['appends']} appends to {r['format']}{'' if r['fsync'] else ' (no fsync)'}: "
+        f"{r['rows']}/{r['expected']} rows, {r['lost']} lost, {r['duplicated']} duplicated  {ok}",
+        f"{r['seconds']:.2f} s, {r['appends_per_s']:.0f} appends/s, {r['rows_per_s']:.0f} rows/s; "
+        f"{r['commits']} group commits ({r['appends_per_commit']:.1f} appends each)",
+        f"append latency p50 {r['latency_p50_ms']:.1f} ms, p99 {r['latency_p99_ms']:.1f} ms, "
+        f"max {r['latency_max_ms']:.1f} ms",
+    ])
+
+
+def save_results(path: str, res: dict) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(res, f, indent=1)
+
+
+def load_results(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(res: dict, baseline: dict, threshold: float = THRESHOLD) -> List[dict]:
+    """Per (stage, n) in both runs: time and memory ratios against the baseline and a status.
+
+    status is "regression" when the best time or the peak memory grew by more than
+    `threshold`, "improvement" when the time shrank by the same factor, else "ok".
+    """
+    base: Dict[tuple, dict] = {(r["stage"], r["n"]): r for r in baseline["results"]}
+    rows = []
+    for r in res["results"]:
+        b = base.get((r["stage"], r["n"]))
+        if b is None:
+            continue
+        t = r["seconds_min"] / b["seconds_min"] if b["seconds_min"] > 0 else float("inf")
+        m = r["peak_mb"] / b["peak_mb"] if b["peak_mb"] > 0 else 1.0
+        noisy = max(r["seconds_min"], b["seconds_min"]) < MIN_SECONDS
+        grew = (not noisy and t > threshold) or (max(r["peak_mb"], b["peak_mb"]) >= MIN_PEAK_MB and m > threshold)
+        if grew:
+            status = "regression"
+        elif not noisy and t < 1 / threshold:
+            status = "improvement"
+        else:
+            status = "ok"
+        rows.append({"stage": r["stage"], "n": r["n"], "time_ratio": t, "mem_ratio": m, "status": status})
+    return rows
+
+
+def format_results(res: dict, comparison: Optional[List[dict]] = None) -> str:
+    cmp = {(c["stage"], c["n"]): c for c in comparison or []}
+    lines = [f"{'stage':<12} {'n':>10} {'best s':>10} {'median s':>10} {'peak MB':>9} {'items/s':>12}"
+             + ("  vs baseline" if cmp else "")]
+    for r in res["results"]:
+        line = (f"{r['stage']:<12} {r['n']:>10} {r['seconds_min']:>10.4f} {r['seconds_median']:>10.4f} "
+                f"{r['peak_mb']:>9.1f} {r['items_per_s']:>12.3g}")
+        c = cmp.get((r["stage"], r["n"]))
+        if c:
+            line += f"  x{c['time_ratio']:.2f} time, x{c['mem_ratio']:.2f} mem  {c['status']}"
+        lines.append(line)
+    return "\n".join(lines)
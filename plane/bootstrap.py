@@ -0,0 +1,144 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Sequence
+
+import numpy as np
+
+from .fit import exponential_survival, pareto_survival, trunc_exp_survival
+
+# Nonparametric bootstrap for the closed-form fits. Each replicate only needs
+# (sum(x-1), sum(log x), 0.99 quantile, #x>=q), so resamples are drawn as whole batches
+# and the MLEs are computed column-wise. With heavy ties (multipliers are usually
+# rounded to 0.01) a replicate is drawn as multinomial counts over the unique values,
+# which is the same distribution as resampling indices at O(unique) instead of O(n).
+# Other registered models need iterative refits and are not bootstrapped. The AIC ranking
+# is among RANKED_MODELS only: the truncated mixture's pseudo log-likelihood isn't
+# comparable, as in best_model_by_aic.
+JOB_REPS = 128
+BATCH_BYTES = 64 * 1024 * 1024
+TAIL_Q = 0.99
+MODEL_NAMES = ("exponential_shift1", "pareto_xm1", "truncated_exponential_mixture")
+RANKED_MODELS = ("exponential_shift1", "pareto_xm1")
+
+_DATA = {}
+
+
+def _init_worker(data):
+    _DATA.clear()
+    _DATA.update(data)
+
+
+def _order_stat(cum, k, values):
+    # Value of the k-th (0-based) order statistic per row from cumulative counts
+    return values[(cum <= k).sum(axis=1)]
+
+
+def _batch_counts(rng, b):
+    xu, counts, n = _DATA["xu"], _DATA["counts"], _DATA["n"]
+    C = rng.multinomial(n, counts / n, size=b)
+    sum_y = C @ (xu - 1.0)
+    sum_log = C @ np.log(xu)
+    cum = np.cumsum(C, axis=1)
+    if n > 50:
+        h = (n - 1) * TAIL_Q
+        k = int(np.floor(h))
+        lo = _order_stat(cum, k, xu)
+        hi = _order_stat(cum, min(k + 1, n - 1), xu)
+        q = lo + (h - k) * (hi - lo)
+    else:
+        # Small samples use the max: the last value with a nonzero count
+        q = xu[xu.size - 1 - np.argmax(C[:, ::-1] > 0, axis=1)]
+    ge = (C * (xu[None, :] >= q[:, None])).sum(axis=1)
+    return sum_y, sum_log, q, ge
+
+
+def _batch_index(rng, b):
+    x, n = _DATA["x"], _DATA["n"]
+    z = x[rng.integers(0, n, size=(b, n))]
+    sum_y = (z - 1.0).sum(axis=1)
+    sum_log = np.log(z).sum(axis=1)
+    q = np.quantile(z, TAIL_Q, axis=1) if n > 50 else z.max(axis=1)
+    ge = (z >= q[:, None]).sum(axis=1)
+    return sum_y, sum_log, q, ge
+
+
+def _run_job(args):
+    seed, reps = args
+    rng = np.random.default_rng(seed)
+    width = _DATA["xu"].size if _DATA["use_counts"] else _DATA["n"]
+    batch = max(1, min(reps, BATCH_BYTES // (8 * max(width, 1))))
+    draw = _batch_counts if _DATA["use_counts"] else _batch_index
+    parts = []
+    for lo in range(0, reps, batch):
+        parts.append(draw(rng, min(batch, reps - lo)))
+    return tuple(np.concatenate(cols) for cols in zip(*parts))
+
+
+def _replicate_fits(n, sum_y, sum_log, q, ge):
+    lam = 1.0 / (sum_y / n + 1e-12)
+    alpha = n / sum_log
+    p = ge / n * 0.5
+    ll_exp = n * np.log(lam) - lam * sum_y
+    ll_par = n * np.log(alpha) - (alpha + 1) * sum_log
+    params = {
+        "exponential_shift1": {"lambda": lam},
+        "pareto_xm1": {"alpha": alpha},
+        "truncated_exponential_mixture": {"lambda": lam, "p": p, "q": q},
+    }
+    aic = np.stack([2*1 - 2*ll_exp, 2*1 - 2*ll_par], axis=1)
+    return params, aic
+
+
+def _survival(name, t, pr):
+    t = np.asarray(t, dtype=float)[None, :]
+    if name == "exponential_shift1":
+        return exponential_survival(t, pr["lambda"][:, None])
+    if name == "pareto_xm1":
+        return pareto_survival(t, pr["alpha"][:, None])
+    return trunc_exp_survival(t, pr["lambda"][:, None], pr["p"][:, None], pr["q"][:, None])
+
+
+def bootstrap_fits(x, reps: int = 1000, seed: int = 0, workers: Optional[int] = None,
+                   thresholds: Optional[Sequence[float]] = None, ci: float = 0.95) -> dict:
+    """Percentile bootstrap CIs for MODEL_NAMES' params and P(X>=x), and how often each of
+    RANKED_MODELS wins on AIC (aic_best_freq; None for the others).
+
+    Replicates are split into fixed-size jobs seeded from one SeedSequence, so results
+    depend on `seed` and `reps` only, not on the number of workers.
+    """
+    x = np.asarray(x, dtype=float)
+    x = x[~np.isnan(x)]
+    x = x[x >= 1]
+    n = x.size
+    xu, counts = np.unique(x, return_counts=True)
+    data = {"x": x, "xu": xu, "counts": counts, "n": n, "use_counts": xu.size * 4 <= n}
+    if data["use_counts"]:
+        data["x"] = None
+
+    sizes = [min(JOB_REPS, reps - lo) for lo in range(0, reps, JOB_REPS)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = list(zip(seeds, sizes))
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data,)) as ex:
+            parts = list(ex.map(_run_job, jobs))
+    else:
+        _init_worker(data)
+        parts = [_run_job(j) for j in jobs]
+    sum_y, sum_log, q, ge = (np.concatenate(cols) for cols in zip(*parts))
+    params, aic = _replicate_fits(n, sum_y, sum_log, q, ge)
+
+    a = (1.0 - ci) / 2.0 * 100.0
+    pct = [a, 100.0 - a]
+    wins = np.bincount(np.argmin(aic, axis=1), minlength=len(RANKED_MODELS)) / reps
+    thresholds = [] if thresholds is None else list(thresholds)
+    models = {}
+    for name in MODEL_NAMES:
+        pr = params[name]
+        m = {"params": {k: tuple(np.percentile(v, pct).tolist()) for k, v in pr.items()},
+             "aic_best_freq": float(wins[RANKED_MODELS.index(name)]) if name in RANKED_MODELS else None}
+        if thresholds:
+            lo, hi = np.percentile(_survival(name, thresholds, pr), pct, axis=0)
+            m["prob"] = list(zip(lo.tolist(), hi.tolist()))
+        models[name] = m
+    return {"reps": reps, "ci": ci, "seed": seed, "n": n, "thresholds": thresholds, "models": models}
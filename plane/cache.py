@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+from typing import List, Optional
+
+from .fit import make_fit
+from .store import is_store, MANIFEST
+
+# On-disk cache of fitted models keyed by dataset content and fit options. Entries hold only
+# names, params, ll and AIC; the survival/rng callables are rebuilt with plane.fit.make_fit.
+CACHE_VERSION = 1
+MAX_ENTRIES = 512
+MAX_BYTES = 8 * 1024 * 1024
+_HASH_INDEX = "hashes.json"
+
+
+def cache_dir() -> str:
+    return os.environ.get("PLANE_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "plane", "fits")
+
+
+def _hash_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def content_hash(path: str) -> str:
+    """sha256 of the dataset, reusing the last digest while (size, mtime) are unchanged."""
+    target = os.path.join(path, MANIFEST) if is_store(path) else path
+    st = os.stat(target)
+    stamp = [st.st_size, st.st_mtime_ns]
+    root = cache_dir()
+    index_path = os.path.join(root, _HASH_INDEX)
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (FileNotFoundError, ValueError):
+        index = {}
+    key = os.path.abspath(target)
+    hit = index.get(key)
+    if hit and hit[:2] == stamp:
+        return hit[2]
+    # A store's manifest lists every segment and row count, so it identifies the contents
+    digest = _hash_file(target)
+    index[key] = stamp + [digest]
+    os.makedirs(root, exist_ok=True)
+    tmp = index_path + f".{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(tmp, index_path)
+    return digest
+
+
+def fit_key(path: str, column: str, session: Optional[str], models, **options) -> str:
+    payload = [CACHE_VERSION, content_hash(path), column, session, list(models), sorted(options.items())]
+    return hashlib.sha256(json.dumps(payload, default=str).encode("utf-8")).hexdigest()
+
+
+def _entry_path(key: str) -> str:
+    return os.path.join(cache_dir(), key + ".json")
+
+
+def get_fits(key: str) -> Optional[List[dict]]:
+    p = _entry_path(key)
+    try:
+        with open(p, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    # Touch on hit so eviction is least-recently-used
+    try:
+        os.utime(p)
+    except OSError:
+        pass
+    return [make_fit(e["name"], e["params"], e["ll"], e["aic"]) for e in entries]
+
+
+def put_fits(key: str, fits: List[dict]) -> None:
+    entries = [{"name": f["name"], "params": {k: float(v) for k, v in f["params"].items()},
+                "ll": float(f["ll"]), "aic": float(f["aic"])} for f in fits]
+    root = cache_dir()
+    os.makedirs(root, exist_ok=True)
+    p = _entry_path(key)
+    tmp = p + f".{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(entries, f)
+    os.replace(tmp, p)
+    evict()
+
+
+def evict(max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES) -> int:
+    """Drop least-recently-used entries until both bounds hold; returns how many were removed."""
+    root = cache_dir()
+    entries = []
+    for name in os.listdir(root):
+        if name.endswith(".json") and name != _HASH_INDEX:
+            try:
+                st = os.stat(os.path.join(root, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, name))
+    entries.sort()
+    total = sum(e[1] for e in entries)
+    removed = 0
+    while entries and (len(entries) > max_entries or total > max_bytes):
+        _, size, name = entries.pop(0)
+        try:
+            os.remove(os.path.join(root, name))
+        except OSError:
+            pass
+        total -= size
+        removed += 1
+    return removed
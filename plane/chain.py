@@ -0,0 +1,249 @@
+import hashlib
+import hmac
+import json
+import os
+from typing import List, Optional
+
+from .fair import multiplier_from_hex, multipliers_from_digests
+
+# Hash-chain crash games. The operator grows a chain from a secret seed, link i + 1 being
+# the SHA-256 hex digest of link i's hex text, and plays it backwards: game 1 uses the last
+# link, game 2 the one before, and so on. The terminating hash, the SHA-256 of game 1's
+# hash, is published up front, so each revealed game hash commits to the previous one:
+#   sha256(game g) == game g - 1,   sha256(game 1) == terminating hash
+# A round's multiplier is the usual conversion (fair.multiplier_from_hex) of the game hash,
+# or of HMAC-SHA256(key=game hash, msg=salt) when the game mixes in a public salt.
+#
+# The seed is itself the last game (game `links`), so it must be a 64-char hex digest like
+# every other link. Building a chain keeps every CHECKPOINT_EVERY-th link, so any game is at most that many
+# hashes from a checkpoint. Verifying a recorded history hashes each game once and compares
+# against its neighbour; the pairs are independent, so blocks run on a process pool.
+CHECKPOINT_EVERY = 1000
+VERIFY_BLOCK = 1 << 16
+PARALLEL_MIN_ROUNDS = 1 << 18
+# Recorded multipliers are usually shown with 2 decimals
+MULTIPLIER_TOL = 0.01
+MAX_REPORTED = 100
+
+
+def is_hex_digest(h: str) -> bool:
+    try:
+        return len(h) == 64 and len(bytes.fromhex(h)) == 32
+    except ValueError:
+        return False
+
+
+def round_hash(game_hash: str, salt: Optional[str] = None) -> str:
+    """Hex digest a round's multiplier is drawn from."""
+    if salt is None:
+        return game_hash
+    return hmac.new(game_hash.encode("utf-8"), salt.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def round_multiplier(game_hash: str, salt: Optional[str] = None, house_edge: float = 0.99) -> float:
+    return multiplier_from_hex(round_hash(game_hash, salt), house_edge)
+
+
+def round_multipliers(game_hashes: List[str], salt: Optional[str] = None, house_edge: float = 0.99):
+    """round_multiplier over many games at once (numpy array, bit-identical)."""
+    if salt is None:
+        raw = b"".join([bytes.fromhex(h) for h in game_hashes])
+    else:
+        key = salt.encode("utf-8")
+        raw = b"".join([hmac.new(h.encode("utf-8"), key, hashlib.sha256).digest() for h in game_hashes])
+    return multipliers_from_digests(raw, house_edge)
+
+
+class HashChain:
+    """Every `every`-th link of a chain of `links` links; checkpoint 0 is the seed.
+
+    The checkpoints give O(every) access to any game, and the file holds the seed, so keep
+    it private.
+    """
+
+    def __init__(self, checkpoints: List[str], links: int, every: int, terminating: str):
+        self.checkpoints = checkpoints
+        self.links = links
+        self.every = every
+        self.terminating = terminating
+
+    @classmethod
+    def generate(cls, seed: str, links: int, every: int = CHECKPOINT_EVERY) -> "HashChain":
+        if links < 1 or every < 1:
+            raise ValueError("links and every must be at least 1")
+        if not is_hex_digest(seed):
+            raise ValueError("The seed is the last game's hash, so it must be 64 hex characters "
+                             "(e.g. a random 32-byte value in hex)")
+        seed = seed.lower()
+        sha = hashlib.sha256
+        cps = []
+        h = seed
+        for i in range(links):
+            if i % every == 0:
+                cps.append(h)
+            h = sha(h.encode("utf-8")).hexdigest()
+        # h is now one past the last link: the hash of game 1
+        return cls(cps, links, every, h)
+
+    def _links(self, lo: int, hi: int) -> List[str]:
+        """Links lo..hi-1 in chain order, starting from the checkpoint at or below lo."""
+        sha = hashlib.sha256
+        i = lo // self.every * self.every
+        h = self.checkpoints[i // self.every]
+        for _ in range(lo - i):
+            h = sha(h.encode("utf-8")).hexdigest()
+        out = [h]
+        for _ in range(hi - lo - 1):
+            h = sha(h.encode("utf-8")).hexdigest()
+            out.append(h)
+        return out
+
+    def game_hash(self, game: int) -> str:
+        """Hash of game `game` (1 = first played, `links` = the seed)."""
+        if not 1 <= game <= self.links:
+            raise ValueError(f"game must be in 1..{self.links}")
+        return self._links(self.links - game, self.links - game + 1)[0]
+
+    def games(self, first: int, count: int) -> List[str]:
+        """Hashes of games first..first+count-1 in play order, in O(every + count) hashes."""
+        if count < 1 or first < 1 or first + count - 1 > self.links:
+            raise ValueError(f"games must be in 1..{self.links}")
+        return self._links(self.links - first - count + 1, self.links - first + 1)[::-1]
+
+    def save(self, path: str) -> None:
+        data = {"format": "plane-hash-chain", "version": 1, "links": self.links, "every": self.every,
+                "terminating": self.terminating, "checkpoints": self.checkpoints}
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path: str) -> "HashChain":
+        with open(path, "r", encoding="utf-8") as f:
+            d = json.load(f)
+        if d.get("format") != "plane-hash-chain":
+            raise ValueError(f"{path} is not a hash-chain checkpoint file")
+        return cls(d["checkpoints"], d["links"], d["every"], d["terminating"])
+
+
+def _safe_multiplier(h: str, salt, house_edge) -> float:
+    try:
+        return round_multiplier(h, salt, house_edge) if is_hex_digest(h) else float("nan")
+    except ValueError:
+        return float("nan")
+
+
+def _verify_job(args):
+    """Bad offsets in a block: links that don't hash to their predecessor, and multiplier mismatches."""
+    prev, hashes, steps, recorded, salt, house_edge, tol = args
+    sha = hashlib.sha256
+    bad = []
+    for j, h in enumerate(hashes):
+        x = h
+        for _ in range(steps[j] if steps is not None else 1):
+            x = sha(x.encode("utf-8")).hexdigest()
+        if prev is not None and x != prev:
+            bad.append(j)
+        prev = h
+    bad_mult = []
+    if recorded is not None:
+        import numpy as np
+        try:
+            m = round_multipliers(hashes, salt, house_edge)
+        except ValueError:
+            # Some hashes aren't 32-byte hex digests; those count as mismatches
+            m = np.array([_safe_multiplier(h, salt, house_edge) for h in hashes])
+        r = np.asarray(recorded, dtype=float)
+        bad_mult = np.flatnonzero(~(np.abs(m - r) <= tol)).tolist()
+    return bad, bad_mult
+
+
+def verify_history(hashes: List[str], terminating: Optional[str] = None, first_game: int = 1,
+                   games: Optional[List[int]] = None, multipliers=None, salt: Optional[str] = None,
+                   house_edge: float = 0.99, tol: float = MULTIPLIER_TOL,
+                   workers: Optional[int] = None) -> dict:
+    """Check recorded game hashes (in play order) link up, back to the terminating hash if given.
+
+    games gives each hash's game number when the history has gaps (a gap of d costs d
+    hashes); otherwise games are first_game, first_game + 1, ... multipliers, if given, are
+    compared with the values derived from the hashes within tol. Returns counts, the first
+    MAX_REPORTED bad game numbers and "ok".
+    """
+    n = len(hashes)
+    if games is None:
+        games = range(first_game, first_game + n)
+    games = [int(g) for g in games]
+    if len(games) != n or (multipliers is not None and len(multipliers) != n):
+        raise ValueError("hashes, games and multipliers must have the same length")
+    if any(b <= a for a, b in zip(games, games[1:])) or (n and games[0] < 1):
+        raise ValueError("game numbers must be increasing and start at 1 or later")
+    # Steps back to the previous recorded game; the terminating hash counts as game 0
+    steps = [games[0]] + [b - a for a, b in zip(games, games[1:])] if n else []
+    jobs = []
+    for lo in range(0, n, VERIFY_BLOCK):
+        hi = min(n, lo + VERIFY_BLOCK)
+        prev = hashes[lo - 1] if lo else terminating
+        rec = list(multipliers[lo:hi]) if multipliers is not None else None
+        st = None if all(s == 1 for s in steps[lo:hi]) else steps[lo:hi]
+        jobs.append((lo, (prev, hashes[lo:hi], st, rec, salt, house_edge, tol)))
+    workers = min(workers or os.cpu_count() or 1, max(len(jobs), 1))
+    if workers > 1 and n >= PARALLEL_MIN_ROUNDS:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            parts = list(ex.map(_verify_job, [j for _, j in jobs]))
+    else:
+        parts = [_verify_job(j) for _, j in jobs]
+    bad_links = [games[lo + j] for (lo, _), (b, _) in zip(jobs, parts) for j in b]
+    bad_mult = [games[lo + j] for (lo, _), (_, m) in zip(jobs, parts) for j in m]
+    terminating_ok = None
+    if terminating is not None and n:
+        terminating_ok = games[0] not in bad_links
+    return {"rounds": n, "first_game": games[0] if n else None, "last_game": games[-1] if n else None,
+            "hashes": sum(steps), "terminating_ok": terminating_ok,
+            "bad_links": len(bad_links), "bad_link_games": bad_links[:MAX_REPORTED],
+            "bad_multipliers": len(bad_mult) if multipliers is not None else None,
+            "bad_multiplier_games": bad_mult[:MAX_REPORTED],
+            "ok": not bad_links and not bad_mult}
+
+
+def _parse(vals, name: str, conv, first_row: int, path: str) -> list:
+    out = []
+    for i, v in enumerate(vals):
+        try:
+            out.append(conv(str(v).strip()))
+        except (TypeError, ValueError):
+            what = "blank" if v is None or not str(v).strip() else f"unparsable ({v!r})"
+            raise ValueError(f"{path}: {what} {name} in row {first_row + i}") from None
+    return out
+
+
+def load_history(path: str) -> dict:
+    """Columns of a recorded history (CSV/JSON records): "hash", plus "game"/"multiplier" if present.
+
+    Raises ValueError naming the row of a blank or unparsable game or multiplier.
+    """
+    if path.lower().endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        recs = data if isinstance(data, list) else data.get("records", [])
+        cols = {k: [r.get(k) for r in recs] for k in ("hash", "game", "multiplier") if recs and k in recs[0]}
+        first_row = 1
+    else:
+        import csv
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            header = [h.strip() for h in next(reader, [])]
+            idx = {k: header.index(k) for k in ("hash", "game", "multiplier") if k in header}
+            rows = [r for r in reader if r]
+        cols = {k: [r[i] if i < len(r) else "" for r in rows] for k, i in idx.items()}
+        # Data rows start on line 2
+        first_row = 2
+    if "hash" not in cols:
+        raise ValueError(f"Missing 'hash' in {path}")
+    cols["hash"] = [str(h).strip().lower() for h in cols["hash"]]
+    if "game" in cols:
+        cols["game"] = _parse(cols["game"], "game", int, first_row, path)
+    if "multiplier" in cols:
+        cols["multiplier"] = _parse(cols["multiplier"], "multiplier", lambda m: float(m.rstrip("xX")),
+                                    first_row, path)
+    return cols
@@ -1,9 +1,9 @@
 import argparse
-from .data import load_sessions
-from .survival import empirical_survival
-from .fit import fit_models, best_model_by_aic
-from .report import summarize_fit, prob_ge_thresholds
-from .fair import sequence
+
+from .profiling import span
+
+# Each command imports what it needs when it runs: pandas, numpy and scipy cost far more
+# than a short `pf`, `add` or `merge` itself (see `plane bench --startup`).
 
 
 def make_parser():
@@ -13,32 +13,126 @@ def make_parser():
     sub = p.add_subparsers(dest="cmd", required=True)
 
     p_fit = sub.add_parser("fit", help="Fit candidate models to data")
-    p_fit.add_argument("--data", required=True, help="Path to CSV/JSON data")
+    p_fit.add_argument("--data", required=True, help="Path to CSV/JSON data or a .plane store")
     p_fit.add_argument("--column", required=True, help="Column with multipliers (>=1)")
     p_fit.add_argument("--session", default=None, help="Optional session id column")
+    p_fit.add_argument("--incremental", action="store_true", help="Fit from persisted running statistics instead of rescanning the data")
+    p_fit.add_argument("--stream", action="store_true", help="Fit from one chunked pass over the data without loading it into memory")
+    p_fit.add_argument("--no-cache", action="store_true", help="Ignore and don't update the on-disk fit cache")
+    p_fit.add_argument("--models", nargs="+", default=None, metavar="MODEL", help="Models to fit (default: all registered)")
+    p_fit.add_argument("--bootstrap", type=int, default=0, metavar="B", help="Bootstrap replicates for confidence intervals (0 = off)")
+    p_fit.add_argument("--ci", type=float, default=0.95, help="Bootstrap confidence level")
+    p_fit.add_argument("--seed", type=int, default=0, help="Bootstrap seed")
+    p_fit.add_argument("--workers", type=int, default=None, help="Bootstrap worker processes (default: all cores)")
+    p_fit.add_argument("--gof", action="store_true", help="Add goodness-of-fit statistics, with bootstrap p-values for the best model")
+    p_fit.add_argument("--gof-reps", type=int, default=200, metavar="B", help="Bootstrap replicates for --gof p-values (0 = statistics only)")
     p_fit.add_argument("--plot", action="store_true", help="Show survival plot")
+    p_fit.add_argument("--plot-out", default=None, metavar="PATH", help="Write the survival plot to a PNG/SVG/PDF file instead of showing it")
 
     p_prob = sub.add_parser("prob", help="Compute P(X>=x) with best model")
-    p_prob.add_argument("--data", required=True, help="Path to CSV/JSON data")
+    p_prob.add_argument("--data", required=True, help="Path to CSV/JSON data or a .plane store")
     p_prob.add_argument("--column", required=True)
     p_prob.add_argument("--session", default=None)
-    p_prob.add_argument("--x", nargs="+", type=float, required=True, help="Thresholds")
+    p_prob.add_argument("--incremental", action="store_true", help="Fit from persisted running statistics instead of rescanning the data")
+    p_prob.add_argument("--stream", action="store_true", help="Fit from one chunked pass over the data without loading it into memory")
+    p_prob.add_argument("--no-cache", action="store_true", help="Ignore and don't update the on-disk fit cache")
+    p_prob.add_argument("--models", nargs="+", default=None, metavar="MODEL", help="Models to fit (default: all registered)")
+    p_prob.add_argument("--bootstrap", type=int, default=0, metavar="B", help="Bootstrap replicates for confidence intervals (0 = off)")
+    p_prob.add_argument("--ci", type=float, default=0.95, help="Bootstrap confidence level")
+    p_prob.add_argument("--seed", type=int, default=0, help="Bootstrap seed")
+    p_prob.add_argument("--workers", type=int, default=None, help="Bootstrap worker processes (default: all cores)")
+    p_prob.add_argument("--x", nargs="+", type=float, default=None, help="Thresholds")
+    p_prob.add_argument("--x-file", default=None, help="Read thresholds from a text/CSV or .npy file")
+    p_prob.add_argument("--matrix", action="store_true", help="P(X>=x) for every fitted model, one column per model")
+    p_prob.add_argument("--out", default=None, help="Write the --matrix table to CSV/JSON instead of printing")
+    p_prob.add_argument("--table", default=None, help="Export survival/quantile lookup tables of the fits (.npz or .json)")
+    p_prob.add_argument("--tol", type=float, default=1e-6, help="Relative interpolation error bound for --table")
 
     p_sim = sub.add_parser("simulate", help="Simulate rounds from best model")
     p_sim.add_argument("--data", required=True)
     p_sim.add_argument("--column", required=True)
     p_sim.add_argument("--session", default=None)
-    p_sim.add_argument("--n", type=int, default=1000)
+    p_sim.add_argument("--incremental", action="store_true", help="Fit from persisted running statistics instead of rescanning the data")
+    p_sim.add_argument("--stream", action="store_true", help="Fit from one chunked pass over the data without loading it into memory")
+    p_sim.add_argument("--no-cache", action="store_true", help="Ignore and don't update the on-disk fit cache")
+    p_sim.add_argument("--models", nargs="+", default=None, metavar="MODEL", help="Models to fit (default: all registered)")
+    p_sim.add_argument("--rounds", "--n", dest="rounds", type=int, default=1000, help="Rounds per path")
+    p_sim.add_argument("--paths", type=int, default=1000, help="Independent bankroll paths")
+    p_sim.add_argument("--strategy", choices=["fixed", "martingale", "stop"], default="fixed", help="Betting strategy")
+    p_sim.add_argument("--bankroll", type=float, default=100.0, help="Starting bankroll")
+    p_sim.add_argument("--bet", type=float, default=1.0, help="Base stake per round")
+    p_sim.add_argument("--target", type=float, default=2.0, help="Cash-out multiplier")
+    p_sim.add_argument("--factor", type=float, default=2.0, help="Martingale stake multiplier after a loss")
+    p_sim.add_argument("--stop-loss", type=float, default=None, help="Quit after losing this much")
+    p_sim.add_argument("--take-profit", type=float, default=None, help="Quit after winning this much")
+    p_sim.add_argument("--seed", type=int, default=0, help="Simulation seed")
+    p_sim.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+
+    p_grp = sub.add_parser("groups", help="Fit models per session or per rolling window of rounds")
+    p_grp.add_argument("--data", required=True)
+    p_grp.add_argument("--column", required=True)
+    p_grp.add_argument("--session", default=None, help="Session id column to group by")
+    p_grp.add_argument("--window", type=int, default=None, help="Fit rolling windows of N rounds instead of sessions")
+    p_grp.add_argument("--step", type=int, default=None, help="Window step in rounds (default: window size)")
+    p_grp.add_argument("--workers", type=int, default=None, help="Worker processes for per-session fits")
+    p_grp.add_argument("--models", nargs="+", default=None, metavar="MODEL", help="Models to fit per session (default: all registered)")
+    p_grp.add_argument("--out", default=None, help="Write the table to CSV/JSON instead of printing")
+
+    p_gof = sub.add_parser("gof", help="Goodness-of-fit tests (KS, Anderson-Darling, tail CvM) with bootstrap p-values")
+    p_gof.add_argument("--data", required=True)
+    p_gof.add_argument("--column", required=True)
+    p_gof.add_argument("--session", default=None)
+    p_gof.add_argument("--models", nargs="+", default=None, metavar="MODEL", help="Models to fit and test (default: all registered)")
+    p_gof.add_argument("--reps", type=int, default=200, help="Parametric bootstrap replicates (0 = statistics only)")
+    p_gof.add_argument("--pvalues", choices=["best", "all"], default="best", help="Models that get bootstrap p-values")
+    p_gof.add_argument("--boot-n", type=int, default=None, help="Replicate size (default: the sample size for values on a decimal grid, else up to 20000)")
+    p_gof.add_argument("--seed", type=int, default=0)
+    p_gof.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    p_gof.add_argument("--out", default=None, help="Write results to CSV/JSON instead of printing")
+
+    p_plot = sub.add_parser("plot", help="Render decimated survival plots to files, optionally per session or window")
+    p_plot.add_argument("--data", required=True)
+    p_plot.add_argument("--column", required=True)
+    p_plot.add_argument("--session", default=None, help="Session id column; with --by-session, one plot per session")
+    p_plot.add_argument("--by-session", action="store_true", help="One plot per session (needs --session)")
+    p_plot.add_argument("--window", type=int, default=None, help="One plot per rolling window of N rounds")
+    p_plot.add_argument("--step", type=int, default=None, help="Window step in rounds (default: window size)")
+    p_plot.add_argument("--models", nargs="+", default=None, metavar="MODEL", help="Models to fit and draw (default: all registered)")
+    p_plot.add_argument("--out", required=True, help="Output file (PNG/SVG/PDF), or a directory for per-session/window plots")
+    p_plot.add_argument("--format", default="png", choices=["png", "svg", "pdf"], help="File format for per-group plots")
+    p_plot.add_argument("--rel-err", type=float, default=0.005, help="Max relative error of the decimated curve (0 = draw every point)")
+    p_plot.add_argument("--linear-x", action="store_true", help="Linear x axis (default: log)")
+    p_plot.add_argument("--workers", type=int, default=None, help="Worker processes for per-group plots (default: all cores)")
 
     # Manual data operations
     p_add = sub.add_parser("add", help="Append manually provided multipliers to a CSV/JSON")
-    p_add.add_argument("--out", required=True, help="Destination CSV or JSON file")
+    p_add.add_argument("--out", required=True, help="Destination CSV, JSON or .plane store")
     p_add.add_argument("--values", nargs="+", type=float, required=True, help="Multipliers to append (>=1)")
     p_add.add_argument("--session", default="manual", help="Session id label to store")
 
     p_merge = sub.add_parser("merge", help="Merge multiple CSV/JSON files into one")
-    p_merge.add_argument("--inputs", nargs="+", required=True, help="Input file paths (CSV/JSON)")
-    p_merge.add_argument("--out", required=True, help="Output CSV or JSON")
+    p_merge.add_argument("--inputs", nargs="+", required=True, help="Input file paths (CSV/JSON/.plane)")
+    p_merge.add_argument("--out", required=True, help="Output CSV, JSON or .plane store")
+    p_merge.add_argument("--dedup", choices=["none", "session-seq", "window"], default="none",
+                         help="Drop repeated rounds keyed by session + position, or by a hash of --window consecutive values")
+    p_merge.add_argument("--window", type=int, default=8, help="Rounds per content hash for --dedup window")
+    p_merge.add_argument("--incremental", action="store_true",
+                         help="Append to an existing --out, processing only inputs not yet merged into it")
+
+    p_ocr = sub.add_parser("ocr", help="Batch OCR of screenshots into a dataset")
+    p_ocr.add_argument("--inputs", nargs="+", required=True, help="Image files, directories or glob patterns")
+    p_ocr.add_argument("--out", default=None, help="Dataset to append to (CSV, JSON or .plane store)")
+    p_ocr.add_argument("--session", default=None, help="Session id to store (default: image file name)")
+    p_ocr.add_argument("--workers", type=int, default=None, help="Concurrent OCR workers (default: all cores)")
+    p_ocr.add_argument("--invert", action="store_true", help="Invert colours (dark UIs)")
+    p_ocr.add_argument("--threshold", type=int, default=160, help="Binarization threshold (0-255)")
+    p_ocr.add_argument("--backend", choices=["local", "azure"], default="local", help="OCR backend")
+    p_ocr.add_argument("--no-cache", action="store_true", help="Don't use the persistent OCR line cache")
+    p_ocr.add_argument("--columns", action="store_true", help="Split multi-column history grids into columns first")
+
+    p_exp = sub.add_parser("export", help="Export a .plane segment store to CSV/JSON")
+    p_exp.add_argument("--data", required=True, help="Path to a .plane store")
+    p_exp.add_argument("--out", required=True, help="Output CSV or JSON")
 
     p_pf = sub.add_parser("pf", help="Provably Fair: compute crash multipliers from seeds")
     p_pf.add_argument("--server", required=True, help="Server seed (string)")
@@ -46,46 +140,430 @@ def make_parser():
     p_pf.add_argument("--nonce", type=int, default=0, help="Starting nonce (default 0)")
     p_pf.add_argument("--rounds", type=int, default=1, help="Number of rounds to generate")
     p_pf.add_argument("--edge", type=float, default=0.99, help="House edge factor (default 0.99)")
+    p_pf.add_argument("--workers", type=int, default=None, help="Worker processes for large ranges (default: all cores)")
+    p_pf.add_argument("--out", default=None, help="Stream results to a CSV/NPY/BIN file instead of printing")
+
+    p_chain = sub.add_parser("chain", help="Hash-chain crash games: build checkpoints, look up rounds, verify a history")
+    p_chain.add_argument("--seed", default=None, help="Build a chain from this secret seed")
+    p_chain.add_argument("--links", type=int, default=None, help="Chain length (number of games) for --seed")
+    p_chain.add_argument("--every", type=int, default=1000, help="Keep every K-th link as a checkpoint")
+    p_chain.add_argument("--checkpoints", default=None, help="Checkpoint file (written with --seed, read otherwise)")
+    p_chain.add_argument("--game", type=int, default=None, help="Print game hashes and multipliers from this game on")
+    p_chain.add_argument("--count", type=int, default=1, help="Games to print with --game")
+    p_chain.add_argument("--out", default=None, help="Write --game results to CSV/JSON instead of printing")
+    p_chain.add_argument("--verify", default=None, metavar="HISTORY", help="CSV/JSON history with a hash column (optional game, multiplier)")
+    p_chain.add_argument("--terminating", default=None, help="Published terminating hash (default: from --checkpoints)")
+    p_chain.add_argument("--first-game", type=int, default=1, help="Game number of the history's first row when it has no game column")
+    p_chain.add_argument("--salt", default=None, help="Public salt mixed into each game hash with HMAC-SHA256")
+    p_chain.add_argument("--house-edge", type=float, default=0.99, help="House edge factor (default 0.99)")
+    p_chain.add_argument("--workers", type=int, default=None, help="Worker processes for --verify (default: all cores)")
+
+    p_bench = sub.add_parser("bench", help="Benchmark the hot paths on synthetic data")
+    p_bench.add_argument("--stages", nargs="+", default=None, metavar="STAGE", help="Stages to run (default: all)")
+    p_bench.add_argument("--scales", nargs="+", type=int, default=None, metavar="N", help="Data sizes (default: 1e3 to 1e6)")
+    p_bench.add_argument("--repeat", type=int, default=3, help="Timed runs per stage and size")
+    p_bench.add_argument("--seed", type=int, default=0, help="Synthetic data seed")
+    p_bench.add_argument("--out", default=None, help="Write results to this JSON file")
+    p_bench.add_argument("--baseline", default=None, help="Compare against a saved results JSON; exits 1 on regressions")
+    p_bench.add_argument("--threshold", type=float, default=1.25, help="Slowdown/memory growth factor that counts as a regression")
+    p_bench.add_argument("--startup", action="store_true", help="Instead, check that pf/add/merge start within --startup-budget without heavy imports; exits 1 otherwise")
+    p_bench.add_argument("--startup-budget", type=float, default=100.0, metavar="MS", help="Startup budget per light command in milliseconds")
+    p_bench.add_argument("--writers", type=int, default=None, metavar="N", help="Instead, stress the shared writer with N processes appending at once; exits 1 if rows are lost or duplicated")
+    p_bench.add_argument("--appends", type=int, default=100, help="Appends per writer for --writers")
+    p_bench.add_argument("--values-per-append", type=int, default=5, help="Values per append for --writers")
+    p_bench.add_argument("--target", choices=["csv", "json", "plane"], default="csv", help="Dataset format for --writers")
+    p_bench.add_argument("--no-fsync", action="store_true", help="Skip fsyncs in --writers (measures locking and batching only)")
+
+    p_srv = sub.add_parser("serve", help="Serve fits and probabilities over a local JSON API, keeping the data in memory")
+    p_srv.add_argument("--data", required=True, help="Path to CSV/JSON data or a .plane store (created on first append)")
+    p_srv.add_argument("--column", default="multiplier", help="Column with multipliers (>=1)")
+    p_srv.add_argument("--session", default=None, help="Optional session id column")
+    p_srv.add_argument("--models", nargs="+", default=None, metavar="MODEL", help="Models to keep fitted (default: all registered)")
+    p_srv.add_argument("--host", default="127.0.0.1")
+    p_srv.add_argument("--port", type=int, default=8765)
+    p_srv.add_argument("--unix", default=None, metavar="PATH", help="Listen on a Unix socket instead of TCP")
+    p_srv.add_argument("--read-only", action="store_true", help="Keep appends in memory only; don't write them to --data")
+
+    for sp in sub.choices.values():
+        sp.add_argument("--profile", action="store_true", help="Print a per-stage timing breakdown to stderr")
+        sp.add_argument("--profile-out", action="append", default=[], metavar="PATH",
+                        help="Also write a JSON trace (.json) or cProfile stats (.prof); repeatable, implies --profile")
+        sp.add_argument("--profile-top", type=int, default=0, metavar="N",
+                        help="Also run cProfile and print its N slowest functions (cumulative); implies --profile")
 
     return p
 
 
+def _write_table(table, out):
+    if not out:
+        print(table.to_string(index=False))
+    elif out.lower().endswith(".csv"):
+        table.to_csv(out, index=False)
+        print(f"Wrote {len(table)} rows to {out}.")
+    elif out.lower().endswith(".json"):
+        table.to_json(out, orient="records")
+        print(f"Wrote {len(table)} rows to {out}.")
+    else:
+        raise ValueError("Unsupported output format; use CSV or JSON")
+
+
+def _load(args):
+    from .data import load_sessions
+    with span("load") as sp:
+        df = load_sessions(args.data, multiplier_col=args.column, session_col=args.session)
+        sp.rows = len(df)
+    return df
+
+
 def main(argv=None):
     parser = make_parser()
     args = parser.parse_args(argv)
+    if not (args.profile or args.profile_out or args.profile_top):
+        return _run(parser, args)
+    if args.profile_top < 0:
+        parser.error("--profile-top must be a positive count")
+    import sys
+    from .profiling import Profiler
+    prof = Profiler(cprofile=args.profile_top > 0 or any(not p.lower().endswith(".json") for p in args.profile_out))
+    try:
+        with prof, span(args.cmd):
+            return _run(parser, args)
+    finally:
+        print(prof.report(), file=sys.stderr)
+        if args.profile_top:
+            print(prof.top_functions(args.profile_top), file=sys.stderr)
+        for path in args.profile_out:
+            prof.write(path)
+            print(f"Wrote profile to {path}.", file=sys.stderr)
+
+
+def _run(parser, args):
+    if getattr(args, "models", None):
+        from .fit import MODELS
+        bad = [m for m in args.models if m not in MODELS]
+        if bad:
+            parser.error(f"argument --models: invalid choice(s) {', '.join(bad)}; choose from {', '.join(MODELS)}")
+    if args.cmd == "prob":
+        xs = list(args.x or [])
+        if args.x_file:
+            from .lookup import read_thresholds
+            xs.extend(read_thresholds(args.x_file).tolist())
+        if not xs:
+            parser.error("prob needs thresholds: --x and/or --x-file")
+        args.x = xs
+    if args.cmd in {"groups", "plot"}:
+        if args.window is not None and args.window < 1:
+            parser.error("--window must be at least 1")
+        if args.step is not None and args.step < 1:
+            parser.error("--step must be at least 1")
+    if args.cmd == "simulate" and args.strategy == "stop" and args.stop_loss is None and args.take_profit is None:
+        parser.error("--strategy stop needs --stop-loss and/or --take-profit")
 
     if args.cmd in {"fit", "prob", "simulate"}:
-        df = load_sessions(args.data, multiplier_col=args.column, session_col=args.session)
-        S = empirical_survival(df["multiplier"].values)
-        fits = fit_models(df["multiplier"].values)
+        from .fit import fit_models, best_model_by_aic, MODELS
+        from .report import summarize_fit, summarize_bootstrap, bootstrap_note, prob_ge_thresholds
+        df = None
+        fits = key = None
+        models = tuple(args.models or MODELS)
+        if args.incremental or args.stream:
+            from .incremental import STATS_MODELS
+            skipped = [m for m in models if m not in STATS_MODELS]
+            models = tuple(m for m in models if m in STATS_MODELS)
+            if not models:
+                parser.error(f"--incremental/--stream can only fit: {', '.join(STATS_MODELS)}")
+            if skipped and args.models:
+                print(f"Skipping models without running-statistics fits: {', '.join(skipped)}")
+        # --incremental fits from the stats sidecar in O(1); keying the cache on a content hash
+        # would re-read the whole file after every append
+        if not args.no_cache and not args.incremental:
+            from .cache import fit_key, get_fits
+            key = fit_key(args.data, args.column, args.session, models, incremental=args.stream)
+            with span("cache"):
+                fits = get_fits(key)
+        if fits is None:
+            if args.incremental or args.stream:
+                from .incremental import load_or_build_stats, stats_from_chunks, fit_models_from_stats
+                with span("stats") as sp:
+                    build = load_or_build_stats if args.incremental else stats_from_chunks
+                    total = build(args.data, args.column, args.session).total
+                    sp.rows = total.n
+                with span("fit", rows=total.n):
+                    fits = fit_models_from_stats(total, models)
+            else:
+                df = _load(args)
+                with span("fit", rows=len(df)):
+                    fits = fit_models(df["multiplier"].values, models)
+            if key is not None:
+                from .cache import put_fits
+                put_fits(key, fits)
         best = best_model_by_aic(fits)
+        boot = None
+        if getattr(args, "bootstrap", 0) > 0:
+            from .bootstrap import bootstrap_fits
+            if df is None:
+                df = _load(args)
+            with span("bootstrap", rows=args.bootstrap):
+                boot = bootstrap_fits(df["multiplier"].values, reps=args.bootstrap, seed=args.seed,
+                                      workers=args.workers, thresholds=getattr(args, "x", None), ci=args.ci)
 
     if args.cmd == "fit":
-        print(summarize_fit(fits, best))
-        if getattr(args, "plot", False):
+        gof = None
+        if args.gof:
+            from .gof import gof_tests
+            if df is None:
+                df = _load(args)
+            with span("gof", rows=len(df)):
+                gof = gof_tests(fits, df["multiplier"].values, reps=args.gof_reps, pvalue_models=[best["name"]],
+                                seed=args.seed, workers=args.workers)
+        with span("report"):
+            print(summarize_fit(fits, best, gof))
+        if boot is not None:
+            print()
+            print(summarize_bootstrap(boot, best))
+        if args.plot or args.plot_out:
             from .plotting import plot_survival
-            plot_survival(S, fits)
+            with span("survival") as sp:
+                if df is not None:
+                    from .survival import empirical_survival
+                    emp = empirical_survival(df["multiplier"].values)
+                else:
+                    from .data import iter_chunks
+                    from .survival import empirical_survival_chunks
+                    emp = empirical_survival_chunks(x for x, _ in iter_chunks(args.data, args.column))
+                sp.rows = emp.n
+            with span("plot"):
+                plot_survival(emp, fits, out=args.plot_out)
+            if args.plot_out:
+                print(f"Wrote survival plot to {args.plot_out}.")
     elif args.cmd == "prob":
+        if args.table:
+            import math
+            from .lookup import build_tables, save_tables
+            with span("tables", rows=len(fits)):
+                tables = build_tables(fits, tol=args.tol)
+                save_tables(args.table, tables)
+            print(f"Wrote lookup tables for {len(tables)} models to {args.table} "
+                  f"(max error {max(t.err for t in tables.values()):.2g}).")
+            for t in tables.values():
+                if t.truncated:
+                    print(f"  {t.name}: tabulated for x <= {math.exp(t.log_x[-1]):.6g} and p >= {math.exp(t.log_p[0]):.3g}; "
+                          "the exact model answers beyond.")
+        if args.matrix:
+            import pandas as pd
+            from .lookup import prob_matrix
+            with span("matrix", rows=len(fits) * len(args.x)):
+                m = prob_matrix(fits, args.x)
+            table = pd.DataFrame({"x": args.x, **{f["name"]: m[i] for i, f in enumerate(fits)}})
+            _write_table(table, args.out)
+            return
         probs = prob_ge_thresholds(best, args.x)
-        for x, p in zip(args.x, probs):
-            print(f"P(X>= {x:.4g}) = {p:.6f}")
+        # The bootstrap covers the closed-form models only
+        if boot is not None and best["name"] in boot["models"]:
+            cis = boot["models"][best["name"]]["prob"]
+            for x, p, (lo, hi) in zip(args.x, probs, cis):
+                print(f"P(X>= {x:.4g}) = {p:.6f}  [{boot['ci']:.0%} CI {lo:.6f}, {hi:.6f}]")
+        else:
+            for x, p in zip(args.x, probs):
+                print(f"P(X>= {x:.4g}) = {p:.6f}")
+            if boot is not None:
+                print(bootstrap_note(boot, best))
     elif args.cmd == "simulate":
-        rng = best["model"].rng()
-        import numpy as np
-        samples = rng(size=args.n)
-        print("Simulated samples (first 20):", np.array2string(samples[:20], precision=4))
+        from .simulate import simulate_strategy
+        from .report import summarize_simulation
+        with span("simulate", rows=args.paths * args.rounds):
+            sim = simulate_strategy(best, paths=args.paths, rounds=args.rounds, bankroll=args.bankroll,
+                                    bet=args.bet, target=args.target, strategy=args.strategy, factor=args.factor,
+                                    stop_loss=args.stop_loss, take_profit=args.take_profit, seed=args.seed,
+                                    workers=args.workers)
+        print(summarize_simulation(sim))
+    elif args.cmd == "groups":
+        from .groups import fit_sessions, fit_windows
+        df = _load(args)
+        if args.window is not None:
+            table = fit_windows(df["multiplier"].values, args.window, args.step)
+        else:
+            table = fit_sessions(df["multiplier"].values, df["session_id"].values, workers=args.workers,
+                                 models=args.models)
+        _write_table(table, args.out)
+    elif args.cmd == "gof":
+        from .fit import fit_models, best_model_by_aic
+        from .gof import gof_tests
+        from .report import summarize_fit
+        df = _load(args)
+        x = df["multiplier"].values
+        with span("fit", rows=x.size):
+            fits = fit_models(x, args.models)
+        best = best_model_by_aic(fits)
+        with span("gof", rows=x.size):
+            res = gof_tests(fits, x, reps=args.reps, seed=args.seed, workers=args.workers, boot_n=args.boot_n,
+                            pvalue_models=None if args.pvalues == "all" else [best["name"]])
+        if args.out:
+            import pandas as pd
+            rows = [{**{k: v for k, v in r.items() if k != "pvalues"},
+                     **{f"p_{k}": v for k, v in (r["pvalues"] or {}).items()}} for r in res]
+            _write_table(pd.DataFrame(rows), args.out)
+        else:
+            print(summarize_fit(fits, best, res))
+    elif args.cmd == "plot":
+        if args.by_session and not args.session:
+            parser.error("--by-session needs --session")
+        df = _load(args)
+        rel_err = args.rel_err or None
+        if args.by_session or args.window is not None:
+            from .plotting import render_groups
+            with span("render", rows=len(df)):
+                paths = render_groups(df["multiplier"].values, args.out,
+                                      sessions=df["session_id"].values if args.by_session else None,
+                                      window=args.window, step=args.step, fmt=args.format, models=args.models,
+                                      workers=args.workers, rel_err=rel_err, logx=not args.linear_x)
+            print(f"Wrote {len(paths)} plots to {args.out}.")
+        else:
+            from .fit import fit_models
+            from .plotting import save_survival_plot
+            from .survival import empirical_survival
+            x = df["multiplier"].values
+            with span("fit", rows=x.size):
+                fits = fit_models(x, args.models)
+            with span("render", rows=x.size):
+                save_survival_plot(args.out, empirical_survival(x), fits, rel_err=rel_err, logx=not args.linear_x)
+            print(f"Wrote survival plot to {args.out}.")
     elif args.cmd == "add":
         from .manual import append_values
         count = append_values(args.out, args.values, session_id=args.session)
         print(f"Appended {count} values to {args.out}.")
     elif args.cmd == "merge":
         from .manual import merge_files
-        merge_files(args.inputs, args.out)
-        print(f"Merged {len(args.inputs)} files into {args.out}.")
+        if args.incremental and args.out.lower().endswith(".json"):
+            parser.error("--incremental appends to a CSV or .plane --out")
+        if args.window < 1:
+            parser.error("--window must be at least 1")
+        res = merge_files(args.inputs, args.out, dedup=args.dedup, window=args.window, incremental=args.incremental)
+        merged = len(args.inputs) - res["skipped"]
+        line = f"Merged {merged} files into {args.out}"
+        if args.dedup != "none":
+            line += f": {res['written']} of {res['rows']} rows written, {res['duplicates']} duplicates dropped"
+        if res["skipped"]:
+            line += f" ({res['skipped']} already merged)"
+        print(line + ".")
+        for r in res.get("inputs", []):
+            if r["duplicates"]:
+                print(f"  {r['path']}: {r['duplicates']} of {r['rows']} rows were duplicates")
+    elif args.cmd == "ocr":
+        from .ocr import ocr_batch_to_dataset
+        cache = None
+        if not args.no_cache:
+            from .ocrcache import OCRCache
+            cache = OCRCache()
+        ocr_batch_to_dataset(args.inputs, out=args.out, session_id=args.session, invert=args.invert,
+                             threshold=args.threshold, backend=args.backend, workers=args.workers, cache=cache,
+                             columns=args.columns)
+    elif args.cmd == "export":
+        from .store import export_store
+        n = export_store(args.data, args.out)
+        print(f"Exported {n} rows from {args.data} to {args.out}.")
     elif args.cmd == "pf":
-        vals = sequence(args.server, args.client, args.nonce, args.rounds, house_edge=args.edge)
+        from .fair import sequence, write_sequence
+        if args.out:
+            with span("sequence", rows=args.rounds):
+                n = write_sequence(args.out, args.server, args.client, args.nonce, args.rounds,
+                                   house_edge=args.edge, workers=args.workers)
+            print(f"Wrote {n} rounds to {args.out}.")
+            return
+        with span("sequence", rows=args.rounds):
+            vals = sequence(args.server, args.client, args.nonce, args.rounds, house_edge=args.edge,
+                            workers=args.workers)
         for i, v in enumerate(vals):
             print(f"nonce={args.nonce + i}  R={v:.4f}x")
+    elif args.cmd == "chain":
+        from .chain import HashChain, is_hex_digest, load_history, round_multiplier, verify_history
+        if not (args.seed or args.game or args.verify):
+            parser.error("give --seed to build a chain, --game to look up rounds or --verify to check a history")
+        if args.seed is not None:
+            if not args.links or args.links < 1 or args.every < 1:
+                parser.error("--seed needs --links >= 1 and --every >= 1")
+            if not is_hex_digest(args.seed):
+                parser.error("--seed must be 64 hex characters: it is the last game's hash")
+            with span("generate", rows=args.links):
+                chain = HashChain.generate(args.seed, args.links, args.every)
+            print(f"Built {args.links} links, {len(chain.checkpoints)} checkpoints.")
+            print(f"Terminating hash: {chain.terminating}")
+            if args.checkpoints:
+                chain.save(args.checkpoints)
+                print(f"Wrote checkpoints to {args.checkpoints} (contains the seed; keep it private).")
+        elif args.checkpoints:
+            chain = HashChain.load(args.checkpoints)
+        else:
+            chain = None
+        if args.game is not None:
+            if chain is None:
+                parser.error("--game needs --seed or --checkpoints")
+            if args.game < 1 or args.count < 1 or args.game + args.count - 1 > chain.links:
+                parser.error(f"--game/--count must stay within games 1..{chain.links}")
+            with span("lookup", rows=args.count):
+                hashes = chain.games(args.game, args.count)
+                mults = [round_multiplier(h, args.salt, args.house_edge) for h in hashes]
+            if args.out:
+                import pandas as pd
+                _write_table(pd.DataFrame({"game": range(args.game, args.game + args.count), "hash": hashes,
+                                           "multiplier": mults}), args.out)
+            else:
+                for i, (h, m) in enumerate(zip(hashes, mults)):
+                    print(f"game={args.game + i}  {h}  R={m:.4f}x")
+        if args.verify:
+            terminating = args.terminating or (chain.terminating if chain is not None else None)
+            if terminating is None:
+                parser.error("--verify needs --terminating or --checkpoints")
+            try:
+                with span("load") as sp:
+                    hist = load_history(args.verify)
+                    sp.rows = len(hist["hash"])
+                with span("verify", rows=len(hist["hash"])):
+                    res = verify_history(hist["hash"], terminating, first_game=args.first_game,
+                                         games=hist.get("game"), multipliers=hist.get("multiplier"),
+                                         salt=args.salt, house_edge=args.house_edge, workers=args.workers)
+            except ValueError as e:
+                parser.error(str(e))
+            print(f"Verified {res['rounds']} rounds (games {res['first_game']}..{res['last_game']}, "
+                  f"{res['hashes']} hashes) against {terminating[:16]}...")
+            print(f"  Broken links: {res['bad_links']}"
+                  + (f" (games {', '.join(map(str, res['bad_link_games']))})" if res["bad_links"] else ""))
+            if res["bad_multipliers"] is not None:
+                print(f"  Multiplier mismatches: {res['bad_multipliers']}"
+                      + (f" (games {', '.join(map(str, res['bad_multiplier_games']))})" if res["bad_multipliers"] else ""))
+            print("OK" if res["ok"] else "FAILED")
+            if not res["ok"]:
+                raise SystemExit(1)
+    elif args.cmd == "bench" and args.writers:
+        from .bench import stress_writers, format_stress
+        res = stress_writers(args.writers, args.appends, args.values_per_append, args.target, fsync=not args.no_fsync)
+        print(format_stress(res))
+        if res["lost"] or res["duplicated"] or res["rows"] != res["expected"]:
+            raise SystemExit(1)
+    elif args.cmd == "bench" and args.startup:
+        from .bench import check_startup, format_startup
+        rows = check_startup(repeat=args.repeat, budget_ms=args.startup_budget)
+        print(format_startup(rows))
+        if not all(r["ok"] for r in rows):
+            raise SystemExit(1)
+    elif args.cmd == "bench":
+        from .bench import run_benchmarks, save_results, load_results, compare, format_results, DEFAULT_SCALES, STAGES
+        if args.stages:
+            bad = [s for s in args.stages if s not in STAGES]
+            if bad:
+                parser.error(f"unknown stage(s) {', '.join(bad)}; choose from {', '.join(STAGES)}")
+        res = run_benchmarks(args.stages, args.scales or DEFAULT_SCALES, repeat=args.repeat, seed=args.seed,
+                             progress=lambda r: print(f"  {r['stage']} n={r['n']}: {r['seconds_min']:.4f}s", flush=True))
+        comparison = compare(res, load_results(args.baseline), args.threshold) if args.baseline else None
+        print(format_results(res, comparison))
+        if args.out:
+            save_results(args.out, res)
+            print(f"Wrote results to {args.out}.")
+        if comparison and any(c["status"] == "regression" for c in comparison):
+            raise SystemExit(1)
+    elif args.cmd == "serve":
+        from .server import serve
+        serve(args.data, args.column, args.session, host=args.host, port=args.port, unix=args.unix,
+              models=args.models, persist=not args.read_only)
 
 
 if __name__ == "__main__":
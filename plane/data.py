@@ -1,13 +1,49 @@
+import json
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
 import pandas as pd
 
+from .store import is_store, read_store, read_manifest, iter_segments
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet input is optional
+    pq = None
+
+# Rows per chunk for the streaming loader
+CHUNK_ROWS = 1_000_000
+
+
+def _load_store(path: str, multiplier_col: str, session_col: str | None) -> pd.DataFrame:
+    if multiplier_col != "multiplier":
+        raise ValueError(f"Missing multiplier column '{multiplier_col}'")
+    mult, codes, sessions = read_store(path)
+    out = pd.DataFrame({"multiplier": mult})
+    if session_col == "session_id":
+        out["session_id"] = pd.Categorical.from_codes(codes.astype(np.int64), categories=pd.Index(sessions))
+    else:
+        out["session_id"] = 0
+    return out
+
 
 def load_sessions(path: str, multiplier_col: str, session_col: str | None = None) -> pd.DataFrame:
+    if is_store(path):
+        return _load_store(path, multiplier_col, session_col)
+    if path.lower().endswith((".parquet", ".pq", ".npy", ".jsonl", ".ndjson")):
+        parts = list(iter_chunks(path, multiplier_col, session_col))
+        out = pd.DataFrame({"multiplier": np.concatenate([x for x, _ in parts]) if parts else np.zeros(0)})
+        if session_col and parts and parts[0][1] is not None:
+            out["session_id"] = pd.Categorical(np.concatenate([np.asarray(sid, dtype=object) for _, sid in parts]))
+        else:
+            out["session_id"] = 0
+        return out
     if path.lower().endswith(".csv"):
         df = pd.read_csv(path)
     elif path.lower().endswith(".json"):
         df = pd.read_json(path)
     else:
-        raise ValueError("Unsupported file format; use CSV or JSON")
+        raise ValueError("Unsupported file format; use CSV, JSON, JSONL, Parquet, NPY or a .plane store")
 
     if multiplier_col not in df.columns:
         raise ValueError(f"Missing multiplier column '{multiplier_col}'")
@@ -24,3 +60,95 @@ def load_sessions(path: str, multiplier_col: str, session_col: str | None = None
 
     out = out.dropna().reset_index(drop=True)
     return out
+
+
+def _checked(x: np.ndarray, sessions) -> Tuple[np.ndarray, Optional[pd.Categorical]]:
+    # Same rules as load_sessions, applied per chunk: reject values < 1, drop rows with NaNs
+    x = np.asarray(x, dtype=np.float64)
+    if (x < 1).any():
+        raise ValueError("All multipliers must be >= 1")
+    keep = ~np.isnan(x)
+    if sessions is not None:
+        keep &= ~pd.isna(sessions)
+    if keep.all():
+        return x, sessions
+    return x[keep], (sessions[keep] if sessions is not None else None)
+
+
+def iter_chunks(path: str, multiplier_col: str, session_col: str | None = None,
+                chunksize: int = CHUNK_ROWS) -> Iterator[Tuple[np.ndarray, Optional[pd.Categorical]]]:
+    """Stream (multipliers, sessions) chunks, reading only the multiplier and session columns.
+
+    Multipliers come back as float64 arrays and sessions as a Categorical (None when no
+    session column is requested). CSV and JSON-lines are read in chunks with pinned dtypes,
+    Parquet by row batches with column projection, NPY (plain or structured) and .plane stores
+    through memory maps. A plain JSON array can't be parsed incrementally, so it is read once
+    and then sliced.
+    """
+    low = path.lower()
+    cols = [multiplier_col] + ([session_col] if session_col and session_col != multiplier_col else [])
+    if is_store(path):
+        if multiplier_col != "multiplier":
+            raise ValueError(f"Missing multiplier column '{multiplier_col}'")
+        cats = pd.Index(read_manifest(path)["sessions"])
+        for mult, codes in iter_segments(path):
+            for lo in range(0, mult.size, chunksize):
+                sid = None
+                if session_col == "session_id":
+                    sid = pd.Categorical.from_codes(np.asarray(codes[lo:lo + chunksize], dtype=np.int64), categories=cats)
+                yield _checked(mult[lo:lo + chunksize], sid)
+    elif low.endswith(".csv"):
+        dtypes = {multiplier_col: "float64"}
+        if len(cols) > 1:
+            dtypes[session_col] = "category"
+        # A callable keeps a missing session column non-fatal, as in load_sessions
+        with pd.read_csv(path, usecols=lambda c: c in cols, dtype=dtypes, chunksize=chunksize) as reader:
+            for df in reader:
+                if multiplier_col not in df.columns:
+                    raise ValueError(f"Missing multiplier column '{multiplier_col}'")
+                sid = df[session_col].values if len(cols) > 1 and session_col in df.columns else None
+                yield _checked(df[multiplier_col].to_numpy(), sid)
+    elif low.endswith((".jsonl", ".ndjson")):
+        with pd.read_json(path, lines=True, chunksize=chunksize) as reader:
+            for df in reader:
+                if multiplier_col not in df.columns:
+                    raise ValueError(f"Missing multiplier column '{multiplier_col}'")
+                sid = pd.Categorical(df[session_col]) if len(cols) > 1 and session_col in df.columns else None
+                yield _checked(pd.to_numeric(df[multiplier_col], errors="coerce").to_numpy(), sid)
+    elif low.endswith((".parquet", ".pq")):
+        if pq is None:
+            raise RuntimeError("Parquet input requires pyarrow. Install pyarrow.")
+        pf = pq.ParquetFile(path)
+        names = pf.schema_arrow.names
+        if multiplier_col not in names:
+            raise ValueError(f"Missing multiplier column '{multiplier_col}'")
+        cols = [c for c in cols if c in names]
+        for batch in pf.iter_batches(batch_size=chunksize, columns=cols):
+            x = batch.column(multiplier_col).to_numpy(zero_copy_only=False)
+            sid = pd.Categorical(batch.column(session_col).to_pandas()) if len(cols) > 1 else None
+            yield _checked(x, sid)
+    elif low.endswith(".npy"):
+        arr = np.load(path, mmap_mode="r")
+        fields = arr.dtype.names
+        if fields and multiplier_col not in fields:
+            raise ValueError(f"Missing multiplier column '{multiplier_col}'")
+        for lo in range(0, arr.shape[0], chunksize):
+            block = arr[lo:lo + chunksize]
+            if not fields:
+                # A plain array holds multipliers only
+                yield _checked(block, None)
+                continue
+            sid = pd.Categorical(block[session_col]) if len(cols) > 1 and session_col in fields else None
+            yield _checked(block[multiplier_col], sid)
+    elif low.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        recs = data if isinstance(data, list) else data.get("records", [])
+        for lo in range(0, len(recs), chunksize):
+            df = pd.DataFrame.from_records(recs[lo:lo + chunksize])
+            if multiplier_col not in df.columns:
+                raise ValueError(f"Missing multiplier column '{multiplier_col}'")
+            sid = pd.Categorical(df[session_col]) if len(cols) > 1 and session_col in df.columns else None
+            yield _checked(pd.to_numeric(df[multiplier_col], errors="coerce").to_numpy(), sid)
+    else:
+        raise ValueError("Unsupported file format; use CSV, JSON, JSONL, Parquet, NPY or a .plane store")
@@ -0,0 +1,482 @@
+import hashlib
+import json
+import os
+from itertools import islice
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+from .paths import is_store, stats_fingerprint, merge_manifest_path, merge_keys_path
+from .profiling import span
+
+# Streaming merge with round deduplication. Inputs are read CHUNK_ROWS rows at a time and
+# every round gets a 64-bit key; a round whose key is already known is a duplicate.
+#   session-seq  key = (session id, position of the round in its session within the input).
+#                Suits re-exports of whole sessions under stable session ids.
+#   window       key = hash of the WINDOW consecutive multipliers (rounded to 1e-6) ending at
+#                a round, within one session of one input. Session ids play no part, so
+#                overlapping OCR, manual and web captures of the same play match even when
+#                they are labelled differently. A round is a duplicate when any window that
+#                covers it was seen before, so a fragment that starts mid-session drops its
+#                first rounds too. Deciding that needs the next WINDOW - 1 rounds, so at
+#                chunk boundaries those rounds are written with the following chunk (the
+#                order within each session is kept). A session shorter than WINDOW is
+#                keyed as a whole.
+# Known keys live in a sorted uint64 array (8 bytes per merged round, the only state that
+# grows with the data) saved as <out>.keys.npy. <out>.merge.json records the key settings,
+# the output's fingerprint and each merged input's fingerprint and counts, so an
+# incremental merge appends only new or changed inputs. If the output changed since (or the
+# key settings differ), its keys are rebuilt by streaming over it.
+KEYS = ("none", "session-seq", "window")
+WINDOW = 8
+CHUNK_ROWS = 1 << 18
+QUANTUM = 1e-6
+
+_GOLD = np.uint64(0x9E3779B97F4A7C15)
+_M1 = np.uint64(0xBF58476D1CE4E5B9)
+_M2 = np.uint64(0x94D049BB133111EB)
+_SHORT = np.uint64(0x5D588B656C078965)
+_NAN = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def _mix(z: np.ndarray) -> np.ndarray:
+    # splitmix64 finalizer, elementwise on uint64 (wrapping)
+    z = z + _GOLD
+    z = (z ^ (z >> np.uint64(30))) * _M1
+    z = (z ^ (z >> np.uint64(27))) * _M2
+    return z ^ (z >> np.uint64(31))
+
+
+def _quantize(vals: np.ndarray) -> np.ndarray:
+    ok = np.isfinite(vals)
+    q = np.round(np.where(ok, vals, 0.0) / QUANTUM).astype(np.int64).view(np.uint64)
+    return np.where(ok, q, _NAN)
+
+
+def _session_hash(sid: str) -> np.uint64:
+    return np.uint64(int.from_bytes(hashlib.blake2b(sid.encode("utf-8"), digest_size=8).digest(), "little"))
+
+
+def _window_hashes(q: np.ndarray, k: int) -> np.ndarray:
+    """Hash of q[e-k+1 .. e] for every e >= k-1."""
+    n = q.size - k + 1
+    h = np.zeros(n, dtype=np.uint64)
+    for j in range(k):
+        h = _mix(h ^ q[j:j + n])
+    return h
+
+
+def _short_hash(q: np.ndarray) -> np.ndarray:
+    h = _window_hashes(q, q.size) if q.size else np.zeros(1, dtype=np.uint64)
+    return _mix(h ^ _SHORT ^ np.uint64(q.size))
+
+
+class KeyIndex:
+    """Sorted set of uint64 keys: binary-search lookups, batched sorted inserts."""
+
+    def __init__(self, keys=None):
+        self.keys = np.zeros(0, dtype=np.uint64) if keys is None else np.asarray(keys, dtype=np.uint64)
+
+    def __len__(self):
+        return int(self.keys.size)
+
+    def contains(self, k: np.ndarray) -> np.ndarray:
+        """Membership of each key; much faster for sorted k (the search walks forward)."""
+        if self.keys.size == 0:
+            return np.zeros(k.size, dtype=bool)
+        i = np.minimum(np.searchsorted(self.keys, k), self.keys.size - 1)
+        return self.keys[i] == k
+
+    def add(self, k: np.ndarray) -> None:
+        k = np.unique(k)
+        self.insert(k[~self.contains(k)])
+
+    def insert(self, k: np.ndarray) -> None:
+        """Insert sorted keys known to be new."""
+        if k.size:
+            self.keys = np.insert(self.keys, np.searchsorted(self.keys, k), k)
+
+    @classmethod
+    def load(cls, path: str) -> "KeyIndex":
+        return cls(np.load(path))
+
+    def save(self, path: str) -> None:
+        with open(path + ".tmp", "wb") as f:
+            np.save(f, self.keys)
+        os.replace(path + ".tmp", path)
+
+
+class _Stream:
+    __slots__ = ("n", "tail", "pend")
+
+    def __init__(self):
+        self.n = 0
+        self.tail = np.zeros(0, dtype=np.uint64)
+        # Rounds whose covering windows are not all known yet: [sid, raw, value, dup]
+        self.pend = []
+
+
+class _Deduper:
+    """Keeps per-session state for one input; chunk() returns the rows to write as pieces."""
+
+    def __init__(self, key: str, window: int, index: KeyIndex):
+        self.key = key
+        self.window = window
+        self.index = index
+        self.streams = {}
+        self.duplicates = 0
+
+    def reset(self):
+        self.streams = {}
+        self.duplicates = 0
+
+    def _seen(self, keys: np.ndarray) -> np.ndarray:
+        """True for keys already indexed or repeated earlier in `keys`; adds the rest."""
+        dup = np.ones(keys.size, dtype=bool)
+        if keys.size == 0:
+            return dup
+        uniq, first, inv = np.unique(keys, return_index=True, return_inverse=True)
+        known = self.index.contains(uniq)
+        dup[first] = False
+        dup |= known[inv.ravel()]
+        self.index.insert(uniq[~known])
+        return dup
+
+    def chunk(self, sids: np.ndarray, raw: list, vals: np.ndarray) -> list:
+        if self.key == "none" or not len(raw):
+            return [(sids, raw, vals)]
+        import pandas as pd
+        inv, u = pd.factorize(sids)
+        order = np.argsort(inv, kind="stable")
+        bounds = np.concatenate(([0], np.cumsum(np.bincount(inv, minlength=len(u)))))
+        if self.key == "session-seq":
+            return self._chunk_seq(u.tolist(), inv, order, bounds, sids, raw, vals)
+        return self._chunk_window(u.tolist(), order, bounds, sids, raw, vals)
+
+    def _chunk_seq(self, names, inv, order, bounds, sids, raw, vals):
+        base = np.empty(len(names), dtype=np.uint64)
+        sh = np.empty(len(names), dtype=np.uint64)
+        for j, s in enumerate(names):
+            st = self.streams.get(s)
+            if st is None:
+                st = self.streams[s] = _Stream()
+            base[j] = st.n
+            sh[j] = _session_hash(s)
+            st.n += int(bounds[j + 1] - bounds[j])
+        rank = np.empty(inv.size, dtype=np.uint64)
+        rank[order] = np.arange(inv.size, dtype=np.uint64) - bounds[inv[order]].astype(np.uint64)
+        dup = self._seen(_mix(sh[inv] ^ _mix(base[inv] + rank)))
+        self.duplicates += int(dup.sum())
+        keep = np.flatnonzero(~dup)
+        return [(sids[keep], [raw[i] for i in keep.tolist()], vals[keep])]
+
+    def _chunk_window(self, names, order, bounds, sids, raw, vals):
+        k = self.window
+        q = _quantize(vals)
+        parts = []
+        for j, s in enumerate(names):
+            rows = order[bounds[j]:bounds[j + 1]]
+            st = self.streams.get(s)
+            if st is None:
+                st = self.streams[s] = _Stream()
+            qq = np.concatenate((st.tail, q[rows]))
+            t = st.tail.size
+            # Windows ending in the tail were hashed with the previous chunk
+            lo = max(t, k - 1)
+            h = _window_hashes(qq, k)[lo - (k - 1):] if qq.size >= k else np.zeros(0, dtype=np.uint64)
+            parts.append((st, rows, qq, t, lo, h))
+        seen = self._seen(np.concatenate([p[-1] for p in parts]))
+        pre, keep, off = [], [], 0
+        for st, rows, qq, t, lo, h in parts:
+            hit = seen[off:off + h.size]
+            off += h.size
+            L = qq.size
+            ends = lo + np.flatnonzero(hit)
+            cover = np.zeros(L + 1, dtype=np.int64)
+            np.add.at(cover, ends - k + 1, 1)
+            np.add.at(cover, ends + 1, -1)
+            dup = np.cumsum(cover[:L]) > 0
+            # Rounds up to `last` have every covering window; later ones wait for more rounds
+            last = L - k
+            p = len(st.pend)
+            pend = []
+            for i, r in enumerate(st.pend):
+                pos = t - p + i
+                r[3] = r[3] or bool(dup[pos])
+                if pos > last:
+                    pend.append(r)
+                elif r[3]:
+                    self.duplicates += 1
+                else:
+                    pre.append(r)
+            new_dup = dup[t:]
+            done = np.arange(t, L) <= last
+            self.duplicates += int(np.sum(new_dup & done))
+            keep.append(rows[done & ~new_dup])
+            for i in np.flatnonzero(~done).tolist():
+                r = int(rows[i])
+                pend.append([sids[r], raw[r], vals[r], bool(new_dup[i])])
+            st.pend = pend
+            st.tail = qq[max(L - (k - 1), 0):] if k > 1 else qq[:0]
+            st.n += rows.size
+        keep = np.sort(np.concatenate(keep))
+        return [_piece(pre), (sids[keep], [raw[i] for i in keep.tolist()], vals[keep])]
+
+    def flush(self) -> list:
+        """Settle the rounds still pending at the end of an input."""
+        if self.key != "window":
+            return []
+        short = [st for st in self.streams.values() if st.pend and st.n < self.window]
+        if short:
+            hit = self._seen(np.concatenate([_short_hash(st.tail) for st in short]))
+            for st, h in zip(short, hit.tolist()):
+                for r in st.pend:
+                    r[3] = r[3] or h
+        rows = []
+        for st in self.streams.values():
+            for r in st.pend:
+                if r[3]:
+                    self.duplicates += 1
+                else:
+                    rows.append(r)
+            st.pend = []
+        return [_piece(rows)]
+
+
+def _piece(rows: list):
+    return (np.array([r[0] for r in rows], dtype=str), [r[1] for r in rows],
+            np.array([r[2] for r in rows], dtype=float))
+
+
+def _to_float(raw) -> np.ndarray:
+    try:
+        return np.asarray(raw, dtype=float)
+    except (TypeError, ValueError):
+        out = np.empty(len(raw))
+        for i, v in enumerate(raw):
+            try:
+                out[i] = float(v)
+            except (TypeError, ValueError):
+                out[i] = np.nan
+        return out
+
+
+def _chunks(path: str, rows: int) -> Iterator[tuple]:
+    """(session ids, multipliers as written, multipliers as floats) in chunks of up to `rows`."""
+    if is_store(path):
+        from .store import iter_segments, read_manifest
+        sessions = np.array(read_manifest(path)["sessions"] or [""], dtype=str)
+        for mult, codes in iter_segments(path):
+            for lo in range(0, mult.size, rows):
+                m = np.asarray(mult[lo:lo + rows], dtype=float)
+                yield sessions[codes[lo:lo + rows]], m.tolist(), m
+    elif path.lower().endswith('.csv'):
+        import pandas as pd
+        # Text as written, so merged rows keep the input's formatting
+        with pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=rows) as reader:
+            for df in reader:
+                if 'multiplier' not in df.columns:
+                    raise ValueError(f"Missing 'multiplier' in {path}")
+                raw = df['multiplier'].tolist()
+                sids = (df['session_id'].to_numpy(dtype=str) if 'session_id' in df.columns
+                        else np.full(len(df), os.path.basename(path)))
+                yield sids, raw, _to_float(raw)
+    elif path.lower().endswith('.json'):
+        from .manual import _merge_rows
+        it = _merge_rows([path])
+        while True:
+            batch = list(islice(it, rows))
+            if not batch:
+                return
+            sids, raw = zip(*batch)
+            yield np.array(sids, dtype=str), list(raw), _to_float(raw)
+    else:
+        raise ValueError(f'Unsupported input file: {path}')
+
+
+class _Writer:
+    """Writes merged rows to CSV (in the file's column order when appending), JSON or a store."""
+
+    def __init__(self, out: str, append: bool, rows: int = CHUNK_ROWS):
+        self.out = out
+        self.rows = rows
+        self.f = None
+        self.buf = []
+        self.buffered = 0
+        self.first = True
+        # Appended rows are folded into the stats sidecar if it was up to date
+        self.stats = None
+        if append:
+            from .incremental import appendable_stats
+            self.stats = appendable_stats(out, stats_fingerprint(out))
+        if is_store(out):
+            from .store import append_store_frame
+            if not append:
+                append_store_frame(out, [], [], replace=True)
+        elif out.lower().endswith('.csv'):
+            import csv
+            from .writer import _csv_header, _end_line
+            if append:
+                self.header = _csv_header(out)
+                if not self.header or "multiplier" not in self.header or "session_id" not in self.header:
+                    raise ValueError(f"Can't append to {out}: it needs session_id and multiplier columns")
+                _end_line(out)
+                self.f = open(out, 'a', encoding='utf-8', newline='')
+            else:
+                self.header = ['session_id', 'multiplier']
+                self.f = open(out + '.tmp', 'w', encoding='utf-8', newline='')
+            self.w = csv.writer(self.f, lineterminator=os.linesep)
+            if not append:
+                self.w.writerow(self.header)
+        elif out.lower().endswith('.json'):
+            if append:
+                raise ValueError('Incremental merges append to a CSV or .plane output')
+            self.f = open(out + '.tmp', 'w', encoding='utf-8')
+            self.f.write('[')
+        else:
+            raise ValueError('Unsupported output format; use CSV, JSON or a .plane store')
+
+    def write(self, sids, raw, vals) -> int:
+        n = len(raw)
+        if not n:
+            return 0
+        if self.stats is not None:
+            self.stats.update_arrays(vals, sids)
+        if is_store(self.out):
+            self.buf.append((vals, sids))
+            self.buffered += n
+            if self.buffered >= self.rows:
+                self._flush_store()
+        elif self.out.lower().endswith('.csv'):
+            if self.header == ['session_id', 'multiplier']:
+                self.w.writerows(zip(sids.tolist(), raw))
+            else:
+                cols = [{'session_id': 0, 'multiplier': 1}.get(c) for c in self.header]
+                self.w.writerows([("" if c is None else (s, v)[c]) for c in cols]
+                                 for s, v in zip(sids.tolist(), raw))
+        else:
+            recs = ", ".join(json.dumps({"session_id": s, "multiplier": v})
+                             for s, v in zip(sids.tolist(), vals.tolist()))
+            self.f.write(("" if self.first else ", ") + recs)
+            self.first = False
+        return n
+
+    def _flush_store(self):
+        if self.buf:
+            from .store import append_store_frame
+            append_store_frame(self.out, np.concatenate([v for v, _ in self.buf]),
+                               np.concatenate([s for _, s in self.buf]))
+        self.buf, self.buffered = [], 0
+
+    def close(self, ok: bool = True) -> None:
+        if is_store(self.out):
+            if ok:
+                self._flush_store()
+        else:
+            if self.out.lower().endswith('.json') and ok:
+                self.f.write(']')
+            self.f.close()
+            if self.f.name == self.out + '.tmp':
+                if ok:
+                    os.replace(self.f.name, self.out)
+                else:
+                    os.remove(self.f.name)
+        if ok and self.stats is not None:
+            from .incremental import save_stats
+            save_stats(self.out, self.stats)
+
+
+def _read_manifest(out: str) -> dict:
+    try:
+        with open(merge_manifest_path(out), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _write_manifest(out: str, manifest: dict) -> None:
+    path = merge_manifest_path(out)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path + '.tmp', path)
+
+
+def index_output(out: str, key: str = "window", window: int = WINDOW, rows: int = CHUNK_ROWS) -> KeyIndex:
+    """Keys of every round already in `out`, rebuilt by streaming over it."""
+    dd = _Deduper(key, window, KeyIndex())
+    for chunk in _chunks(out, rows):
+        dd.chunk(*chunk)
+    dd.flush()
+    return dd.index
+
+
+def merge_stream(inputs: List[str], out: str, key: str = "window", window: Optional[int] = None,
+                 incremental: bool = False, rows: int = CHUNK_ROWS) -> dict:
+    """Merge inputs into `out` chunk by chunk, dropping rounds whose key was already seen.
+
+    incremental=True appends to an existing output and skips inputs already merged into it
+    unchanged. Appends through plane.writer wait until the merge is done. Returns totals
+    ("rows", "written", "duplicates", "skipped", "keys") and a per-input list under "inputs".
+    """
+    from .writer import exclusive
+    with exclusive(out):
+        return _merge_stream(inputs, out, key, window, incremental, rows)
+
+
+def _merge_stream(inputs, out, key, window, incremental, rows) -> dict:
+    if key not in KEYS:
+        raise ValueError(f"Unknown dedup key {key!r}; choose from {', '.join(KEYS)}")
+    window = WINDOW if window is None else int(window)
+    if window < 1:
+        raise ValueError("window must be at least 1")
+    out_abs = os.path.abspath(out)
+    fp_out = stats_fingerprint(out)
+    append = incremental and fp_out is not None
+    if is_store(out) and not append and any(os.path.abspath(p) == out_abs for p in inputs):
+        raise ValueError("A .plane output can't also be an input unless merging incrementally")
+    manifest = _read_manifest(out) if append else {}
+    settings = {"key": key, "window": window if key == "window" else None}
+    index = KeyIndex()
+    if key != "none" and append:
+        keys = merge_keys_path(out)
+        fresh = (all(manifest.get(k) == v for k, v in settings.items())
+                 and manifest.get("output") == fp_out and os.path.exists(keys))
+        with span("merge.keys") as sp:
+            index = KeyIndex.load(keys) if fresh else index_output(out, key, window, rows)
+            sp.rows = len(index)
+    done = manifest.get("inputs", {})
+    dd = _Deduper(key, window, index)
+    report = []
+    writer = _Writer(out, append, rows)
+    try:
+        for p in inputs:
+            ap = os.path.abspath(p)
+            fp = stats_fingerprint(p)
+            if append and (ap == out_abs or (ap in done and done[ap]["fingerprint"] == fp)):
+                report.append({"path": p, "rows": 0, "written": 0, "duplicates": 0, "skipped": True})
+                continue
+            dd.reset()
+            n = written = 0
+            with span("merge.input") as sp:
+                for chunk in _chunks(p, rows):
+                    n += len(chunk[1])
+                    for piece in dd.chunk(*chunk):
+                        written += writer.write(*piece)
+                for piece in dd.flush():
+                    written += writer.write(*piece)
+                sp.rows = n
+            done[ap] = {"fingerprint": fp, "rows": n, "duplicates": dd.duplicates}
+            report.append({"path": p, "rows": n, "written": written, "duplicates": dd.duplicates, "skipped": False})
+    except BaseException:
+        writer.close(ok=False)
+        raise
+    writer.close()
+    keys = merge_keys_path(out)
+    if key != "none":
+        index.save(keys)
+    elif os.path.exists(keys):
+        os.remove(keys)
+    _write_manifest(out, {"version": 1, **settings, "output": stats_fingerprint(out), "inputs": done})
+    return {"rows": sum(r["rows"] for r in report), "written": sum(r["written"] for r in report),
+            "duplicates": sum(r["duplicates"] for r in report), "skipped": sum(r["skipped"] for r in report),
+            "keys": len(index), "inputs": report}
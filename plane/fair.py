@@ -1,6 +1,15 @@
 import hmac
 import hashlib
-from typing import Iterable, List
+import os
+from collections import deque
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# Nonces per work unit for the bulk engine, and the range size below which a pool isn't worth it
+BLOCK_ROUNDS = 1 << 18
+PARALLEL_MIN_ROUNDS = 1 << 20
+# Ranges up to this many rounds use the scalar path: the same values, and numpy (imported
+# inside the bulk functions) is never loaded for short runs
+SCALAR_MAX_ROUNDS = 4096
 
 
 def hmac_sha256_hex(server_seed: str, client_seed: str, nonce: int) -> str:
@@ -17,9 +26,9 @@ def hash_to_uniform(hex_digest: str) -> float:
     return num / denom
 
 
-def crash_multiplier(server_seed: str, client_seed: str, nonce: int, house_edge: float = 0.99) -> float:
-    h = hmac_sha256_hex(server_seed, client_seed, nonce)
-    x = hash_to_uniform(h)
+def multiplier_from_hex(hex_digest: str, house_edge: float = 0.99) -> float:
+    """Crash multiplier for a round's hex digest (shared by the HMAC and hash-chain schemes)."""
+    x = hash_to_uniform(hex_digest)
     # Avoid division by zero; clamp x
     x = min(max(x, 1e-12), 1 - 1e-12)
     R = house_edge / (1.0 - x)
@@ -27,8 +36,114 @@ def crash_multiplier(server_seed: str, client_seed: str, nonce: int, house_edge:
     return max(1.0, R)
 
 
-def sequence(server_seed: str, client_seed: str, start_nonce: int, rounds: int, house_edge: float = 0.99) -> List[float]:
-    out: List[float] = []
-    for k in range(rounds):
-        out.append(crash_multiplier(server_seed, client_seed, start_nonce + k, house_edge))
+def crash_multiplier(server_seed: str, client_seed: str, nonce: int, house_edge: float = 0.99) -> float:
+    return multiplier_from_hex(hmac_sha256_hex(server_seed, client_seed, nonce), house_edge)
+
+
+def multipliers_from_digests(raw: bytes, house_edge: float = 0.99,
+                             out: "Optional[np.ndarray]" = None) -> "np.ndarray":
+    """multiplier_from_hex over concatenated 32-byte digests, vectorized and bit-identical."""
+    import numpy as np
+    d = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 32)
+    if out is None:
+        out = np.empty(d.shape[0], dtype=np.float64)
+    # The first 13 hex chars are the top 52 bits of the first 8 digest bytes
+    head = d[:, :8].copy().view(">u8").ravel() >> np.uint64(12)
+    x = head.astype(np.float64) / float(16 ** 13)
+    np.clip(x, 1e-12, 1 - 1e-12, out=x)
+    np.divide(house_edge, 1.0 - x, out=out)
+    np.maximum(out, 1.0, out=out)
+    return out
+
+
+def crash_block(server_seed: str, client_seed: str, start_nonce: int, rounds: int,
+                house_edge: float = 0.99, out: "Optional[np.ndarray]" = None) -> "np.ndarray":
+    """Bulk crash_multiplier over consecutive nonces, bit-identical to the scalar path."""
+    # Key the HMAC once and copy the keyed state per nonce
+    base = hmac.new(server_seed.encode("utf-8"), digestmod=hashlib.sha256)
+    prefix = client_seed.encode("utf-8")
+
+    def digest(nonce):
+        h = base.copy()
+        h.update(prefix + b"%d" % nonce)
+        return h.digest()
+
+    raw = b"".join([digest(n) for n in range(start_nonce, start_nonce + rounds)])
+    return multipliers_from_digests(raw, house_edge, out)
+
+
+def _crash_block_job(args):
+    return crash_block(*args)
+
+
+def iter_sequence_blocks(server_seed: str, client_seed: str, start_nonce: int, rounds: int,
+                         house_edge: float = 0.99, workers: Optional[int] = None,
+                         block: int = BLOCK_ROUNDS) -> "Iterator[Tuple[int, np.ndarray]]":
+    """Yield (offset, multipliers) blocks in nonce order, spreading large ranges across processes."""
+    jobs = [(server_seed, client_seed, start_nonce + lo, min(block, rounds - lo), house_edge)
+            for lo in range(0, rounds, block)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) == 1 or rounds < PARALLEL_MIN_ROUNDS:
+        for lo, job in zip(range(0, rounds, block), jobs):
+            yield lo, _crash_block_job(job)
+        return
+    # Keep a bounded number of blocks in flight so streaming callers don't buffer the whole range
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        pending = deque()
+        it = iter(zip(range(0, rounds, block), jobs))
+        for lo, job in it:
+            pending.append((lo, ex.submit(_crash_block_job, job)))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            lo, fut = pending.popleft()
+            nxt = next(it, None)
+            if nxt is not None:
+                pending.append((nxt[0], ex.submit(_crash_block_job, nxt[1])))
+            yield lo, fut.result()
+
+
+def sequence_array(server_seed: str, client_seed: str, start_nonce: int, rounds: int,
+                   house_edge: float = 0.99, workers: Optional[int] = None) -> "np.ndarray":
+    import numpy as np
+    out = np.empty(rounds, dtype=np.float64)
+    for lo, vals in iter_sequence_blocks(server_seed, client_seed, start_nonce, rounds, house_edge, workers):
+        out[lo:lo + vals.size] = vals
     return out
+
+
+def sequence(server_seed: str, client_seed: str, start_nonce: int, rounds: int, house_edge: float = 0.99,
+             workers: Optional[int] = None) -> List[float]:
+    if rounds <= SCALAR_MAX_ROUNDS:
+        return [crash_multiplier(server_seed, client_seed, n, house_edge)
+                for n in range(start_nonce, start_nonce + rounds)]
+    return sequence_array(server_seed, client_seed, start_nonce, rounds, house_edge, workers).tolist()
+
+
+def write_sequence(path: str, server_seed: str, client_seed: str, start_nonce: int, rounds: int,
+                   house_edge: float = 0.99, workers: Optional[int] = None) -> int:
+    """Stream a nonce range to CSV (nonce,multiplier), .npy, or raw little-endian float64 (.bin/.f64)."""
+    low = path.lower()
+    blocks = iter_sequence_blocks(server_seed, client_seed, start_nonce, rounds, house_edge, workers)
+    if low.endswith(".csv"):
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write("nonce,multiplier\n")
+            for lo, vals in blocks:
+                n0 = start_nonce + lo
+                # repr() round-trips the float64 exactly
+                f.write("".join([f"{n0 + i},{v!r}\n" for i, v in enumerate(vals.tolist())]))
+    elif low.endswith(".npy"):
+        import numpy as np
+        with open(path, "wb") as f:
+            header = {"descr": "<f8", "fortran_order": False, "shape": (rounds,)}
+            np.lib.format.write_array_header_1_0(f, header)
+            for _, vals in blocks:
+                f.write(vals.astype("<f8", copy=False).tobytes())
+    elif low.endswith((".bin", ".f64")):
+        with open(path, "wb") as f:
+            for _, vals in blocks:
+                f.write(vals.astype("<f8", copy=False).tobytes())
+    else:
+        raise ValueError("Unsupported output format; use CSV, NPY or BIN")
+    return rounds
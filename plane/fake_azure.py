@@ -0,0 +1,177 @@
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+# Local stand-in for the Azure Read API (v3.2) so the async OCR backend can be tested and
+# benchmarked offline. Each analyze call completes after `latency` (+ uniform jitter)
+# seconds. Beyond `capacity` unfinished operations the server answers 429 with Retry-After.
+# Results are fixed `text`, or a few multipliers derived from the image bytes. A finished
+# operation is dropped once its result has been read, and one nobody polls is dropped
+# OP_TTL seconds after it finished. The default port differs from `plane serve`'s.
+DEFAULT_PORT = 8766
+OP_TTL = 300.0
+ANALYZE = "/vision/v3.2/read/analyze"
+RESULTS = "/vision/v3.2/read/analyzeResults/"
+
+
+def _fake_text(data: bytes) -> str:
+    h = hashlib.sha256(data).digest()
+    return "\n".join(f"{1 + h[i] / 32:.2f}x" for i in range(5))
+
+
+class FakeReadServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr, latency=0.5, jitter=0.0, capacity=64, text: Optional[str] = None, key=None):
+        super().__init__(addr, _Handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.capacity = capacity
+        self.text = text
+        self.key = key
+        self.ops = {}
+        self.lock = threading.Lock()
+        self.stats = {"submitted": 0, "polls": 0, "throttled": 0, "max_in_flight": 0}
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def in_flight(self, now: float) -> int:
+        return sum(1 for ready, _ in self.ops.values() if ready > now)
+
+    def expire(self, now: float) -> None:
+        for op in [op for op, (ready, _) in self.ops.items() if ready + OP_TTL < now]:
+            del self.ops[op]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeReadServer
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, code, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorized(self) -> bool:
+        if self.server.key and self.headers.get("Ocp-Apim-Subscription-Key") != self.server.key:
+            self._json(401, {"error": {"code": "401", "message": "Access denied"}})
+            return False
+        return True
+
+    def do_POST(self):
+        if self.path != ANALYZE:
+            return self._json(404, {"error": "not found"})
+        if not self._authorized():
+            return
+        data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        srv = self.server
+        now = time.monotonic()
+        with srv.lock:
+            srv.expire(now)
+            if srv.in_flight(now) >= srv.capacity:
+                srv.stats["throttled"] += 1
+                return self._json(429, {"error": {"code": "429"}}, {"Retry-After": "1"})
+            op = uuid.uuid4().hex
+            ready = now + srv.latency + random.uniform(0, srv.jitter)
+            srv.ops[op] = (ready, srv.text if srv.text is not None else _fake_text(data))
+            srv.stats["submitted"] += 1
+            srv.stats["max_in_flight"] = max(srv.stats["max_in_flight"], srv.in_flight(now))
+        self.send_response(202)
+        self.send_header("Operation-Location", srv.endpoint + RESULTS + op)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        srv = self.server
+        if self.path == "/stats":
+            with srv.lock:
+                return self._json(200, dict(srv.stats))
+        if not self.path.startswith(RESULTS):
+            return self._json(404, {"error": "not found"})
+        if not self._authorized():
+            return
+        op = self.path[len(RESULTS):]
+        now = time.monotonic()
+        with srv.lock:
+            srv.stats["polls"] += 1
+            entry = srv.ops.get(op)
+            if entry is not None and now >= entry[0]:
+                del srv.ops[op]
+        if entry is None:
+            return self._json(404, {"error": "unknown operation"})
+        ready, text = entry
+        if now < ready:
+            return self._json(200, {"status": "running"})
+        lines = [{"text": t} for t in text.split("\n") if t]
+        self._json(200, {"status": "succeeded", "analyzeResult": {"readResults": [{"page": 1, "lines": lines}]}})
+
+
+def start_server(host="127.0.0.1", port=0, **kwargs) -> FakeReadServer:
+    """Start a FakeReadServer on a background thread; port=0 picks a free port."""
+    srv = FakeReadServer((host, port), **kwargs)
+    threading.Thread(target=srv.serve_forever, name="fake-azure", daemon=True).start()
+    return srv
+
+
+def benchmark(n_images=64, in_flight=8, latency=0.5, jitter=0.1, capacity=64) -> dict:
+    """Read n synthetic images through the async backend against a local fake server."""
+    import asyncio
+    from .azure_async import AsyncAzureReader
+
+    srv = start_server(latency=latency, jitter=jitter, capacity=capacity, key="fake")
+    images = [f"image-{i}".encode("utf-8") for i in range(n_images)]
+
+    async def run():
+        async with AsyncAzureReader(srv.endpoint, "fake", max_in_flight=in_flight) as reader:
+            return await reader.read_many(images)
+
+    t0 = time.perf_counter()
+    texts = asyncio.run(run())
+    elapsed = time.perf_counter() - t0
+    srv.shutdown()
+    return {"images": n_images, "in_flight": in_flight, "latency": latency, "seconds": elapsed,
+            "images_per_s": n_images / elapsed, "ok": sum(1 for t in texts if t), **srv.stats}
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Local fake Azure Read API server for offline OCR tests")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p.add_argument("--latency", type=float, default=0.5, help="Seconds until an operation succeeds")
+    p.add_argument("--jitter", type=float, default=0.0, help="Extra uniform random latency (seconds)")
+    p.add_argument("--capacity", type=int, default=64, help="Unfinished operations before answering 429")
+    p.add_argument("--text", default=None, help="Fixed text to return (default: derived from image bytes)")
+    p.add_argument("--key", default=None, help="Require this subscription key")
+    p.add_argument("--bench", type=int, default=0, metavar="N", help="Benchmark the async backend on N images and exit")
+    p.add_argument("--in-flight", type=int, default=8, help="Reader in-flight limit for --bench")
+    args = p.parse_args(argv)
+    if args.bench:
+        print(json.dumps(benchmark(args.bench, args.in_flight, args.latency, args.jitter, args.capacity)))
+        return
+    srv = FakeReadServer((args.host, args.port), latency=args.latency, jitter=args.jitter,
+                         capacity=args.capacity, text=args.text, key=args.key)
+    print(f"Fake Azure Read API on {srv.endpoint} (set AZURE_CV_ENDPOINT to this)")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,60 +1,399 @@
+import time
+
 import numpy as np
-from scipy import stats
+from scipy import optimize, special, stats
+
+from .profiling import span
+
+
+# Closed-form fits are split into "from sufficient statistics" and "from data" so the
+# incremental path (plane.incremental) reuses them. Exponential and Pareto come out the same
+# as from a full scan; the truncated-exponential mixture's tail quantile comes from a
+# log-histogram there, so its cap q is only accurate to a bin (~0.4%).
+
+# Survival functions in parameter form; params may be arrays that broadcast against t
+
+def exponential_survival(t, lam):
+    return np.exp(-lam * np.maximum(t-1, 0))
+
+
+def pareto_survival(t, alpha):
+    return np.where(t>=1, np.maximum(t, 1)**(-alpha), 1.0)
+
+
+def trunc_exp_survival(t, lam, p, q):
+    t = np.asarray(t)
+    base = np.exp(-lam * np.maximum(t-1, 0))
+    cap = np.where(t<=q, 1.0, np.exp(- (t - q)))
+    return (1-p)*base + p*cap
+
+
+def _exponential_fit(lam, ll):
+    return {"name": "exponential_shift1", "params": {"lambda": lam}, "ll": ll, "k": 1, "aic": 2*1 - 2*ll,
+            "survival": lambda t: exponential_survival(t, lam),
+            "rng": lambda: (lambda size=None: 1 + np.random.exponential(scale=1/lam, size=size)),
+            "sample": lambda rng, size=None: 1 + rng.exponential(scale=1/lam, size=size)}
+
+
+def fit_exponential_stats(n, sum_y):
+    # MLE for X = 1 + Y, Y ~ Exp(lambda): lambda = n / sum(y)
+    lam = 1.0 / (sum_y / n + 1e-12)
+    # log-likelihood for shifted exponential
+    ll = n*np.log(lam) - lam*sum_y
+    return _exponential_fit(lam, ll)
 
 
 def fit_exponential(x):
     # Support x>=1; model X = 1 + Y where Y ~ Exp(lambda)
     y = np.asarray(x) - 1.0
     y = y[y >= 0]
-    lam = 1.0 / (np.mean(y) + 1e-12)
-    # log-likelihood for shifted exponential
-    ll = np.sum(stats.expon(scale=1/lam).logpdf(y))
-    aic = 2*1 - 2*ll
-    return {"name": "exponential_shift1", "params": {"lambda": lam}, "ll": ll, "aic": aic,
-            "survival": lambda t: np.exp(-lam * np.maximum(t-1, 0)),
-            "rng": lambda: (lambda size=None: 1 + np.random.exponential(scale=1/lam, size=size))}
+    return fit_exponential_stats(y.size, np.sum(y))
+
+
+def _pareto_fit(alpha, ll):
+    return {"name": "pareto_xm1", "params": {"alpha": alpha}, "ll": ll, "k": 1, "aic": 2*1 - 2*ll,
+            "survival": lambda t: pareto_survival(t, alpha),
+            "rng": lambda: (lambda size=None: stats.pareto(b=alpha, scale=1).rvs(size=size)),
+            # numpy's pareto is Lomax (xm=0); shifting by 1 gives xm=1
+            "sample": lambda rng, size=None: 1 + rng.pareto(alpha, size=size)}
+
+
+def fit_pareto_stats(n, sum_log):
+    # MLE for alpha with xm=1: alpha_hat = n / sum(log(z))
+    alpha = n / sum_log
+    # log-likelihood for xm=1
+    ll = n*np.log(alpha) - (alpha + 1)*sum_log
+    return _pareto_fit(alpha, ll)
 
 
 def fit_pareto(x):
     # Standard Pareto with xm=1, tail S(t) = (1/t)^alpha for t>=1
     z = np.asarray(x)
     z = z[z >= 1]
-    # MLE for alpha with xm=1: alpha_hat = n / sum(log(z))
-    alpha = z.size / np.sum(np.log(z))
-    # log-likelihood for xm=1
-    ll = np.sum(stats.pareto(b=alpha, scale=1).logpdf(z))
-    aic = 2*1 - 2*ll
-    return {"name": "pareto_xm1", "params": {"alpha": alpha}, "ll": ll, "aic": aic,
-            "survival": lambda t: (np.where(t>=1, t**(-alpha), 1.0)),
-            "rng": lambda: (lambda size=None: stats.pareto(b=alpha, scale=1).rvs(size=size))}
+    return fit_pareto_stats(z.size, np.sum(np.log(z)))
+
+
+def _trunc_exp_fit(lam, p, q, ll):
+    def survival(t):
+        return trunc_exp_survival(t, lam, p, q)
+
+    def sample(rng, size=None):
+        # Mixture matching trunc_exp_survival: 1+Exp(lambda) w.p. 1-p, q+Exp(1) w.p. p
+        x = 1 + rng.exponential(scale=1/lam, size=size)
+        tail = rng.random(size) < p
+        return np.where(tail, q + rng.exponential(size=size), x)
+    # ll is the base exponential's, not this mixture's likelihood: its AIC is not comparable
+    # with the other models, so best_model_by_aic skips it (pseudo_ll)
+    return {"name": "truncated_exponential_mixture", "params": {"lambda": lam, "p": p, "q": float(q)}, "ll": ll,
+            "k": 2, "aic": 2*2 - 2*ll, "pseudo_ll": True,
+            "survival": survival,
+            "rng": lambda: (lambda size=None: 1 + np.random.exponential(scale=1/lam, size=size)),
+            "sample": sample}
+
+
+def fit_trunc_exp_stats(n, sum_y, q, p):
+    # Truncated exponential tail beyond 1 with upper soft truncation via mixture;
+    # lambda is the shifted-exponential MLE, (q, p) come from the tail of the sample
+    lam = 1.0 / (sum_y / n + 1e-12)
+    # pseudo log-likelihood using base model
+    ll = n*np.log(lam) - lam*sum_y
+    return _trunc_exp_fit(lam, p, q, ll)
 
 
 def fit_trunc_exp(x):
-    # Truncated exponential tail beyond 1 with upper soft truncation via mixture
     # Simple 2-parameter: lambda and p for mixture of Exp and point mass near tail cap L
     z = np.asarray(x)
     z = z[z >= 1]
-    y = z - 1
-    lam = 1.0 / (np.mean(y) + 1e-12)
     # Estimate p as fraction of extreme events beyond quantile q
     q = np.quantile(z, 0.99) if z.size > 50 else np.max(z)
     p = np.mean(z >= q) * 0.5
-    def survival(t):
-        t = np.asarray(t)
-        base = np.exp(-lam * np.maximum(t-1, 0))
-        cap = np.where(t<=q, 1.0, np.exp(- (t - q)))
-        return (1-p)*base + p*cap
-    # pseudo log-likelihood using base model
-    ll = np.sum(stats.expon(scale=1/lam).logpdf(y))
-    aic = 2*2 - 2*ll
-    return {"name": "truncated_exponential_mixture", "params": {"lambda": lam, "p": p, "q": float(q)}, "ll": ll, "aic": aic,
-            "survival": survival,
-            "rng": lambda: (lambda size=None: 1 + np.random.exponential(scale=1/lam, size=size))}
+    return fit_trunc_exp_stats(z.size, np.sum(z - 1), q, p)
+
+
+# Maximum-likelihood models without closed forms. Log-likelihoods are vectorized over the
+# sample (or reduced to sufficient statistics), optimized with analytic gradients and
+# warm-started from the closed-form fits above.
+
+def lognormal_survival(t, mu, sigma):
+    # log X ~ Normal(mu, sigma) truncated to log X >= 0
+    lt = np.log(np.maximum(t, 1))
+    return np.exp(special.log_ndtr((mu - lt) / sigma) - special.log_ndtr(mu / sigma))
+
+
+def _lognormal_fit(mu, sigma, ll):
+    def sample(rng, size=None):
+        # Inverse CDF of the truncated normal on the log scale
+        z = special.ndtri(rng.random(size) * special.ndtr(mu / sigma))
+        return np.exp(mu - sigma * z)
+    return {"name": "lognormal_trunc1", "params": {"mu": mu, "sigma": sigma}, "ll": ll, "k": 2, "aic": 2*2 - 2*ll,
+            "survival": lambda t: lognormal_survival(t, mu, sigma),
+            "rng": lambda: (lambda size=None: sample(np.random.default_rng(), size)),
+            "sample": sample}
+
+
+def _lognormal_nll(theta, n, s1, s2):
+    # theta = (mu, log sigma); s1 = sum(log x), s2 = sum(log x ** 2)
+    mu, tau = theta
+    sigma = np.exp(tau)
+    a = mu / sigma
+    sq = s2 - 2*mu*s1 + n*mu*mu
+    log_phi = special.log_ndtr(a)
+    ll = -s1 - n*tau - 0.5*n*np.log(2*np.pi) - sq / (2*sigma**2) - n*log_phi
+    # Inverse Mills ratio phi(a)/Phi(a), computed in log space for large negative a
+    mills = np.exp(-0.5*a*a - 0.5*np.log(2*np.pi) - log_phi)
+    d_mu = (s1 - n*mu) / sigma**2 - n*mills / sigma
+    d_tau = -n + sq / sigma**2 + n*mills*a
+    return -ll, -np.array([d_mu, d_tau])
+
+
+def fit_lognormal(x):
+    z = np.asarray(x)
+    z = z[z >= 1]
+    if z.size < 2:
+        raise ValueError("lognormal fit needs at least 2 values")
+    lz = np.log(z)
+    n, s1, s2 = z.size, lz.sum(), (lz*lz).sum()
+    # Warm start: moments of log x, ignoring the truncation
+    sd = max(np.sqrt(max(s2/n - (s1/n)**2, 0.0)), 1e-3)
+    bounds = np.array([(-50.0, 50.0), (-10.0, 5.0)])
+    res = optimize.minimize(_lognormal_nll, [s1/n, np.log(sd)], args=(n, s1, s2), jac=True,
+                            method="L-BFGS-B", bounds=bounds)
+    # On Pareto-like data the likelihood keeps rising as mu -> -inf and L-BFGS stops on, or
+    # short of, the bound. Such a point is no maximum, so the model is left out rather than
+    # ranked: either a parameter sits on its bound or the profile likelihood at a mu bound
+    # is at least as good.
+    def profile(mu):
+        return optimize.minimize_scalar(lambda t: _lognormal_nll([mu, t], n, s1, s2)[0],
+                                        bounds=tuple(bounds[1]), method="bounded").fun
+    if (np.any(np.isclose(res.x[:, None], bounds, rtol=0, atol=1e-6))
+            or min(profile(bounds[0, 0]), profile(bounds[0, 1])) <= res.fun + 1e-9 * (1 + abs(res.fun))):
+        raise ValueError(f"lognormal fit runs into its parameter bounds (mu={res.x[0]:.3g}, "
+                         f"log sigma={res.x[1]:.3g}); no interior maximum")
+    mu, tau = res.x
+    return _lognormal_fit(float(mu), float(np.exp(tau)), float(-res.fun))
+
+
+def _gpd_sf(y, xi, beta):
+    # Generalized Pareto survival of excesses y >= 0; xi -> 0 is the exponential limit
+    xi = np.where(np.abs(xi) < 1e-12, 1e-12, xi)
+    w = 1 + xi * y / beta
+    return np.where(w > 0, np.exp(-np.log(np.maximum(w, 1e-300)) / xi), 0.0)
+
+
+def gpd_splice_survival(t, lam, u, zeta, xi, beta):
+    # Shifted exponential body on [1, u] holding mass 1 - zeta, GPD excesses above u
+    t = np.asarray(t, dtype=float)
+    c = u - 1
+    body = 1 - (1 - zeta) * np.expm1(-lam * np.clip(t - 1, 0, c)) / np.expm1(-lam * c)
+    return np.where(t < u, body, zeta * _gpd_sf(np.maximum(t - u, 0), xi, beta))
+
+
+def _gpd_splice_fit(lam, u, zeta, xi, beta, ll):
+    def sample(rng, size=None):
+        v = rng.random(size)
+        body = 1 - np.log1p(v * np.expm1(-lam * (u - 1))) / lam
+        w = rng.random(size)
+        xs = xi if abs(xi) >= 1e-12 else 1e-12
+        tail = u + beta * np.expm1(-xs * np.log1p(-w)) / xs
+        return np.where(rng.random(size) < zeta, tail, body)
+    # The threshold u is set from a sample quantile, not estimated, so it isn't counted in k
+    return {"name": "exp_gpd_splice", "params": {"lambda": lam, "u": u, "zeta": zeta, "xi": xi, "beta": beta},
+            "ll": ll, "k": 4, "aic": 2*4 - 2*ll,
+            "survival": lambda t: gpd_splice_survival(t, lam, u, zeta, xi, beta),
+            "rng": lambda: (lambda size=None: sample(np.random.default_rng(), size)),
+            "sample": sample}
+
+
+def _trunc_body_nll(theta, nb, sy, c):
+    # Exponential on [0, c]: ll = nb log lam - lam sum(y) - nb log(1 - exp(-lam c)); theta = log lam
+    lam = np.exp(theta[0])
+    ll = nb*np.log(lam) - lam*sy - nb*np.log(-np.expm1(-lam*c))
+    d_lam = nb/lam - sy - nb*c / np.expm1(lam*c)
+    return -ll, -np.array([lam * d_lam])
+
+
+def _gpd_nll(theta, y):
+    # theta = (xi, log beta)
+    xi, tb = theta
+    if abs(xi) < 1e-7:
+        xi = 1e-7 if xi >= 0 else -1e-7
+    s = y / np.exp(tb)
+    # Outside the support (xi < 0, y beyond -beta/xi) clip w: for -1 < xi < 0 that makes the
+    # nll huge but finite, which keeps the line search working
+    w = np.maximum(1 + xi*s, 1e-12)
+    lw = np.log(w)
+    sw = (s / w).sum()
+    ll = -y.size*tb - (1 + 1/xi) * lw.sum()
+    d_xi = lw.sum() / xi**2 - (1 + 1/xi) * sw
+    d_tb = -y.size + (1 + xi) * sw
+    return -ll, -np.array([d_xi, d_tb])
+
+
+def fit_gpd_splice(x, q=0.9):
+    z = np.asarray(x)
+    z = z[z >= 1]
+    u = float(np.quantile(z, q)) if z.size else 1.0
+    if u <= 1:
+        raise ValueError("exp/GPD splice needs a threshold above 1")
+    body = z[z <= u] - 1
+    tail = z[z > u] - u
+    n, m, nb, c = z.size, tail.size, body.size, u - 1
+    # Body: truncated exponential, warm-started at the untruncated MLE
+    sy = body.sum()
+    res = optimize.minimize(_trunc_body_nll, [np.log(nb / (sy + 1e-12))], args=(nb, sy, c), jac=True,
+                            method="L-BFGS-B", bounds=[(-30, 30)])
+    lam, ll = float(np.exp(res.x[0])), float(-res.fun)
+    zeta = m / n
+    if m:
+        ll += m*np.log(zeta)
+        # Tail: GPD warm-started at its exponential limit (xi = 0, beta = mean excess)
+        b0 = np.log(tail.mean())
+        res = optimize.minimize(_gpd_nll, [0.0, b0], args=(tail,), jac=True, method="L-BFGS-B",
+                                bounds=[(-0.9, 5.0), (b0 - 20, b0 + 20)])
+        xi, beta = float(res.x[0]), float(np.exp(res.x[1]))
+        ll += float(-res.fun)
+    else:
+        xi, beta = 0.0, 1.0
+    if nb < n:
+        ll += nb*np.log(1 - zeta)
+    return _gpd_splice_fit(lam, u, zeta, xi, beta, float(ll))
+
+
+def exp_pareto_mixture_survival(t, w, lam, alpha):
+    return w * exponential_survival(t, lam) + (1 - w) * pareto_survival(t, alpha)
+
+
+def _exp_pareto_mixture_fit(w, lam, alpha, ll):
+    def sample(rng, size=None):
+        e = 1 + rng.exponential(scale=1/lam, size=size)
+        pa = 1 + rng.pareto(alpha, size=size)
+        return np.where(rng.random(size) < w, e, pa)
+    return {"name": "exp_pareto_mixture", "params": {"w": w, "lambda": lam, "alpha": alpha}, "ll": ll, "k": 3,
+            "aic": 2*3 - 2*ll,
+            "survival": lambda t: exp_pareto_mixture_survival(t, w, lam, alpha),
+            "rng": lambda: (lambda size=None: sample(np.random.default_rng(), size)),
+            "sample": sample}
+
+
+def _mixture_ll_terms(w, lam, alpha, y, lx):
+    l1 = np.log(w) + np.log(lam) - lam*y
+    l2 = np.log1p(-w) + np.log(alpha) - (alpha + 1)*lx
+    return l1, np.logaddexp(l1, l2)
+
+
+def _mixture_nll(theta, y, lx, cnt):
+    # theta = (logit w, log lambda, log alpha)
+    w = special.expit(theta[0])
+    lam, alpha = np.exp(theta[1]), np.exp(theta[2])
+    l1, lse = _mixture_ll_terms(w, lam, alpha, y, lx)
+    r = np.exp(l1 - lse)
+    grad = np.array([cnt @ (r - w), cnt @ (r * (1 - lam*y)), cnt @ ((1 - r) * (1 - alpha*lx))])
+    return -float(cnt @ lse), -grad
+
+
+def fit_exp_pareto_mixture(x, tol=1e-8, em_iter=30):
+    """w * (1 + Exp(lambda)) + (1 - w) * Pareto(alpha, xm=1) over the unique values.
+
+    EM from the closed-form single-component fits gets close cheaply; L-BFGS on the exact
+    log-likelihood with its analytic gradient then finishes what EM converges to slowly.
+    """
+    z = np.asarray(x)
+    z = z[z >= 1]
+    if z.size < 10:
+        raise ValueError("exp/Pareto mixture needs at least 10 values")
+    xu, cnt = np.unique(z, return_counts=True)
+    y, lx, n = xu - 1, np.log(xu), z.size
+    lam = n / (cnt @ y + 1e-12)
+    alpha = n / (cnt @ lx + 1e-12)
+    w = 0.5
+    prev = -np.inf
+    for _ in range(em_iter):
+        l1, lse = _mixture_ll_terms(w, lam, alpha, y, lx)
+        ll = float(cnt @ lse)
+        if ll - prev <= tol * abs(ll):
+            break
+        prev = ll
+        rc = cnt * np.exp(l1 - lse)
+        sc = cnt - rc
+        w = float(np.clip(rc.sum() / n, 1e-9, 1 - 1e-9))
+        lam = rc.sum() / (rc @ y + 1e-12)
+        alpha = sc.sum() / (sc @ lx + 1e-12)
+    res = optimize.minimize(_mixture_nll, [special.logit(w), np.log(lam), np.log(alpha)], args=(y, lx, cnt),
+                            jac=True, method="L-BFGS-B", bounds=[(-20, 20), (-30, 30), (-30, 30)])
+    w, lam, alpha = float(special.expit(res.x[0])), float(np.exp(res.x[1])), float(np.exp(res.x[2]))
+    return _exp_pareto_mixture_fit(w, lam, alpha, float(-res.fun))
+
+
+# Model registry: name -> number of free parameters, fit from data, and a builder that
+# rebuilds the fit dict (with its survival/rng/sample callables) from name, params and ll
+MODELS = {
+    "exponential_shift1": {"k": 1, "fit": fit_exponential,
+                           "build": lambda p, ll: _exponential_fit(p["lambda"], ll)},
+    "pareto_xm1": {"k": 1, "fit": fit_pareto,
+                   "build": lambda p, ll: _pareto_fit(p["alpha"], ll)},
+    "truncated_exponential_mixture": {"k": 2, "fit": fit_trunc_exp,
+                                      "build": lambda p, ll: _trunc_exp_fit(p["lambda"], p["p"], p["q"], ll)},
+    "lognormal_trunc1": {"k": 2, "fit": fit_lognormal,
+                         "build": lambda p, ll: _lognormal_fit(p["mu"], p["sigma"], ll)},
+    "exp_gpd_splice": {"k": 4, "fit": fit_gpd_splice,
+                       "build": lambda p, ll: _gpd_splice_fit(p["lambda"], p["u"], p["zeta"], p["xi"], p["beta"], ll)},
+    "exp_pareto_mixture": {"k": 3, "fit": fit_exp_pareto_mixture,
+                           "build": lambda p, ll: _exp_pareto_mixture_fit(p["w"], p["lambda"], p["alpha"], ll)},
+}
+
+
+def register_model(name, fit, build, k):
+    """Add a model: fit(x) -> fit dict, build(params, ll) -> the same dict, k free parameters.
+
+    The fit dict needs name, params, ll and survival; k and aic are filled in if missing.
+    """
+    MODELS[name] = {"k": k, "fit": fit, "build": build}
+
+
+def _complete(f, spec):
+    f.setdefault("k", spec["k"])
+    f.setdefault("aic", 2 * f["k"] - 2 * f["ll"])
+    return f
+
+
+def _model(name):
+    try:
+        return MODELS[name]
+    except KeyError:
+        raise ValueError(f"Unknown model {name!r}; choose from {', '.join(MODELS)}") from None
+
+
+def fit_models(x, models=None):
+    """Fit each named model (default: all registered) and record its wall time in fit["fit_time"].
+
+    Models that need more data than x has are left out.
+    """
+    z = np.asarray(x, dtype=float)
+    z = z[z >= 1]
+    fits = []
+    # The registry is read per call so models registered after import are fitted too
+    for name in models or tuple(MODELS):
+        spec = _model(name)
+        t0 = time.perf_counter()
+        try:
+            with span(name, rows=z.size):
+                f = spec["fit"](z)
+        except ValueError:
+            continue
+        f["fit_time"] = time.perf_counter() - t0
+        fits.append(_complete(f, spec))
+    return fits
 
 
-def fit_models(x):
-    return [fit_exponential(x), fit_pareto(x), fit_trunc_exp(x)]
+def make_fit(name, params, ll, aic=None):
+    spec = _model(name)
+    f = _complete(spec["build"](params, ll), spec)
+    if aic is not None:
+        f["aic"] = aic
+    return f
 
 
 def best_model_by_aic(fits):
-    return sorted(fits, key=lambda d: d["aic"])[0]
+    # Models with a pseudo log-likelihood only win when nothing else was fitted
+    real = [f for f in fits if not f.get("pseudo_ll")]
+    return sorted(real or fits, key=lambda d: d["aic"])[0]
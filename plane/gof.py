@@ -0,0 +1,157 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+
+from .fit import MODELS, make_fit
+
+# Goodness of fit for fitted models. Each observation goes through the model's CDF (the
+# probability integral transform, PIT), and the sorted PIT values give, in O(n):
+#   ks        Kolmogorov-Smirnov D
+#   ad        Anderson-Darling A^2
+#   cvm_tail  upper-tail weighted Cramer-von Mises AU^2 = n * int (F_n - F)^2 / (1 - F) dF
+#             (Ahmad, Sinclair & Spurr, 1988), the most sensitive of the three to the tail
+#
+# Multipliers are usually floored to a few decimals, and the ties would dominate any
+# continuous test at large n. Data on a 10^-d grid therefore gets a randomized PIT: a value v
+# stands for the latent interval [v, v + h), and u is uniform over that interval's CDF mass.
+# Under the model this makes u exactly uniform, atoms at 1 included.
+#
+# P-values come from a parametric bootstrap: replicates are drawn from the fitted model in
+# (replicates x size) blocks, floored to the data's grid and refitted, so estimated
+# parameters are accounted for. For continuous data, replicates have at most BOOT_N values.
+# The KS statistic is compared as sqrt(n) D, and A^2 and AU^2 are already scaled by n, so for
+# larger samples this is the usual asymptotic bootstrap. Fits to floored data carry an
+# estimation bias that does not shrink with n, so grid data is replicated at full size unless
+# boot_n is given. Jobs are seeded from one SeedSequence and run on a process pool; results
+# depend on `seed` only. A replicate whose refit fails (an optimizer error or a non-finite
+# statistic) is dropped; if all of them fail the model gets no p-values.
+STATS = ("ks", "ad", "cvm_tail")
+BOOT_N = 20_000
+REPS = 200
+REPS_JOB = 25
+CHUNK_ELEMS = 1 << 22
+MAX_DECIMALS = 6
+_U_EPS = 1e-12
+# How iterative refits fail on degenerate replicates (LinAlgError is a ValueError)
+_REFIT_ERRORS = (ValueError, ArithmeticError, RuntimeError)
+
+
+def data_resolution(x) -> float:
+    """Grid step h = 10^-d for the smallest d <= MAX_DECIMALS that every value sits on, else 0."""
+    x = np.asarray(x, dtype=float)
+    if x.size == 0:
+        return 0.0
+    for d in range(MAX_DECIMALS + 1):
+        s = x * 10.0 ** d
+        # Absolute slack for decimal representation error, relative slack for float64 rounding
+        if np.all(np.abs(s - np.round(s)) <= 1e-6 + 1e-12 * np.abs(s)):
+            return 10.0 ** -d
+    return 0.0
+
+
+def pit(fit: dict, x, h: float = 0.0, rng=None) -> np.ndarray:
+    """u = P(X < x) for continuous data; for data floored to a grid of h, randomized within [x, x + h)."""
+    S = fit["survival"]
+    x = np.asarray(x, dtype=float)
+    lo = 1.0 - np.broadcast_to(S(x), x.shape)
+    if h <= 0:
+        return lo
+    hi = 1.0 - np.broadcast_to(S(x + h), x.shape)
+    rng = rng if rng is not None else np.random.default_rng(0)
+    return lo + rng.random(x.shape) * (hi - lo)
+
+
+def gof_stats(u) -> dict:
+    """KS D, Anderson-Darling A^2 and tail-weighted CvM AU^2 for PIT values u (any order)."""
+    u = np.clip(np.sort(np.asarray(u, dtype=float)), _U_EPS, 1 - _U_EPS)
+    n = u.size
+    i = np.arange(1, n + 1)
+    ks = max(float(np.max(i / n - u)), float(np.max(u - (i - 1) / n)))
+    lu, l1u = np.log(u), np.log1p(-u)
+    ad = -n - float(np.sum((2 * i - 1) * (lu + l1u[::-1]))) / n
+    cvm_tail = n / 2 - 2 * float(np.sum(u)) - float(np.sum((2 - (2 * i - 1) / n) * l1u))
+    return {"ks": ks, "ad": ad, "cvm_tail": cvm_tail}
+
+
+def _scaled(st: dict, n: int) -> dict:
+    # Statistics on a common scale across sample sizes
+    return {"ks": st["ks"] * np.sqrt(n), "ad": st["ad"], "cvm_tail": st["cvm_tail"]}
+
+
+def _floor_grid(z, h):
+    if h <= 0:
+        return z
+    return np.maximum(np.floor(z / h + 1e-9) * h, 1.0)
+
+
+def _boot_job(args):
+    seed, reps, name, params, ll, m, h = args
+    fit = make_fit(name, params, ll)
+    refit = MODELS[name]["fit"]
+    rng = np.random.default_rng(seed)
+    out = np.full((reps, len(STATS)), np.nan)
+    per = max(1, CHUNK_ELEMS // m)
+    done = 0
+    while done < reps:
+        b = min(per, reps - done)
+        block = _floor_grid(fit["sample"](rng, (b, m)), h)
+        for r in range(b):
+            try:
+                f = refit(block[r])
+                st = _scaled(gof_stats(pit(f, block[r], h, rng)), m)
+            except _REFIT_ERRORS:
+                continue
+            out[done + r] = [st[s] for s in STATS]
+        done += b
+    return out
+
+
+def gof_tests(fits: List[dict], x, reps: int = REPS, pvalue_models=None, seed: int = 0,
+              workers: Optional[int] = None, boot_n: Optional[int] = None) -> List[dict]:
+    """Statistics for every fit, plus bootstrap p-values for pvalue_models (default: all fits).
+
+    Each result has name, n, h (the data grid, 0 if continuous), the three statistics,
+    and "pvalues" ({stat: p} or None) with "reps" (usable replicates), "failed" (dropped
+    replicates) and "boot_n".
+    """
+    x = np.asarray(x, dtype=float)
+    x = x[x >= 1]
+    n = x.size
+    h = data_resolution(x)
+    m = min(n, boot_n or (n if h > 0 else BOOT_N))
+    names = [f["name"] for f in fits] if pvalue_models is None else list(pvalue_models)
+    results, jobs = [], []
+    ss = np.random.SeedSequence(seed)
+    for f in fits:
+        st = gof_stats(pit(f, x, h, np.random.default_rng(ss.spawn(1)[0])))
+        res = {"name": f["name"], "n": n, "h": h, **st, "pvalues": None, "reps": 0, "failed": 0, "boot_n": m}
+        results.append(res)
+        if reps > 0 and f["name"] in names and m > 0:
+            params = {k: float(v) for k, v in f["params"].items()}
+            sizes = [min(REPS_JOB, reps - lo) for lo in range(0, reps, REPS_JOB)]
+            for s, k in zip(ss.spawn(len(sizes)), sizes):
+                jobs.append((len(results) - 1, (s, k, f["name"], params, float(f["ll"]), m, h)))
+    if not jobs:
+        return results
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            parts = list(ex.map(_boot_job, [j for _, j in jobs]))
+    else:
+        parts = [_boot_job(j) for _, j in jobs]
+    for i, res in enumerate(results):
+        mine = [p for (k, _), p in zip(jobs, parts) if k == i]
+        if not mine:
+            continue
+        boot = np.concatenate(mine)
+        boot = boot[np.isfinite(boot).all(axis=1)]
+        obs = _scaled(res, n)
+        res["reps"] = len(boot)
+        res["failed"] = sum(len(b) for b in mine) - len(boot)
+        if not len(boot):
+            continue
+        res["pvalues"] = {s: float((1 + np.sum(boot[:, j] >= obs[s])) / (len(boot) + 1))
+                          for j, s in enumerate(STATS)}
+    return results
@@ -0,0 +1,81 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .fit import fit_models, best_model_by_aic, fit_exponential_stats, fit_pareto_stats
+
+# Rows per worker task when fanning sessions out to a process pool
+TASK_ROWS = 1 << 18
+
+
+def _fit_row(group, x, models=None):
+    fits = fit_models(x, models)
+    row = {"group": group, "n": int(x.size), "best": best_model_by_aic(fits)["name"]}
+    for f in fits:
+        for k, v in f["params"].items():
+            row[f"{f['name']}.{k}"] = float(v)
+        row[f"{f['name']}.aic"] = float(f["aic"])
+    return row
+
+
+def _fit_task(task, models=None):
+    return [_fit_row(g, x, models) for g, x in task]
+
+
+def fit_sessions(x, sessions, workers: Optional[int] = None, models=None) -> pd.DataFrame:
+    """Fit every model per session: one group-by pass, groups batched onto worker processes."""
+    x = np.asarray(x, dtype=float)
+    codes, labels = pd.factorize(pd.Series(sessions), sort=False)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=len(labels)))))
+    xs = x[order]
+    groups = [(labels[i], xs[bounds[i]:bounds[i + 1]]) for i in range(len(labels))]
+
+    # Pack consecutive groups into tasks of roughly TASK_ROWS rows
+    tasks, cur, size = [], [], 0
+    for g in groups:
+        cur.append(g)
+        size += g[1].size
+        if size >= TASK_ROWS:
+            tasks.append(cur)
+            cur, size = [], 0
+    if cur:
+        tasks.append(cur)
+
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            parts = list(ex.map(partial(_fit_task, models=models), tasks))
+    else:
+        parts = [_fit_task(t, models) for t in tasks]
+    return pd.DataFrame([row for part in parts for row in part])
+
+
+def fit_windows(x, window: int, step: Optional[int] = None) -> pd.DataFrame:
+    """Exponential and Pareto fits over rolling windows of `window` rounds.
+
+    Window sums come from prefix sums of (x-1) and log x, so every window costs O(1).
+    The truncated-exponential mixture needs a per-window quantile and is left out.
+    """
+    if window < 1 or (step is not None and step < 1):
+        raise ValueError("window and step must be at least 1")
+    x = np.asarray(x, dtype=float)
+    step = step or window
+    starts = np.arange(0, x.size - window + 1, step)
+    cy = np.concatenate(([0.0], np.cumsum(x - 1.0)))
+    cl = np.concatenate(([0.0], np.cumsum(np.log(x))))
+    sum_y = cy[starts + window] - cy[starts]
+    sum_log = cl[starts + window] - cl[starts]
+    fe = fit_exponential_stats(window, sum_y)
+    fp = fit_pareto_stats(window, sum_log)
+    out = pd.DataFrame({"start": starts, "end": starts + window, "n": window})
+    out["best"] = np.where(fe["aic"] <= fp["aic"], fe["name"], fp["name"])
+    for f in (fe, fp):
+        for k, v in f["params"].items():
+            out[f"{f['name']}.{k}"] = v
+        out[f"{f['name']}.aic"] = f["aic"]
+    return out
@@ -1,7 +1,7 @@
-import io
-import os
+import queue
 import shutil
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk, messagebox, filedialog
 
 from PIL import Image, ImageTk, ImageGrab
@@ -12,9 +12,14 @@ except ImportError:
     pytesseract = None
 
 from .ocr import extract_multipliers_from_image, append_to_csv
+from .ocrcache import OCRCache
 from .fit import fit_models, best_model_by_aic
 from .report import summarize_fit
-from .survival import empirical_survival
+
+# OCR captures run on this many background threads; saving and fitting run on one more
+# so appends keep capture order. Worker results reach Tk through a queue polled every POLL_MS.
+OCR_WORKERS = 2
+POLL_MS = 100
 
 
 class OCRGui(tk.Tk):
@@ -49,13 +54,37 @@ class OCRGui(tk.Tk):
         ttk.Label(controls, text="Umbral").pack(side=tk.LEFT, padx=2)
         self.threshold_spin = ttk.Spinbox(controls, from_=80, to=220, textvariable=self.threshold_var, width=5)
         self.threshold_spin.pack(side=tk.LEFT, padx=2)
+        # Multi-column history grids: segment each column separately
+        self.columns_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(controls, text="Cuadrícula", variable=self.columns_var).pack(side=tk.LEFT, padx=5)
 
         ttk.Button(controls, text="OCR", command=self.run_ocr).pack(side=tk.LEFT, padx=5)
         ttk.Button(controls, text="Guardar + Ajustar", command=self.save_and_fit).pack(side=tk.LEFT, padx=5)
+        # Save and fit each capture as soon as its OCR finishes
+        self.auto_save_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(controls, text="Auto guardar", variable=self.auto_save_var).pack(side=tk.LEFT, padx=5)
 
         self.output = tk.Text(self, height=10)
         self.output.pack(fill=tk.X)
 
+        # Persistent cache of OCR text per line crop; overlapping captures skip tesseract
+        try:
+            self.ocr_cache = OCRCache()
+        except Exception as e:
+            self.ocr_cache = None
+            self.log(f"Cache OCR no disponible: {e}")
+
+        self.pending_vals = []
+        self._events = queue.Queue()
+        self._ocr_pool = ThreadPoolExecutor(max_workers=OCR_WORKERS, thread_name_prefix="plane-ocr")
+        self._fit_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="plane-fit")
+        # Captures are numbered on submit and handled in that order, whichever OCR finishes first
+        self._next_seq = 0
+        self._deliver_seq = 0
+        self._done = {}
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.after(POLL_MS, self._drain_events)
+
         self.check_tesseract()
 
     def check_tesseract(self):
@@ -87,7 +116,9 @@ class OCRGui(tk.Tk):
                 self.log("Azure OCR requiere AZURE_CV_ENDPOINT y AZURE_CV_KEY en entorno.")
 
     def choose_csv(self):
-        path = filedialog.asksaveasfilename(title="CSV destino", defaultextension=".csv", filetypes=[("CSV", ".csv")])
+        # A *.plane path selects the append-only segment store instead of a CSV
+        path = filedialog.asksaveasfilename(title="CSV destino", defaultextension=".csv",
+                                            filetypes=[("CSV", ".csv"), ("Plane store", ".plane")])
         if path:
             self.csv_path_var.set(path)
 
@@ -98,6 +129,8 @@ class OCRGui(tk.Tk):
             self.image = clip
             self.show_image(clip)
             self.log("Imagen pegada desde portapapeles.")
+            # Each paste goes straight to the OCR queue
+            self.run_ocr()
             return
         # Sometimes Windows clipboard returns a list of file paths
         if isinstance(clip, list) and clip:
@@ -141,48 +174,81 @@ class OCRGui(tk.Tk):
         if self.image is None:
             self.log("Primero pega una imagen.")
             return
-        # Save to in-memory buffer and run OCR (with segmentation per line)
-        buf = io.BytesIO()
-        self.image.save(buf, format="PNG")
-        buf.seek(0)
-        # Write temp if needed
-        tmp_path = os.path.join(os.getcwd(), "_tmp_ocr.png")
-        with open(tmp_path, "wb") as f:
-            f.write(buf.read())
+        # Tk variables are read here on the main thread; the worker only gets plain values
+        # and its own copy of the image, so later pastes cannot change a queued capture.
+        seq = self._next_seq
+        self._next_seq += 1
+        opts = dict(invert=self.invert_var.get(), threshold=self.threshold_var.get(),
+                    backend=self.backend_var.get(), cache=self.ocr_cache,
+                    columns=self.columns_var.get())
+        self._ocr_pool.submit(self._ocr_job, seq, self.image.copy(), opts)
+        self.log(f"Captura #{seq + 1} en cola de OCR.")
+
+    def _ocr_job(self, seq, img, opts):
         try:
-            vals = extract_multipliers_from_image(
-                tmp_path,
-                invert=self.invert_var.get(),
-                threshold=self.threshold_var.get(),
-                backend=self.backend_var.get()
-            )
-            if vals:
-                self.log(f"OCR detectó {len(vals)} valores: {vals[:10]}...")
-                self.last_vals = vals
-            else:
-                self.log("OCR no detectó valores con formato 'N.NNx'.")
-        finally:
-            try:
-                os.remove(tmp_path)
-            except Exception:
-                pass
+            self._events.put(("ocr", seq, extract_multipliers_from_image(img, **opts)))
+        except Exception as e:
+            self._events.put(("ocr_error", seq, e))
+
+    def _on_ocr(self, seq, vals):
+        if vals:
+            self.log(f"Captura #{seq + 1}: OCR detectó {len(vals)} valores: {vals[:10]}...")
+            if self.ocr_cache is not None:
+                st = self.ocr_cache.stats()
+                self.log(f"Cache OCR: {st['hits']} aciertos, {st['misses']} fallos.")
+            self.last_vals = vals
+            self.pending_vals.extend(vals)
+            if self.auto_save_var.get():
+                self.save_and_fit()
+        else:
+            self.log(f"Captura #{seq + 1}: OCR no detectó valores con formato 'N.NNx'.")
 
     def save_and_fit(self):
-        vals = getattr(self, 'last_vals', None)
+        vals = self.pending_vals
         if not vals:
             self.log("No hay valores OCR para guardar.")
             return
-        csv_path = self.csv_path_var.get().strip()
-        if csv_path:
-            append_to_csv(csv_path, vals, session_id="OCR")
-            self.log(f"Guardado en {csv_path}.")
-        # Fit models to the OCR values
-        import numpy as np
-        arr = np.array(vals)
-        S = empirical_survival(arr)
-        fits = fit_models(arr)
-        best = best_model_by_aic(fits)
-        self.log(summarize_fit(fits, best))
+        self.pending_vals = []
+        self._fit_pool.submit(self._fit_job, vals, self.csv_path_var.get().strip())
+
+    def _fit_job(self, vals, csv_path):
+        try:
+            if csv_path:
+                append_to_csv(csv_path, vals, session_id="OCR")
+                self._events.put(("log", f"Guardado en {csv_path}."))
+            # Fit models to the OCR values
+            import numpy as np
+            arr = np.array(vals)
+            fits = fit_models(arr)
+            best = best_model_by_aic(fits)
+            self._events.put(("log", summarize_fit(fits, best)))
+        except Exception as e:
+            self._events.put(("log", f"Error guardando/ajustando: {e}"))
+
+    def _drain_events(self):
+        while True:
+            try:
+                ev = self._events.get_nowait()
+            except queue.Empty:
+                break
+            if ev[0] == "log":
+                self.log(ev[1])
+                continue
+            self._done[ev[1]] = ev
+            while self._deliver_seq in self._done:
+                kind, seq, payload = self._done.pop(self._deliver_seq)
+                self._deliver_seq += 1
+                if kind == "ocr":
+                    self._on_ocr(seq, payload)
+                else:
+                    self.log(f"Captura #{seq + 1}: error de OCR: {payload}")
+        self.after(POLL_MS, self._drain_events)
+
+    def on_close(self):
+        self._ocr_pool.shutdown(wait=False, cancel_futures=True)
+        # Let a running save finish so the CSV/store is not left half-written
+        self._fit_pool.shutdown(wait=True)
+        self.destroy()
 
     def log(self, msg: str):
         self.output.insert(tk.END, msg + "\n")
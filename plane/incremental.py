@@ -0,0 +1,230 @@
+import json
+import os
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from .fit import fit_exponential_stats, fit_pareto_stats, fit_trunc_exp_stats
+from .paths import stats_path, stats_fingerprint
+
+# Fixed log-spaced histogram over [1, HIST_MAX) used for the truncated-exponential tail
+# quantile; values beyond HIST_MAX land in the last bin. Relative bin width is ~0.4%.
+HIST_BINS = 4096
+HIST_MAX = 1e7
+_LOG_MAX = np.log(HIST_MAX)
+TAIL_Q = 0.99
+
+
+def _bins(x: np.ndarray) -> np.ndarray:
+    b = (np.log(x) * (HIST_BINS / _LOG_MAX)).astype(np.int64)
+    return np.minimum(b, HIST_BINS - 1)
+
+
+def _bin_lo(b):
+    return np.exp(np.asarray(b) * (_LOG_MAX / HIST_BINS))
+
+
+class RunningStats:
+    """Mergeable sufficient statistics for the closed-form fits in plane.fit.
+
+    count, sum(x-1) and sum(log x) make the exponential and Pareto fits exact; the
+    truncated-exponential mixture additionally needs its tail quantile, answered from
+    the max (with its multiplicity) for small samples and a log histogram otherwise.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.sum_y = 0.0
+        self.sum_log = 0.0
+        self.max = 0.0
+        self.n_at_max = 0
+        self.hist = np.zeros(HIST_BINS, dtype=np.int64)
+
+    def update(self, x) -> "RunningStats":
+        x = np.asarray(x, dtype=float).ravel()
+        x = x[~np.isnan(x)]
+        x = x[x >= 1]
+        if x.size == 0:
+            return self
+        self.n += int(x.size)
+        self.sum_y += float(np.sum(x - 1.0))
+        self.sum_log += float(np.sum(np.log(x)))
+        m = float(x.max())
+        k = int(np.count_nonzero(x == m))
+        if m > self.max:
+            self.max, self.n_at_max = m, k
+        elif m == self.max:
+            self.n_at_max += k
+        self.hist += np.bincount(_bins(x), minlength=HIST_BINS)
+        return self
+
+    def merge(self, other: "RunningStats") -> "RunningStats":
+        self.n += other.n
+        self.sum_y += other.sum_y
+        self.sum_log += other.sum_log
+        if other.max > self.max:
+            self.max, self.n_at_max = other.max, other.n_at_max
+        elif other.max == self.max:
+            self.n_at_max += other.n_at_max
+        self.hist += other.hist
+        return self
+
+    def tail(self):
+        """(q, p) for the truncated-exponential mixture, mirroring plane.fit.fit_trunc_exp."""
+        if self.n <= 50:
+            return self.max, self.n_at_max / self.n * 0.5
+        # np.quantile's linear rule targets order statistic (n-1)*q; spread each bin's
+        # mass uniformly in log space to place it
+        k = (self.n - 1) * TAIL_Q
+        cum = np.cumsum(self.hist)
+        b = int(np.searchsorted(cum, k, side="right"))
+        below = cum[b - 1] if b else 0
+        frac = (k - below + 0.5) / self.hist[b]
+        q = float(min(max(_bin_lo(b + frac), 1.0), self.max))
+        # Mass at or above q: whole bins above plus the remaining fraction of q's bin
+        ge = (self.n - cum[b]) + self.hist[b] * (1.0 - min(frac, 1.0))
+        if q == self.max:
+            ge = self.n_at_max
+        return q, ge / self.n * 0.5
+
+    def to_dict(self) -> dict:
+        nz = np.flatnonzero(self.hist)
+        return {"n": self.n, "sum_y": self.sum_y, "sum_log": self.sum_log, "max": self.max,
+                "n_at_max": self.n_at_max, "hist_bins": nz.tolist(), "hist_counts": self.hist[nz].tolist()}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "RunningStats":
+        st = cls()
+        st.n, st.sum_y, st.sum_log = int(d["n"]), float(d["sum_y"]), float(d["sum_log"])
+        st.max, st.n_at_max = float(d["max"]), int(d["n_at_max"])
+        st.hist[np.asarray(d["hist_bins"], dtype=np.int64)] = np.asarray(d["hist_counts"], dtype=np.int64)
+        return st
+
+
+class DatasetStats:
+    """Running statistics for a whole dataset plus one RunningStats per session."""
+
+    def __init__(self, column: str = "multiplier", session_col: Optional[str] = "session_id"):
+        self.column = column
+        self.session_col = session_col
+        self.total = RunningStats()
+        self.sessions: Dict[str, RunningStats] = {}
+        self.fingerprint = None
+
+    def update(self, x, session_id=None) -> "DatasetStats":
+        self.total.update(x)
+        key = str(session_id if self.session_col and session_id is not None else 0)
+        self.sessions.setdefault(key, RunningStats()).update(x)
+        return self
+
+    def update_frame(self, df) -> "DatasetStats":
+        """Fold in a load_sessions-style frame (multiplier, session_id) with one pass per session."""
+        return self.update_arrays(df["multiplier"].to_numpy(dtype=float), df["session_id"].values)
+
+    def update_arrays(self, x, sessions=None) -> "DatasetStats":
+        if sessions is None:
+            return self.update(x, 0)
+        codes, labels = pd.factorize(sessions, sort=False)
+        order = np.argsort(codes, kind="stable")
+        bounds = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=len(labels)))))
+        xs = np.asarray(x, dtype=float)[order]
+        for i, sid in enumerate(labels):
+            self.update(xs[bounds[i]:bounds[i + 1]], sid)
+        return self
+
+    def to_dict(self) -> dict:
+        return {"column": self.column, "session_col": self.session_col, "fingerprint": self.fingerprint,
+                "total": self.total.to_dict(),
+                "sessions": {k: v.to_dict() for k, v in self.sessions.items()}}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "DatasetStats":
+        ds = cls(d["column"], d["session_col"])
+        ds.fingerprint = d.get("fingerprint")
+        ds.total = RunningStats.from_dict(d["total"])
+        ds.sessions = {k: RunningStats.from_dict(v) for k, v in d["sessions"].items()}
+        return ds
+
+
+# Models whose fits reduce to the running statistics
+STATS_MODELS = ("exponential_shift1", "pareto_xm1", "truncated_exponential_mixture")
+
+
+def fit_models_from_stats(st: RunningStats, models=None):
+    """Same fits as plane.fit.fit_models, in O(1) from running statistics.
+
+    Only STATS_MODELS can be fitted this way; other requested models are left out.
+    """
+    builders = {
+        "exponential_shift1": lambda: fit_exponential_stats(st.n, st.sum_y),
+        "pareto_xm1": lambda: fit_pareto_stats(st.n, st.sum_log),
+        "truncated_exponential_mixture": lambda: fit_trunc_exp_stats(st.n, st.sum_y, *st.tail()),
+    }
+    return [builders[m]() for m in (models or STATS_MODELS) if m in builders]
+
+
+def load_stats(path: str) -> Optional[DatasetStats]:
+    try:
+        with open(stats_path(path), "r", encoding="utf-8") as f:
+            return DatasetStats.from_dict(json.load(f))
+    except (FileNotFoundError, ValueError, KeyError):
+        return None
+
+
+def save_stats(path: str, ds: DatasetStats) -> None:
+    ds.fingerprint = stats_fingerprint(path)
+    sp = stats_path(path)
+    tmp = sp + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(ds.to_dict(), f)
+    os.replace(tmp, sp)
+
+
+def load_or_build_stats(path: str, column: str, session_col: Optional[str] = None) -> DatasetStats:
+    """Return up-to-date stats for a dataset, rescanning it only if the sidecar is missing or stale."""
+    ds = load_stats(path)
+    if (ds is not None and ds.column == column and ds.session_col == session_col
+            and ds.fingerprint == stats_fingerprint(path)):
+        return ds
+    ds = stats_from_chunks(path, column, session_col)
+    save_stats(path, ds)
+    return ds
+
+
+def stats_from_chunks(path: str, column: str, session_col: Optional[str] = None) -> DatasetStats:
+    """Build statistics in one streaming pass without holding the dataset in memory."""
+    from .data import iter_chunks
+    ds = DatasetStats(column, session_col)
+    for x, sessions in iter_chunks(path, column, session_col):
+        ds.update_arrays(x, sessions)
+    return ds
+
+
+def note_append(path: str, values, session_id, fingerprint_before) -> None:
+    """Fold freshly appended rows into the sidecar if it described the file right before the append.
+
+    Appenders call stats_fingerprint() before writing and pass it here afterwards. Sidecars
+    are only created by load_or_build_stats; one that was already stale (someone else wrote
+    the file) is left alone and rebuilt on next use.
+    """
+    note_appends(path, [(values, session_id)], fingerprint_before)
+
+
+def appendable_stats(path: str, fingerprint_before) -> Optional[DatasetStats]:
+    """The sidecar, if it described the file right before rows (session_id, multiplier) were appended."""
+    ds = load_stats(path)
+    if (ds is None or fingerprint_before is None or ds.fingerprint != fingerprint_before
+            or ds.column != "multiplier" or ds.session_col not in (None, "session_id")):
+        return None
+    return ds
+
+
+def note_appends(path: str, batches, fingerprint_before) -> None:
+    """note_append for several (values, session_id) batches written in one go."""
+    ds = appendable_stats(path, fingerprint_before)
+    if ds is None:
+        return
+    for values, session_id in batches:
+        ds.update(values, session_id)
+    save_stats(path, ds)
@@ -0,0 +1,211 @@
+import json
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .fit import make_fit
+
+# Batch P(X>=x) queries and precomputed lookup tables.
+#
+# A SurvivalTable holds log S on a grid in log x and log x on a grid in log p, both linearly
+# interpolated. Grids are refined until the relative interpolation error, checked at every
+# segment midpoint against the exact model, is at most `tol`. Queries outside
+# the tabulated range fall back to the exact model, so every answer stays within tolerance.
+# The S grid ends at S = P_MIN or at the end of a bounded support. Near such an end log S
+# diverges, so refinement may not converge within MAX_POINTS knots: the grid is then cut
+# before the first segment that misses the tolerance, counted from the tail, and the
+# exact model answers beyond the cut (the table is marked `truncated`).
+P_MIN = 1e-12
+X_CAP = 1e12
+START_POINTS = 257
+MAX_POINTS = 1 << 18
+ISF_ITERS = 80
+_FLOOR = 1e-300
+
+
+def prob_matrix(fits: List[dict], xs) -> np.ndarray:
+    """P(X>=x) for every fit (rows) at every threshold (columns), one vectorized call per model."""
+    xs = np.asarray(xs, dtype=float).ravel()
+    out = np.empty((len(fits), xs.size))
+    for i, f in enumerate(fits):
+        out[i] = np.broadcast_to(f["survival"](xs), xs.shape)
+    return out
+
+
+def isf_exact(survival, p, x_hi: float = X_CAP) -> np.ndarray:
+    """Smallest x with S(x) <= p, by vectorized bisection on log x."""
+    p = np.asarray(p, dtype=float)
+    lo = np.zeros(p.shape)
+    hi = np.full(p.shape, np.log(x_hi))
+    for _ in range(ISF_ITERS):
+        mid = 0.5 * (lo + hi)
+        above = np.broadcast_to(survival(np.exp(mid)), p.shape) > p
+        lo = np.where(above, mid, lo)
+        hi = np.where(above, hi, mid)
+    return np.exp(hi)
+
+
+def _log(v):
+    return np.log(np.maximum(v, _FLOOR))
+
+
+def _refine(f, a, b, tol, tail: str = "right"):
+    """Grid on [a, b] whose linear interpolant of f has midpoint error <= tol.
+
+    Only segments that miss the tolerance are split, so kinks (the tail cap of the
+    truncated-exponential mixture, the splice threshold) get dense knots and smooth
+    stretches stay coarse. Segments that can't converge are cut off from the `tail` end;
+    returns (grid, values, max error, whether it was cut).
+    """
+    g = np.linspace(a, b, START_POINTS)
+    v = f(g)
+    while True:
+        mid = 0.5 * (g[:-1] + g[1:])
+        exact = f(mid)
+        # Values are logs, so an absolute error in them is a relative error in S or x
+        dev = np.abs(0.5 * (v[:-1] + v[1:]) - exact)
+        bad = np.flatnonzero(dev > tol)
+        # Segments at float resolution can't be split any further
+        split = bad[(mid[bad] > g[bad]) & (mid[bad] < g[bad + 1])]
+        if split.size == 0 or g.size + split.size > MAX_POINTS:
+            break
+        g = np.insert(g, split + 1, mid[split])
+        v = np.insert(v, split + 1, exact[split])
+    if bad.size == 0:
+        return g, v, float(dev.max(initial=0.0)), False
+    if tail == "right":
+        k = bad[0]
+        g, v, dev = g[:k + 1], v[:k + 1], dev[:k]
+    else:
+        k = bad[-1]
+        g, v, dev = g[k + 1:], v[k + 1:], dev[k + 1:]
+    return g, v, float(dev.max(initial=0.0)), True
+
+
+class SurvivalTable:
+    """Interpolated S(x) and its inverse for one fitted model."""
+
+    def __init__(self, name, params, ll, log_x, log_s, log_p, log_q, tol, err, truncated=False):
+        self.name = name
+        self.params = params
+        self.ll = ll
+        self.log_x = log_x
+        self.log_s = log_s
+        self.log_p = log_p
+        self.log_q = log_q
+        self.tol = tol
+        self.err = err
+        self.truncated = truncated
+        self._fit = None
+
+    @classmethod
+    def build(cls, fit: dict, tol: float = 1e-6, p_min: float = P_MIN,
+              x_max: Optional[float] = None) -> "SurvivalTable":
+        S = fit["survival"]
+        if x_max is None:
+            # Tabulate S down to p_min; beyond that the exact model answers
+            x_max = float(isf_exact(S, p_min))
+        # Not past the end of a bounded support (X_CAP if unbounded)
+        x_max = min(x_max, float(isf_exact(S, 0.0)))
+        u_max = np.log(max(x_max, 1.0 + 1e-9))
+        log_x, log_s, e1, c1 = _refine(lambda u: _log(np.broadcast_to(S(np.exp(u)), u.shape)), 0.0, u_max, tol)
+        log_p, log_q, e2, c2 = _refine(lambda w: np.log(isf_exact(S, np.exp(w))), np.log(p_min), 0.0, tol,
+                                       tail="left")
+        t = cls(fit["name"], {k: float(v) for k, v in fit["params"].items()}, float(fit["ll"]),
+                log_x, log_s, log_p, log_q, tol, max(e1, e2), c1 or c2)
+        t._fit = fit
+        return t
+
+    @property
+    def fit(self) -> dict:
+        if self._fit is None:
+            self._fit = make_fit(self.name, self.params, self.ll)
+        return self._fit
+
+    def sf(self, x) -> np.ndarray:
+        """P(X>=x) from the table; thresholds beyond the grid use the exact model."""
+        x = np.asarray(x, dtype=float)
+        u = np.log(np.maximum(x, 1.0))
+        out = np.exp(np.interp(u, self.log_x, self.log_s))
+        far = u > self.log_x[-1]
+        if np.any(far):
+            out[far] = np.broadcast_to(self.fit["survival"](x[far]), x[far].shape)
+        return out
+
+    def isf(self, p) -> np.ndarray:
+        """Quantile x with P(X>=x) = p; p below the tabulated range uses exact bisection."""
+        p = np.asarray(p, dtype=float)
+        w = np.log(np.clip(p, _FLOOR, 1.0))
+        out = np.exp(np.interp(w, self.log_p, self.log_q))
+        far = w < self.log_p[0]
+        if np.any(far):
+            out[far] = isf_exact(self.fit["survival"], p[far])
+        return out
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "params": self.params, "ll": self.ll, "tol": self.tol, "err": self.err,
+                "truncated": self.truncated, "log_x": self.log_x.tolist(), "log_s": self.log_s.tolist(),
+                "log_p": self.log_p.tolist(), "log_q": self.log_q.tolist()}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "SurvivalTable":
+        return cls(d["name"], d["params"], d["ll"], np.asarray(d["log_x"]), np.asarray(d["log_s"]),
+                   np.asarray(d["log_p"]), np.asarray(d["log_q"]), d["tol"], d["err"], d.get("truncated", False))
+
+
+def build_tables(fits: List[dict], tol: float = 1e-6, p_min: float = P_MIN) -> Dict[str, SurvivalTable]:
+    return {f["name"]: SurvivalTable.build(f, tol=tol, p_min=p_min) for f in fits}
+
+
+def tables_matrix(tables: Dict[str, SurvivalTable], xs) -> np.ndarray:
+    """Like prob_matrix, answered from lookup tables (rows in the dict's order)."""
+    xs = np.asarray(xs, dtype=float).ravel()
+    return np.stack([t.sf(xs) for t in tables.values()]) if tables else np.empty((0, xs.size))
+
+
+def save_tables(path: str, tables: Dict[str, SurvivalTable]) -> None:
+    """Write tables to .npz (arrays plus a JSON header) or .json."""
+    if path.lower().endswith(".json"):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump([t.to_dict() for t in tables.values()], f)
+        return
+    arrays = {}
+    meta = []
+    for i, t in enumerate(tables.values()):
+        d = t.to_dict()
+        for k in ("log_x", "log_s", "log_p", "log_q"):
+            arrays[f"{i}.{k}"] = getattr(t, k)
+            del d[k]
+        meta.append(d)
+    arrays["meta"] = np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8)
+    with open(path, "wb") as f:
+        np.savez(f, **arrays)
+
+
+def load_tables(path: str) -> Dict[str, SurvivalTable]:
+    if path.lower().endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            return {d["name"]: SurvivalTable.from_dict(d) for d in json.load(f)}
+    with np.load(path) as z:
+        meta = json.loads(z["meta"].tobytes().decode("utf-8"))
+        tables = {}
+        for i, d in enumerate(meta):
+            for k in ("log_x", "log_s", "log_p", "log_q"):
+                d[k] = z[f"{i}.{k}"]
+            tables[d["name"]] = SurvivalTable.from_dict(d)
+    return tables
+
+
+def read_thresholds(path: str) -> np.ndarray:
+    """Thresholds from .npy, or from text/CSV with numbers separated by commas or whitespace."""
+    if path.lower().endswith(".npy"):
+        return np.load(path).astype(float).ravel()
+    with open(path, "r", encoding="utf-8") as f:
+        tokens = f.read().replace(",", " ").split()
+    vals = []
+    for tok in tokens:
+        try:
+            vals.append(float(tok))
+        except ValueError:
+            continue  # header or label
+    return np.asarray(vals)
@@ -1,71 +1,123 @@
+import csv
 import os
 import json
-import pandas as pd
-from typing import List
+from typing import List, Optional
+
+from .paths import is_store, merge_manifest_path, merge_keys_path
+from .profiling import span
+
+# Appends go through plane.writer and CSV-to-CSV merges run on the csv module; pandas (and
+# numpy) are only imported for stores, CSVs without session_id/multiplier columns, and JSON
+# merge output, so `plane add` / `plane merge` start fast.
 
 
 def append_values(path: str, values: List[float], session_id: str = "manual") -> int:
+    """Append multipliers >= 1 through the shared writer (locked, logged and group-committed)."""
+    from .writer import append
     vals = [v for v in values if v >= 1]
-    if path.lower().endswith('.csv'):
-        df_new = pd.DataFrame({"session_id": session_id, "multiplier": vals})
-        try:
-            df_old = pd.read_csv(path)
-            df_out = pd.concat([df_old, df_new], ignore_index=True)
-        except FileNotFoundError:
-            df_out = df_new
-        df_out.to_csv(path, index=False)
-    elif path.lower().endswith('.json'):
-        recs_new = [{"session_id": session_id, "multiplier": float(v)} for v in vals]
-        try:
-            with open(path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            if isinstance(data, list):
-                data.extend(recs_new)
-            else:
-                # store under key 'records'
-                data = (data.get('records') or []) + recs_new
-        except FileNotFoundError:
-            data = recs_new
-        # Normalize to list at top-level
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(data, f)
-    else:
-        raise ValueError('Unsupported output format; use CSV or JSON')
-    return len(vals)
+    with span("append", rows=len(vals)):
+        return append(path, vals, session_id=session_id)
 
 
-def merge_files(inputs: List[str], out: str) -> None:
-    rows = []
+def _merge_rows(inputs: List[str]):
+    """(session_id, multiplier) rows from CSV/JSON inputs, with values as written in the input."""
     for p in inputs:
         if p.lower().endswith('.csv'):
-            df = pd.read_csv(p)
-            if 'multiplier' not in df.columns:
-                raise ValueError(f"Missing 'multiplier' in {p}")
-            if 'session_id' not in df.columns:
-                df['session_id'] = os.path.basename(p)
-            rows.append(df[['session_id','multiplier']])
-        elif p.lower().endswith('.json'):
+            with open(p, 'r', encoding='utf-8', newline='') as f:
+                reader = csv.DictReader(f)
+                if 'multiplier' not in (reader.fieldnames or []):
+                    raise ValueError(f"Missing 'multiplier' in {p}")
+                default = None if 'session_id' in reader.fieldnames else os.path.basename(p)
+                for r in reader:
+                    yield (default or r['session_id'], r['multiplier'])
+        else:
             with open(p, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-            if isinstance(data, list):
-                recs = data
-            else:
-                recs = data.get('records', [])
-            df = pd.DataFrame(recs)
-            if 'multiplier' not in df.columns:
+            recs = data if isinstance(data, list) else data.get('records', [])
+            if not any('multiplier' in r for r in recs):
                 raise ValueError(f"Missing 'multiplier' in {p}")
-            if 'session_id' not in df.columns:
-                df['session_id'] = os.path.basename(p)
-            rows.append(df[['session_id','multiplier']])
-        else:
-            raise ValueError(f'Unsupported input file: {p}')
-    df_all = pd.concat(rows, ignore_index=True)
+            # Like a DataFrame column: the file name only when no record has a session_id
+            default = '' if any('session_id' in r for r in recs) else os.path.basename(p)
+            for r in recs:
+                yield (r.get('session_id', default), r.get('multiplier', ''))
+
+
+def merge_files(inputs: List[str], out: str, dedup: str = "none", window: Optional[int] = None,
+                incremental: bool = False) -> dict:
+    """Merge inputs into out; returns counts ("rows", "written", "duplicates", "skipped", ...).
+
+    dedup ("session-seq" or "window") or incremental=True runs the streaming merge in
+    plane.dedup; otherwise every row is copied.
+    """
+    if dedup != "none" or incremental:
+        from .dedup import merge_stream
+        return merge_stream(inputs, out, key=dedup, window=window, incremental=incremental)
+    from .writer import exclusive
+    with exclusive(out):
+        return _merge_plain(inputs, out)
+
+
+def _merge_plain(inputs: List[str], out: str) -> dict:
+    # A plain merge rewrites out, so the record of an earlier incremental merge no longer applies
+    for p in (merge_manifest_path(out), merge_keys_path(out)):
+        if os.path.exists(p):
+            os.remove(p)
+    if out.lower().endswith('.csv') and all(p.lower().endswith(('.csv', '.json')) for p in inputs):
+        with span("merge") as sp, open(out + '.tmp', 'w', encoding='utf-8', newline='') as f:
+            w = csv.writer(f, lineterminator=os.linesep)
+            w.writerow(['session_id', 'multiplier'])
+            n = 0
+            for row in _merge_rows(inputs):
+                w.writerow(row)
+                n += 1
+            sp.rows = n
+        # Written aside first, so an output that is also an input is read in full
+        os.replace(out + '.tmp', out)
+        return {"rows": n, "written": n, "duplicates": 0, "skipped": 0}
+    import pandas as pd
+    from .store import append_store_frame, read_store
+    with span("merge.read") as sp:
+        rows = []
+        for p in inputs:
+            if is_store(p):
+                mult, codes, sessions = read_store(p)
+                rows.append(pd.DataFrame({'session_id': pd.Categorical.from_codes(codes.astype('int64'), sessions).astype(str),
+                                          'multiplier': mult}))
+            elif p.lower().endswith('.csv'):
+                df = pd.read_csv(p)
+                if 'multiplier' not in df.columns:
+                    raise ValueError(f"Missing 'multiplier' in {p}")
+                if 'session_id' not in df.columns:
+                    df['session_id'] = os.path.basename(p)
+                rows.append(df[['session_id','multiplier']])
+            elif p.lower().endswith('.json'):
+                with open(p, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if isinstance(data, list):
+                    recs = data
+                else:
+                    recs = data.get('records', [])
+                df = pd.DataFrame(recs)
+                if 'multiplier' not in df.columns:
+                    raise ValueError(f"Missing 'multiplier' in {p}")
+                if 'session_id' not in df.columns:
+                    df['session_id'] = os.path.basename(p)
+                rows.append(df[['session_id','multiplier']])
+            else:
+                raise ValueError(f'Unsupported input file: {p}')
+        df_all = pd.concat(rows, ignore_index=True)
+        sp.rows = len(df_all)
     # Write output
-    if out.lower().endswith('.csv'):
-        df_all.to_csv(out, index=False)
-    elif out.lower().endswith('.json'):
-        recs = df_all.to_dict(orient='records')
-        with open(out, 'w', encoding='utf-8') as f:
-            json.dump(recs, f)
-    else:
-        raise ValueError('Unsupported output format; use CSV or JSON')
+    with span("merge.write", rows=len(df_all)):
+        if is_store(out):
+            append_store_frame(out, df_all['multiplier'].to_numpy(dtype='float64'),
+                               df_all['session_id'].astype(str).to_numpy(), replace=True)
+        elif out.lower().endswith('.csv'):
+            df_all.to_csv(out, index=False)
+        elif out.lower().endswith('.json'):
+            recs = df_all.to_dict(orient='records')
+            with open(out, 'w', encoding='utf-8') as f:
+                json.dump(recs, f)
+        else:
+            raise ValueError('Unsupported output format; use CSV, JSON or a .plane store')
+    return {"rows": len(df_all), "written": len(df_all), "duplicates": 0, "skipped": 0}
@@ -1,9 +1,12 @@
+import io
 import re
 from typing import List, Tuple, Optional
 
 import numpy as np
 from PIL import Image, ImageFilter, ImageOps
 
+from .profiling import span
+
 try:
     import pytesseract
 except ImportError:  # allow module import without OCR installed
@@ -30,41 +33,108 @@ def _preprocess(img: Image.Image, invert: bool = False, threshold: int = 160) ->
         g = g.resize((w*scale, h*scale), Image.Resampling.LANCZOS)
     # Sharpen
     g = g.filter(ImageFilter.UnsharpMask(radius=2, percent=150, threshold=3))
-    # Global threshold (clamp 0-255)
+    # Global threshold (clamp 0-255), straight to an 'L' image of 0/255
     t = max(0, min(255, int(threshold)))
-    g = g.point(lambda p: 255 if p > t else 0, mode='1')
-    return g.convert('L')
+    # (bool mask viewed as 0/1 bytes) * 255 avoids the int64 temporaries of np.where
+    return Image.fromarray((np.asarray(g) > t).view(np.uint8) * np.uint8(255), mode="L")
+
+
+# Tesseract settings for one text line of multipliers
+TESS_CONFIG = "--oem 1 --psm 7 -c tessedit_char_whitelist=0123456789xX.,:"
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".bmp", ".webp", ".tif", ".tiff")
+# Line segmentation: rows count as text above max(LINE_MIN_DARK, 1% of width) dark pixels,
+# and a line must be taller than LINE_MIN_HEIGHT rows
+LINE_MIN_DARK = 5
+LINE_MIN_HEIGHT = 8
+# Column segmentation: blank vertical gaps at least this wide (preprocessed pixels) split grid columns
+COL_MIN_GAP = 24
+
+
+def _ocr_lines(lines: List[Image.Image], cache=None, settings: Optional[dict] = None) -> str:
+    texts = []
+    for crop in lines:
+        ck = cache.image_key(crop, **settings) if cache is not None else None
+        if ck is not None:
+            txt = cache.get(ck)
+            if txt is not None:
+                texts.append(txt)
+                continue
+        try:
+            txt = pytesseract.image_to_string(crop, config=TESS_CONFIG)
+            texts.append(txt)
+        except Exception:
+            continue
+        if ck is not None:
+            cache.put(ck, txt)
+    return "\n".join(texts)
+
+
+def _image_bytes(image) -> bytes:
+    # Encoded image bytes for whole-image backends; PIL images are encoded as PNG in memory
+    if isinstance(image, Image.Image):
+        buf = io.BytesIO()
+        image.save(buf, format="PNG")
+        return buf.getvalue()
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return bytes(image)
+    if hasattr(image, "read"):
+        return image.read()
+    with open(image, "rb") as f:
+        return f.read()
+
+
+def _open_image(image) -> Image.Image:
+    if isinstance(image, Image.Image):
+        return image
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return Image.open(io.BytesIO(image))
+    return Image.open(image)
 
 
-def extract_multipliers_from_image(image_path: str, invert: bool = False, threshold: int = 160,
+def _extract(image, invert: bool, threshold: int, backend: str,
+             endpoint: Optional[str], key: Optional[str], cache=None,
+             columns: bool = False) -> Tuple[List[float], int]:
+    # Returns (values, number of OCR'd line crops; 0 for whole-image backends)
+    if backend == "azure":
+        data = _image_bytes(image)
+        ck = None
+        if cache is not None:
+            ck = cache.bytes_key(data, backend="azure")
+            text = cache.get(ck)
+            if text is not None:
+                return parse_multipliers(text), 0
+        with span("azure"):
+            text = _azure_text(data, endpoint=endpoint, key=key)
+        if ck is not None and text:
+            cache.put(ck, text)
+        return parse_multipliers(text), 0
+    if pytesseract is None:
+        raise RuntimeError("pytesseract is not installed. Install Tesseract OCR and pytesseract.")
+    with span("preprocess", rows=1):
+        img2 = _preprocess(_open_image(image), invert=invert, threshold=threshold)
+    # Segment into horizontal lines (per grid column if asked) to avoid token fusion across rows
+    with span("segment") as sp:
+        lines = _segment_lines(img2, columns=columns)
+        sp.rows = len(lines)
+    settings = {"invert": bool(invert), "threshold": int(threshold), "backend": "tesseract", "config": TESS_CONFIG}
+    with span("recognize", rows=len(lines)):
+        text = _ocr_lines(lines, cache, settings)
+    return parse_multipliers(text), len(lines)
+
+
+def extract_multipliers_from_image(image, invert: bool = False, threshold: int = 160,
                                    backend: str = "local", endpoint: Optional[str] = None,
-                                   key: Optional[str] = None) -> List[float]:
+                                   key: Optional[str] = None, cache=None, columns: bool = False) -> List[float]:
     """
     Perform OCR on the provided image and extract multiplier values formatted like '1.78x', '95x', etc.
-    Returns a list of floats (>=1).
+    `image` may be a file path, a PIL image, encoded image bytes or a binary file-like object.
+    Returns a list of floats (>=1). Pass an OCRCache to reuse text for line crops seen before.
+    Set columns=True for multi-column history grids so each column's lines are read separately.
     """
-    if pytesseract is None:
-        raise RuntimeError("pytesseract is not installed. Install Tesseract OCR and pytesseract.")
+    return _extract(image, invert, threshold, backend, endpoint, key, cache, columns)[0]
 
-    if backend == "azure":
-        text = _azure_ocr_text(image_path, endpoint=endpoint, key=key)
-    else:
-        img = Image.open(image_path)
-        img2 = _preprocess(img, invert=invert, threshold=threshold)
-        # Segment into horizontal lines to avoid token fusion across rows
-        lines = _segment_lines(img2)
-        texts = []
-        for crop in lines:
-            try:
-                txt = pytesseract.image_to_string(
-                    crop,
-                    config="--oem 1 --psm 7 -c tessedit_char_whitelist=0123456789xX.,:"
-                )
-                texts.append(txt)
-            except Exception:
-                continue
-        text = "\n".join(texts)
 
+def parse_multipliers(text: str) -> List[float]:
     # Regex: capture numbers possibly with decimal, followed by optional spaces and 'x'/'X'
     # Capture raw tokens including possible OCR-decimal variants (comma, middot) before x
     # Pattern allows optional colon separators often present in UI and optional spaces
@@ -96,46 +166,71 @@ def extract_multipliers_from_image(image_path: str, invert: bool = False, thresh
     return vals
 
 
-def _segment_lines(img: Image.Image) -> List[Image.Image]:
-    """Segment image into horizontal line crops using a projection profile."""
-    import numpy as np
-    arr = np.array(img)
+def _runs(mask: np.ndarray, min_len: int) -> List[Tuple[int, int]]:
+    """(start, end) of True runs longer than min_len; a run reaching the end stops at len - 1."""
+    d = np.diff(mask.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(d == 1)
+    ends = np.flatnonzero(d == -1)
+    ends[ends == mask.size] = mask.size - 1
+    keep = ends - starts > min_len
+    return list(zip(starts[keep].tolist(), ends[keep].tolist()))
+
+
+def _column_bands(dark: np.ndarray, min_gap: int = COL_MIN_GAP) -> List[Tuple[int, int]]:
+    """Split the width at blank vertical gaps of at least min_gap pixels."""
+    w = dark.shape[1]
+    occupied = dark.any(axis=0)
+    d = np.diff(occupied.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(d == 1)
+    ends = np.flatnonzero(d == -1)
+    if starts.size < 2:
+        return [(0, w)]
+    # Merge ink runs separated by narrower gaps (spaces between characters/words)
+    split = np.flatnonzero(starts[1:] - ends[:-1] >= min_gap)
+    if split.size == 0:
+        return [(0, w)]
+    lo = starts[np.concatenate(([0], split + 1))]
+    hi = ends[np.concatenate((split, [ends.size - 1]))]
+    pad = min_gap // 2
+    return list(zip(np.maximum(lo - pad, 0).tolist(), np.minimum(hi + pad, w).tolist()))
+
+
+def _segment_lines(img: Image.Image, columns: bool = False) -> List[Image.Image]:
+    """Segment image into horizontal line crops using a projection profile.
+
+    With columns=True the width is first split into grid columns at wide blank gaps and
+    each column is segmented on its own; an image with a single column gives the same
+    crops as columns=False.
+    """
+    arr = np.asarray(img)
     # If image is RGB, convert to grayscale array
     if arr.ndim == 3:
         arr = arr.mean(axis=2)
     # In binarized image, text ~ 0 (black), background ~ 255 (white)
-    # Compute horizontal projection of dark pixels
-    proj = (arr < 200).sum(axis=1)
-    # Identify runs where projection exceeds a small threshold
-    thr = max(5, int(arr.shape[1] * 0.01))
-    lines: List[Tuple[int,int]] = []
-    in_run = False
-    start = 0
-    for i, v in enumerate(proj):
-        if v > thr and not in_run:
-            in_run = True
-            start = i
-        elif v <= thr and in_run:
-            in_run = False
-            end = i
-            if end - start > 8:  # minimum height
-                lines.append((start, end))
-    if in_run:
-        end = len(proj) - 1
-        if end - start > 8:
-            lines.append((start, end))
+    dark = arr < 200
+    h, w = dark.shape
+    bands = _column_bands(dark) if columns else [(0, w)]
     crops: List[Image.Image] = []
-    for (s, e) in lines:
-        # Add small padding
-        s2 = max(0, s - 2)
-        e2 = min(arr.shape[0], e + 2)
-        crop = img.crop((0, s2, img.width, e2))
-        crops.append(crop)
+    for c0, c1 in bands:
+        # Horizontal projection of dark pixels; rows above a small threshold are text
+        proj = np.count_nonzero(dark[:, c0:c1], axis=1)
+        thr = max(LINE_MIN_DARK, int((c1 - c0) * 0.01))
+        for s, e in _runs(proj > thr, LINE_MIN_HEIGHT):
+            # Add small padding
+            crops.append(img.crop((c0, max(0, s - 2), c1, min(h, e + 2))))
     # Fallback: return the full image if segmentation fails
     return crops or [img]
 
 
-def _azure_ocr_text(image_path: str, endpoint: Optional[str], key: Optional[str]) -> str:
+def _azure_text(data: bytes, endpoint: Optional[str], key: Optional[str]) -> str:
+    """Read API text via the shared async client when aiohttp is available, else the blocking SDK."""
+    from . import azure_async
+    if azure_async.aiohttp is None:
+        return _azure_ocr_text(data, endpoint=endpoint, key=key)
+    return azure_async.get_worker(endpoint, key).read_text(data)
+
+
+def _azure_ocr_text(data: bytes, endpoint: Optional[str], key: Optional[str]) -> str:
     """Use Azure Computer Vision Read API to extract text from an image."""
     import os
     ep = endpoint or os.environ.get("AZURE_CV_ENDPOINT")
@@ -145,8 +240,7 @@ def _azure_ocr_text(image_path: str, endpoint: Optional[str], key: Optional[str]
     if ComputerVisionClient is None:
         raise RuntimeError("Azure Computer Vision client not available. Install azure-cognitiveservices-vision-computervision and msrest.")
     client = ComputerVisionClient(ep, CognitiveServicesCredentials(k))
-    with open(image_path, "rb") as f:
-        result = client.read_in_stream(f, raw=True)
+    result = client.read_in_stream(io.BytesIO(data), raw=True)
     operation_location = result.headers.get("Operation-Location")
     if not operation_location:
         return ""
@@ -167,15 +261,9 @@ def _azure_ocr_text(image_path: str, endpoint: Optional[str], key: Optional[str]
 
 
 def append_to_csv(csv_path: str, multipliers: List[float], session_id: str = "OCR") -> None:
-    import pandas as pd
-    df = pd.DataFrame({"session_id": session_id, "multiplier": multipliers})
-    # append with header if file doesn't exist
-    try:
-        existing = pd.read_csv(csv_path)
-        out = pd.concat([existing, df], ignore_index=True)
-    except FileNotFoundError:
-        out = df
-    out.to_csv(csv_path, index=False)
+    # Shared with `add` and the server, so simultaneous captures can't lose rows
+    from .writer import append
+    append(csv_path, multipliers, session_id=session_id)
 
 
 def ocr_then_fit(image_path: str, csv_out: str | None = None):
@@ -185,3 +273,93 @@ def ocr_then_fit(image_path: str, csv_out: str | None = None):
     if csv_out:
         append_to_csv(csv_out, vals)
     return {"extracted": vals, "message": f"Extracted {len(vals)} values."}
+
+
+def iter_image_paths(inputs: List[str]) -> List[str]:
+    """Expand directories (non-recursive) and glob patterns into a sorted list of image files."""
+    import glob
+    import os
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(os.path.join(item, n) for n in os.listdir(item) if n.lower().endswith(IMAGE_EXTS))
+        elif glob.has_magic(item):
+            paths.extend(p for p in glob.glob(item) if p.lower().endswith(IMAGE_EXTS))
+        else:
+            paths.append(item)
+    return sorted(dict.fromkeys(paths))
+
+
+def extract_batch(inputs: List[str], invert: bool = False, threshold: int = 160, backend: str = "local",
+                  endpoint: Optional[str] = None, key: Optional[str] = None, workers: Optional[int] = None,
+                  cache=None, columns: bool = False):
+    """OCR many images on a bounded thread pool, yielding one result dict per image as it completes.
+
+    Each worker preprocesses an image and runs tesseract on its line crops; tesseract runs
+    as a subprocess, so threads give real parallelism and `workers` bounds the number of
+    concurrent tesseract processes.
+    """
+    import os
+    import time
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    def run(path):
+        t0 = time.perf_counter()
+        try:
+            with span("image", rows=1):
+                vals, n_lines = _extract(path, invert, threshold, backend, endpoint, key, cache, columns)
+            err = None
+        except Exception as e:
+            vals, n_lines, err = [], 0, str(e)
+        return {"path": path, "values": vals, "lines": n_lines, "seconds": time.perf_counter() - t0, "error": err}
+
+    paths = iter_image_paths(inputs)
+    if not workers:
+        # Azure work is network-bound; let enough threads wait to fill the in-flight limit
+        if backend == "azure":
+            from .azure_async import MAX_IN_FLIGHT
+            workers = MAX_IN_FLIGHT
+        else:
+            workers = os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        for fut in as_completed([ex.submit(run, p) for p in paths]):
+            yield fut.result()
+
+
+def ocr_batch_to_dataset(inputs: List[str], out: Optional[str] = None, session_id: Optional[str] = None,
+                         log=print, **kwargs) -> dict:
+    """Run extract_batch and append each image's values to `out` as soon as it completes.
+
+    Values are stored under `session_id`, or under the image's file name when it is None.
+    Returns totals plus images/s and lines/s throughput.
+    """
+    import os
+    import time
+    from .manual import append_values
+
+    t0 = time.perf_counter()
+    images = lines = values = errors = 0
+    for r in extract_batch(inputs, **kwargs):
+        images += 1
+        lines += r["lines"]
+        if r["error"]:
+            errors += 1
+            log(f"{r['path']}: error: {r['error']}")
+            continue
+        if out and r["values"]:
+            sid = session_id or os.path.splitext(os.path.basename(r["path"]))[0]
+            values += append_values(out, r["values"], session_id=sid)
+        else:
+            values += len(r["values"])
+        log(f"{r['path']}: {len(r['values'])} values, {r['lines']} lines in {r['seconds']:.2f}s")
+    elapsed = time.perf_counter() - t0
+    summary = {"images": images, "lines": lines, "values": values, "errors": errors, "seconds": elapsed,
+               "images_per_s": images / elapsed if elapsed else 0.0,
+               "lines_per_s": lines / elapsed if elapsed else 0.0}
+    log(f"Processed {images} images ({lines} lines, {errors} errors) in {elapsed:.2f}s: "
+        f"{summary['images_per_s']:.2f} images/s, {summary['lines_per_s']:.1f} lines/s; {values} values.")
+    cache = kwargs.get("cache")
+    if cache is not None:
+        summary["cache"] = cache.stats()
+        log(f"OCR cache: {cache.hits} hits, {cache.misses} misses ({summary['cache']['hit_rate']:.0%} hit rate).")
+    return summary
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+# Persistent OCR text cache. Keys hash the preprocessed crop's pixels together with the
+# preprocessing settings and backend, so overlapping screenshots only pay for new rows.
+MAX_ENTRIES = 200_000
+MAX_AGE = 30 * 24 * 3600
+# Run eviction after this many inserts
+EVICT_EVERY = 512
+
+
+def default_cache_path() -> str:
+    return os.environ.get("PLANE_OCR_CACHE") or os.path.join(os.path.expanduser("~"), ".cache", "plane", "ocr.sqlite")
+
+
+class OCRCache:
+    def __init__(self, path: Optional[str] = None, max_entries: int = MAX_ENTRIES, max_age: float = MAX_AGE):
+        self.path = path or default_cache_path()
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS ocr (key TEXT PRIMARY KEY, text TEXT NOT NULL, "
+                             "created REAL NOT NULL, used REAL NOT NULL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS ocr_used ON ocr (used)")
+            self._db.commit()
+
+    @staticmethod
+    def image_key(img, **settings) -> str:
+        """Key for a PIL image (typically a preprocessed line crop) plus its settings."""
+        h = hashlib.sha256()
+        h.update(json.dumps([img.mode, img.size, sorted(settings.items())], default=str).encode("utf-8"))
+        h.update(img.tobytes())
+        return h.hexdigest()
+
+    @staticmethod
+    def bytes_key(data: bytes, **settings) -> str:
+        h = hashlib.sha256()
+        h.update(json.dumps(sorted(settings.items()), default=str).encode("utf-8"))
+        h.update(data)
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT text FROM ocr WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._db.execute("UPDATE ocr SET used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            return row[0]
+
+    def put(self, key: str, text: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO ocr (key, text, created, used) VALUES (?, ?, ?, ?)",
+                             (key, text, now, now))
+            self._db.commit()
+            self._puts += 1
+            due = self._puts % EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    def evict(self) -> int:
+        """Drop entries unused for max_age, then the least recently used beyond max_entries."""
+        with self._lock:
+            cur = self._db.execute("DELETE FROM ocr WHERE used < ?", (time.time() - self.max_age,))
+            removed = cur.rowcount
+            count = self._db.execute("SELECT COUNT(*) FROM ocr").fetchone()[0]
+            if count > self.max_entries:
+                cur = self._db.execute("DELETE FROM ocr WHERE key IN (SELECT key FROM ocr ORDER BY used LIMIT ?)",
+                                       (count - self.max_entries,))
+                removed += cur.rowcount
+            self._db.commit()
+            return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM ocr").fetchone()[0]
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "entries": entries,
+                "hit_rate": self.hits / total if total else 0.0}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,47 @@
+import os
+
+# Path conventions shared by the store, the stats sidecars and the appenders. This module
+# imports nothing heavy so light commands (add, merge, pf) can use it without numpy/pandas.
+STORE_SUFFIX = ".plane"
+MANIFEST = "manifest.json"
+
+
+def is_store(path: str) -> bool:
+    return path.rstrip("/\\").lower().endswith(STORE_SUFFIX)
+
+
+def stats_path(path: str) -> str:
+    if is_store(path):
+        return os.path.join(path, "stats.json")
+    return path + ".stats.json"
+
+
+def stats_fingerprint(path: str):
+    """(size, mtime_ns) of the data file, or of a store's manifest; None if it doesn't exist yet."""
+    target = os.path.join(path, MANIFEST) if is_store(path) else path
+    try:
+        st = os.stat(target)
+    except FileNotFoundError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def merge_manifest_path(path: str) -> str:
+    """Record of the inputs a deduplicating/incremental merge has folded into `path`."""
+    if is_store(path):
+        return os.path.join(path, "merge.json")
+    return path + ".merge.json"
+
+
+def merge_keys_path(path: str) -> str:
+    """Sorted uint64 round keys of the rows in `path`, kept next to the merge manifest."""
+    if is_store(path):
+        return os.path.join(path, "merge-keys.npy")
+    return path + ".keys.npy"
+
+
+def wal_dir(path: str) -> str:
+    """Directory holding the shared writer's log, checkpoint and locks for a dataset."""
+    if is_store(path):
+        return os.path.join(path, "wal")
+    return path + ".wal"
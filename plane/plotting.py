@@ -1,19 +1,145 @@
-import matplotlib.pyplot as plt
+import hashlib
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
 import numpy as np
 
+# Survival plots. The empirical curve is decimated on a grid of cells REL_ERR wide in both
+# log x and log S: along a monotone staircase only the first point entering each cell is
+# kept, so the drawn curve is off by less than one cell (a relative error below REL_ERR in x
+# and in S) while the point count is bounded by the number of cells crossed, not by n.
+# Models are evaluated on a log-spaced grid, dense near 1 and sparse in the tail.
+# Files are rendered on matplotlib's Agg canvas without pyplot, so no display is needed and
+# renders can run in worker processes.
+REL_ERR = 0.005
+MODEL_POINTS = 400
+FIGSIZE = (7, 5)
+DPI = 120
+
+
+def decimate_survival(t, S, rel_err: float = REL_ERR):
+    """Subset of the step curve (t, S) within relative error rel_err of the full curve on log axes."""
+    t = np.asarray(t, dtype=float)
+    S = np.asarray(S, dtype=float)
+    if t.size <= 2:
+        return t, S
+    w = np.log1p(rel_err)
+    cx = np.floor(np.log(t) / w).astype(np.int64)
+    cy = np.floor(np.log(np.maximum(S, 1e-300)) / w).astype(np.int64)
+    keep = np.empty(t.size, dtype=bool)
+    keep[0] = True
+    keep[1:] = (cx[1:] != cx[:-1]) | (cy[1:] != cy[:-1])
+    keep[-1] = True
+    return t[keep], S[keep]
+
+
+def _draw(ax, emp, fits, title=None, rel_err: Optional[float] = REL_ERR, logx: bool = True,
+          points: int = MODEL_POINTS):
+    t, S = emp.t, emp.S
+    if rel_err:
+        t, S = decimate_survival(t, S, rel_err)
+    ax.step(t, S, where='post', label='Empirical S(x)')
+    if t.size:
+        hi = max(float(t[-1]), 1.0 + 1e-9)
+        grid_t = np.geomspace(1, hi, points) if logx else np.linspace(1, hi, points)
+        for f in fits:
+            ax.plot(grid_t, np.broadcast_to(f["survival"](grid_t), grid_t.shape), label=f["name"])
+    if logx:
+        ax.set_xscale('log')
+    ax.set_yscale('log')
+    ax.set_xlabel('x')
+    ax.set_ylabel('S(x)=P(X>=x)')
+    ax.set_title(title or 'Survival Function (log scale)')
+    ax.legend()
 
-def plot_survival(emp, fits):
-    t = emp["t"]
-    S = emp["S"]
-    plt.figure(figsize=(7,5))
-    plt.step(t, S, where='post', label='Empirical S(x)')
-    grid_t = np.linspace(1, t.max(), 300)
-    for f in fits:
-        plt.plot(grid_t, f["survival"](grid_t), label=f["name"])
-    plt.yscale('log')
-    plt.xlabel('x')
-    plt.ylabel('S(x)=P(X>=x)')
-    plt.title('Survival Function (log scale)')
-    plt.legend()
-    plt.tight_layout()
+
+def plot_survival(emp, fits, out: Optional[str] = None, title: Optional[str] = None,
+                  rel_err: Optional[float] = REL_ERR, logx: bool = True):
+    """Show the plot interactively, or write it to `out` (PNG/SVG/PDF by suffix) without a display.
+
+    emp is an EmpiricalSurvival evaluator. rel_err=None draws every unique value.
+    """
+    if out:
+        return save_survival_plot(out, emp, fits, title=title, rel_err=rel_err, logx=logx)
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=FIGSIZE)
+    _draw(ax, emp, fits, title, rel_err, logx)
+    fig.tight_layout()
     plt.show()
+
+
+def save_survival_plot(path: str, emp, fits, title: Optional[str] = None, rel_err: Optional[float] = REL_ERR,
+                       logx: bool = True, dpi: int = DPI) -> str:
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=FIGSIZE)
+    _draw(fig.subplots(), emp, fits, title, rel_err, logx)
+    fig.tight_layout()
+    fig.savefig(path, dpi=dpi)
+    return path
+
+
+def _safe_name(group) -> str:
+    return re.sub(r"[^\w.-]+", "_", str(group)).strip("._") or "group"
+
+
+def _file_names(groups) -> List[str]:
+    """Distinct file names for the groups; names that collide (ignoring case) get a short hash."""
+    names = [_safe_name(g) for g in groups]
+    counts = {}
+    for nm in names:
+        counts[nm.lower()] = counts.get(nm.lower(), 0) + 1
+    out, used = [], set()
+    for i, (g, nm) in enumerate(zip(groups, names)):
+        if counts[nm.lower()] > 1:
+            nm = f"{nm}-{hashlib.sha1(str(g).encode('utf-8')).hexdigest()[:8]}"
+        if nm.lower() in used:
+            nm = f"{nm}-{i}"
+        used.add(nm.lower())
+        out.append(nm)
+    return out
+
+
+def _render_task(task):
+    from .fit import fit_models
+    from .survival import empirical_survival
+    group, x, path, models, rel_err, logx = task
+    fits = fit_models(x, models)
+    save_survival_plot(path, empirical_survival(x), fits, title=f"{group} (n={x.size})", rel_err=rel_err,
+                       logx=logx)
+    return path
+
+
+def render_groups(x, out_dir: str, sessions=None, window: Optional[int] = None, step: Optional[int] = None,
+                  fmt: str = "png", models=None, workers: Optional[int] = None,
+                  rel_err: Optional[float] = REL_ERR, logx: bool = True) -> List[str]:
+    """Fit and plot each session (or each rolling window of rounds) into out_dir, one file per group.
+
+    Groups render on a process pool; returns the written paths in group order.
+    """
+    if (window is not None and window < 1) or (step is not None and step < 1):
+        raise ValueError("window and step must be at least 1")
+    x = np.asarray(x, dtype=float)
+    if window is not None:
+        step = step or window
+        groups = [(f"rounds-{lo}-{lo + window}", x[lo:lo + window])
+                  for lo in range(0, max(x.size - window, 0) + 1, step)]
+    elif sessions is not None:
+        import pandas as pd
+        codes, labels = pd.factorize(pd.Series(sessions), sort=False)
+        order = np.argsort(codes, kind="stable")
+        bounds = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=len(labels)))))
+        xs = x[order]
+        groups = [(labels[i], xs[bounds[i]:bounds[i + 1]]) for i in range(len(labels))]
+    else:
+        groups = [("all", x)]
+    os.makedirs(out_dir, exist_ok=True)
+    names = _file_names([g for g, _ in groups])
+    tasks = [(g, v, os.path.join(out_dir, f"{nm}.{fmt}"), models, rel_err, logx)
+             for (g, v), nm in zip(groups, names)]
+    workers = min(workers or os.cpu_count() or 1, len(tasks)) if tasks else 1
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            return list(ex.map(_render_task, tasks))
+    return [_render_task(t) for t in tasks]
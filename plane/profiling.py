@@ -0,0 +1,163 @@
+import json
+import os
+import threading
+import time
+from typing import List, Optional
+
+# Lightweight stage timing. Code marks stages with
+#
+#     with span("load") as sp:
+#         df = load_sessions(...)
+#         sp.rows = len(df)
+#
+# While no Profiler is active, span() returns a shared no-op object, so instrumented code
+# costs one global lookup and a call per span. Spans nest per thread; a span's path is the
+# names of the open spans joined by "/".
+_active = None
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, key, value):
+        pass
+
+
+_NULL = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("prof", "name", "rows", "path", "start")
+
+    def __init__(self, prof, name, rows):
+        self.prof = prof
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        stack = self.prof._stack()
+        stack.append(self.name)
+        self.path = "/".join(stack)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        self.prof._stack().pop()
+        self.prof.records.append((self.path, self.start, end - self.start, self.rows, threading.get_ident()))
+        return False
+
+
+def span(name: str, rows: Optional[int] = None):
+    """Time a stage when profiling is on; `rows` (settable on the span) gives its throughput."""
+    prof = _active
+    if prof is None:
+        return _NULL
+    return _Span(prof, name, rows)
+
+
+class Profiler:
+    """Collects spans while active, optionally under cProfile as well."""
+
+    def __init__(self, cprofile: bool = False):
+        self.records = []
+        self._local = threading.local()
+        self._cprofile = None
+        if cprofile:
+            import cProfile
+            self._cprofile = cProfile.Profile()
+        self.start = self.end = None
+
+    def _stack(self) -> List[str]:
+        s = getattr(self._local, "stack", None)
+        if s is None:
+            s = self._local.stack = []
+        return s
+
+    def __enter__(self):
+        global _active
+        _active = self
+        self.start = time.perf_counter()
+        if self._cprofile is not None:
+            self._cprofile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        global _active
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        self.end = time.perf_counter()
+        _active = None
+        return False
+
+    @property
+    def wall(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+    def stages(self) -> List[dict]:
+        """Spans aggregated by path, in order of first appearance."""
+        agg = {}
+        for path, _, dur, rows, _ in self.records:
+            a = agg.get(path)
+            if a is None:
+                a = agg[path] = {"stage": path, "calls": 0, "seconds": 0.0, "rows": None}
+            a["calls"] += 1
+            a["seconds"] += dur
+            if rows is not None:
+                a["rows"] = (a["rows"] or 0) + int(rows)
+        # Parents close after their children, so order by first start instead of record order
+        first = {}
+        for path, start, *_ in self.records:
+            first[path] = min(first.get(path, start), start)
+        return sorted(agg.values(), key=lambda a: first[a["stage"]])
+
+    def report(self) -> str:
+        wall = self.wall
+        lines = [f"{'stage':<36} {'calls':>6} {'seconds':>9} {'%':>6} {'rows':>10} {'rows/s':>10}"]
+        for a in self.stages():
+            depth = a["stage"].count("/")
+            name = "  " * depth + a["stage"].rsplit("/", 1)[-1]
+            rows = a["rows"]
+            rate = f"{rows / a['seconds']:.3g}" if rows and a["seconds"] > 0 else ""
+            lines.append(f"{name:<36} {a['calls']:>6} {a['seconds']:>9.4f} {100 * a['seconds'] / wall:>6.1f} "
+                         f"{rows if rows is not None else '':>10} {rate:>10}")
+        lines.append(f"{'total (wall)':<36} {'':>6} {wall:>9.4f} {100.0:>6.1f}")
+        return "\n".join(lines)
+
+    def trace_events(self) -> dict:
+        """Spans in Chrome trace-event format (chrome://tracing, Perfetto)."""
+        pid = os.getpid()
+        events = []
+        for path, start, dur, rows, tid in self.records:
+            ev = {"name": path.rsplit("/", 1)[-1], "cat": path, "ph": "X", "pid": pid, "tid": tid,
+                  "ts": (start - self.start) * 1e6, "dur": dur * 1e6}
+            if rows is not None:
+                ev["args"] = {"rows": int(rows)}
+            events.append(ev)
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, path: str) -> None:
+        """Write a JSON trace (.json) or, when cProfile ran, pstats data (any other suffix)."""
+        if path.lower().endswith(".json"):
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.trace_events(), f)
+        elif self._cprofile is not None:
+            self._cprofile.dump_stats(path)
+        else:
+            raise ValueError("cProfile output needs a Profiler(cprofile=True)")
+
+    def top_functions(self, n: int = 20) -> str:
+        """The n functions with the most cumulative time, as pstats prints them."""
+        if self._cprofile is None:
+            return ""
+        import io
+        import pstats
+        buf = io.StringIO()
+        pstats.Stats(self._cprofile, stream=buf).sort_stats("cumulative").print_stats(n)
+        return buf.getvalue()
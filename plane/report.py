@@ -1,17 +1,87 @@
 import numpy as np
 
 
-def summarize_fit(fits, best):
+def summarize_fit(fits, best, gof=None):
+    # gof: optional plane.gof.gof_tests results, shown under each model
+    gof = {g["name"]: g for g in gof or []}
     lines = []
     lines.append("Model fits (lower AIC is better):")
     for f in sorted(fits, key=lambda d: d["aic"]):
-        lines.append(f"- {f['name']}: AIC={f['aic']:.2f}, ll={f['ll']:.2f}, params={f['params']}")
+        line = f"- {f['name']}: AIC={f['aic']:.2f}, ll={f['ll']:.2f}, k={f['k']}, params={f['params']}"
+        if "fit_time" in f:
+            line += f", fit {f['fit_time'] * 1000:.1f} ms"
+        if f.get("pseudo_ll"):
+            line += " (pseudo log-likelihood; not ranked)"
+        lines.append(line)
+        g = gof.get(f["name"])
+        if g is not None:
+            lines.append("    " + _gof_line(g))
     lines.append("")
     lines.append(f"Best: {best['name']} with params {best['params']}")
+    if gof:
+        g = next(iter(gof.values()))
+        grid = f"values on a {g['h']:g} grid, randomized PIT" if g["h"] else "continuous values"
+        lines.append(f"GOF on n={g['n']} ({grid}); p-values from a parametric bootstrap with refits.")
     return "\n".join(lines)
 
 
+def _gof_line(g):
+    line = f"GOF: KS D={g['ks']:.4g}, AD A2={g['ad']:.4g}, tail CvM AU2={g['cvm_tail']:.4g}"
+    if g["pvalues"]:
+        p = g["pvalues"]
+        line += (f"; p = {p['ks']:.3f} / {p['ad']:.3f} / {p['cvm_tail']:.3f} "
+                 f"({g['reps']} replicates of {g['boot_n']})")
+        if g.get("failed"):
+            line += f", {g['failed']} failed refits dropped"
+    elif g.get("failed"):
+        line += f"; no p-values (all {g['failed']} bootstrap refits failed)"
+    return line
+
+
 def prob_ge_thresholds(best, xs):
-    xs = np.asarray(xs)
-    S = best["survival"]
-    return np.array([float(S(x)) for x in xs])
+    # Survival functions are vectorized: one call for the whole threshold array
+    xs = np.asarray(xs, dtype=float)
+    return np.broadcast_to(best["survival"](xs), xs.shape).astype(float)
+
+
+def summarize_bootstrap(boot, best=None):
+    # best: the full fit's best model, flagged when the bootstrap doesn't cover it
+    lines = []
+    lines.append(f"Bootstrap ({boot['reps']} replicates, {boot['ci']:.0%} percentile CIs):")
+    ranked = [n for n, m in boot["models"].items() if m["aic_best_freq"] is not None]
+    for name, m in sorted(boot["models"].items(), key=lambda kv: -(kv[1]["aic_best_freq"] or -1)):
+        ps = ", ".join(f"{k}=[{lo:.4g}, {hi:.4g}]" for k, (lo, hi) in m["params"].items())
+        if m["aic_best_freq"] is None:
+            lines.append(f"- {name}: not ranked (pseudo log-likelihood); {ps}")
+        else:
+            lines.append(f"- {name}: best by AIC among {' and '.join(ranked)} in {m['aic_best_freq']:.1%} "
+                         f"of replicates; {ps}")
+    if best is not None and best["name"] not in boot["models"]:
+        lines.append(bootstrap_note(boot, best))
+    return "\n".join(lines)
+
+
+def bootstrap_note(boot, best):
+    return (f"Note: the bootstrap covers the closed-form models only ({', '.join(boot['models'])}); "
+            f"it has no CIs or win rate for the best model, {best['name']}.")
+
+
+def summarize_simulation(sim):
+    lines = []
+    desc = f"{sim['strategy']} bet {sim['bet']:g} cashing out at {sim['target']:g}x"
+    if sim["strategy"] == "martingale":
+        desc += f", x{sim['factor']:g} after a loss"
+    if sim["stop_loss"] is not None or sim["take_profit"] is not None:
+        desc += f", stop-loss {sim['stop_loss']}, take-profit {sim['take_profit']}"
+    lines.append(f"Simulated {sim['paths']} paths x {sim['rounds']} rounds from {sim['model']} "
+                 f"(bankroll {sim['bankroll']:g}; {desc}):")
+    lines.append(f"- P(ruin) = {sim['ruin_prob']:.4f}")
+    if sim["stop_loss"] is not None:
+        lines.append(f"- P(stop-loss hit) = {sim['stop_loss_prob']:.4f}")
+    if sim["take_profit"] is not None:
+        lines.append(f"- P(take-profit hit) = {sim['take_profit_prob']:.4f}")
+    lines.append(f"- Expected return = {sim['expected_return']:+.2%} of bankroll (RTP {sim['rtp']:.4f} per unit staked)")
+    lines.append(f"- Final bankroll: mean {sim['mean_final']:.2f}, sd {sim['std_final']:.2f}; "
+                 f"mean rounds played {sim['mean_rounds']:.1f}")
+    lines.append("- Quantiles: " + ", ".join(f"q{q:g}={v:.2f}" for q, v in sim["quantiles"].items()))
+    return "\n".join(lines)
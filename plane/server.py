@@ -0,0 +1,406 @@
+import bisect
+import json
+import os
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from .data import load_sessions
+from .fit import fit_models, best_model_by_aic, MODELS
+from .incremental import DatasetStats, STATS_MODELS, fit_models_from_stats
+from .survival import EmpiricalSurvival
+
+# Long-running JSON API over one in-memory copy of a dataset. Appends go to the file and to
+# memory and merge into the running statistics and the empirical survival in O(batch + unique
+# values). Queries read the latest complete fit set; after appends one background thread
+# refits it (closed-form models from the running statistics, the rest from the values), so
+# requests never wait on an optimizer unless they ask for "fresh" fits.
+MAX_PF_ROUNDS = 100_000
+MAX_BODY = 16 * 1024 * 1024
+# Latency histogram bucket upper bounds in milliseconds
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyHistogram:
+    """Per-endpoint request latency counts in fixed buckets (thread-safe)."""
+
+    def __init__(self, bounds_ms=LATENCY_BUCKETS_MS):
+        self.bounds = tuple(bounds_ms)
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def observe(self, route: str, seconds: float) -> None:
+        ms = seconds * 1000.0
+        i = bisect.bisect_left(self.bounds, ms)
+        with self._lock:
+            r = self._routes.get(route)
+            if r is None:
+                r = self._routes[route] = {"counts": [0] * (len(self.bounds) + 1), "count": 0, "sum_ms": 0.0,
+                                           "max_ms": 0.0}
+            r["counts"][i] += 1
+            r["count"] += 1
+            r["sum_ms"] += ms
+            r["max_ms"] = max(r["max_ms"], ms)
+
+    def _quantile(self, counts, total, q):
+        # Upper bound of the bucket holding the q-th request
+        k = q * total
+        cum = 0
+        for i, c in enumerate(counts):
+            cum += c
+            if cum >= k:
+                return self.bounds[i] if i < len(self.bounds) else None
+        return None
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            routes = {k: dict(v, counts=list(v["counts"])) for k, v in self._routes.items()}
+        out = {}
+        for route, r in routes.items():
+            n = r["count"]
+            out[route] = {
+                "count": n, "mean_ms": r["sum_ms"] / n if n else 0.0, "max_ms": r["max_ms"],
+                "p50_ms": self._quantile(r["counts"], n, 0.5), "p90_ms": self._quantile(r["counts"], n, 0.9),
+                "p99_ms": self._quantile(r["counts"], n, 0.99),
+                "buckets": [{"le_ms": b, "count": c} for b, c in zip(list(self.bounds) + [None], r["counts"])],
+            }
+        return out
+
+
+class DatasetState:
+    """A dataset held in memory with its running statistics, empirical survival and fits."""
+
+    def __init__(self, path: str, column: str = "multiplier", session_col: Optional[str] = None,
+                 models=None, persist: bool = True):
+        self.path = path
+        self.column = column
+        self.session_col = session_col
+        self.models = tuple(models or MODELS)
+        self.persist = persist
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            df = load_sessions(path, multiplier_col=column, session_col=session_col)
+            x = df["multiplier"].to_numpy(dtype=float)
+            sessions = df["session_id"].values if session_col else None
+        else:
+            x, sessions = np.zeros(0), None
+        self._buf = np.array(x, dtype=float)
+        self._n = self._buf.size
+        self.stats = DatasetStats(column, session_col).update_arrays(x, sessions)
+        self.emp = EmpiricalSurvival.from_sorted(np.sort(x[x >= 1]))
+        self.version = 0
+        self._cond = threading.Condition(self._lock)
+        self._refitting = False
+        # Failed background refits so far and the last error, for readers waiting on fresh fits
+        self._refit_failures = 0
+        self._refit_error = None
+        self._fit_set = (-1, [])
+        self._fit_set = self._fit_current()
+
+    @property
+    def values(self) -> np.ndarray:
+        # Appends only write past _n or swap in a new buffer, so this view never changes
+        return self._buf[:self._n]
+
+    def append(self, values, session_id="api") -> int:
+        vals = np.asarray([v for v in values if v >= 1], dtype=float)
+        if vals.size == 0:
+            return 0
+        if self.persist:
+            # Durable first; concurrent requests share the writer's group commits
+            from .manual import append_values
+            append_values(self.path, vals.tolist(), session_id=session_id)
+        with self._lock:
+            if self._n + vals.size > self._buf.size:
+                grown = np.empty(max(2 * self._buf.size, self._n + vals.size, 1024))
+                grown[:self._n] = self._buf[:self._n]
+                self._buf = grown
+            self._buf[self._n:self._n + vals.size] = vals
+            self._n += vals.size
+            self.stats.update(vals, session_id)
+            self.emp = self.emp.merged(vals)
+            self.version += 1
+        return int(vals.size)
+
+    def _fit_current(self):
+        with self._lock:
+            # Running statistics change in place, so the O(1) fits are taken under the lock
+            version, x, n = self.version, self.values, self.stats.total.n
+            quick = fit_models_from_stats(self.stats.total, self.models) if n else []
+        slow = fit_models(x, [m for m in self.models if m not in STATS_MODELS]) if x.size else []
+        by_name = {f["name"]: f for f in quick + slow}
+        return version, [by_name[m] for m in self.models if m in by_name]
+
+    def _refit_loop(self):
+        try:
+            while True:
+                version, fits = self._fit_current()
+                with self._cond:
+                    self._fit_set = (version, fits)
+                    self._cond.notify_all()
+                    if version == self.version:
+                        self._refitting = False
+                        return
+        except Exception as e:
+            with self._cond:
+                self._refit_failures += 1
+                self._refit_error = e
+        finally:
+            # Whatever happened, the next stale read may start a new refit
+            with self._cond:
+                self._refitting = False
+                self._cond.notify_all()
+
+    def fits(self, models=None, fresh: bool = False):
+        """Latest complete fit set; a stale set triggers one background refit.
+
+        All models in a set share one data version, so their AICs stay comparable.
+        fresh=True waits until the set covers every append made before the call, and raises
+        RuntimeError if the refit it waited on failed.
+        """
+        unknown = [m for m in models or () if m not in self.models]
+        if unknown:
+            raise ValueError(f"Models not served: {', '.join(unknown)}")
+        with self._cond:
+            want = self.version
+            if self._fit_set[0] < want and not self._refitting:
+                self._refitting = True
+                threading.Thread(target=self._refit_loop, name="plane-refit", daemon=True).start()
+            if fresh:
+                failures = self._refit_failures
+                self._cond.wait_for(lambda: self._fit_set[0] >= want or self._refit_failures != failures)
+                if self._fit_set[0] < want:
+                    e = self._refit_error
+                    raise RuntimeError(f"Refitting failed: {type(e).__name__}: {e}")
+            fits = self._fit_set[1]
+        return [f for f in fits if f["name"] in models] if models else fits
+
+    @property
+    def fit_version(self) -> int:
+        return self._fit_set[0]
+
+
+def _fit_json(f) -> dict:
+    d = {"name": f["name"], "params": {k: float(v) for k, v in f["params"].items()}, "ll": float(f["ll"]),
+         "aic": float(f["aic"]), "k": f["k"]}
+    if f.get("pseudo_ll"):
+        d["pseudo_ll"] = True
+    return d
+
+
+def _floats(v):
+    # "1.5,2,3" from a query string, or a JSON list
+    if isinstance(v, str):
+        return [float(t) for t in v.replace(",", " ").split()]
+    if isinstance(v, (int, float)):
+        return [float(v)]
+    return [float(t) for t in v]
+
+
+def _models(params):
+    m = params.get("models")
+    if m is None:
+        return None
+    return tuple(m.split(",")) if isinstance(m, str) else tuple(m)
+
+
+class PlaneServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr, state: DatasetState, handler=None):
+        super().__init__(addr, handler or _Handler)
+        self.state = state
+        self.latency = LatencyHistogram()
+        self.started = time.time()
+
+
+if hasattr(socketserver, "UnixStreamServer"):
+    class PlaneUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+        def __init__(self, path, state: DatasetState):
+            super().__init__(path, _UnixHandler)
+            self.state = state
+            self.latency = LatencyHistogram()
+            self.started = time.time()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, code, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _params(self, url):
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY:
+            raise ValueError("Request body too large")
+        if length:
+            body = json.loads(self.rfile.read(length).decode("utf-8"))
+            if not isinstance(body, dict):
+                raise ValueError("JSON body must be an object")
+            params.update(body)
+        return params
+
+    def _dispatch(self):
+        t0 = time.perf_counter()
+        url = urlparse(self.path)
+        route = url.path.rstrip("/") or "/"
+        fn = ROUTES.get(route)
+        try:
+            if fn is None:
+                code, body = 404, {"error": f"Unknown endpoint {route}", "endpoints": sorted(ROUTES)}
+            else:
+                code, body = 200, fn(self.server, self._params(url))
+        except (ValueError, KeyError, TypeError) as e:
+            code, body = 400, {"error": str(e)}
+        except Exception as e:
+            code, body = 500, {"error": f"{type(e).__name__}: {e}"}
+        self._send(code, body)
+        self.server.latency.observe(route if fn else "(unknown)", time.perf_counter() - t0)
+
+    do_GET = _dispatch
+    do_POST = _dispatch
+
+
+class _UnixHandler(_Handler):
+    def address_string(self):
+        return "unix"
+
+
+# Endpoints: each takes (server, params) and returns a JSON-serializable dict
+
+def _health(srv, params):
+    st = srv.state
+    return {"ok": True, "path": st.path, "n": int(st.stats.total.n), "version": st.version,
+            "fit_version": st.fit_version,
+            "uptime_s": time.time() - srv.started}
+
+
+def _flag(params, key):
+    return str(params.get(key, "")).lower() in ("1", "true", "yes")
+
+
+def _fits(srv, params):
+    fits = srv.state.fits(_models(params), fresh=_flag(params, "fresh"))
+    if not fits:
+        raise ValueError("No data to fit")
+    return fits
+
+
+def _fit(srv, params):
+    fits = _fits(srv, params)
+    return {"n": int(srv.state.stats.total.n), "version": srv.state.version, "fit_version": srv.state.fit_version,
+            "best": best_model_by_aic(fits)["name"], "fits": [_fit_json(f) for f in fits]}
+
+
+def _prob(srv, params):
+    from .lookup import prob_matrix
+    xs = _floats(params["x"])
+    fits = _fits(srv, params)
+    best = best_model_by_aic(fits)
+    out = {"x": xs, "best": best["name"], "empirical": srv.state.emp(xs).tolist()}
+    if _flag(params, "all"):
+        m = prob_matrix(fits, xs)
+        out["models"] = {f["name"]: m[i].tolist() for i, f in enumerate(fits)}
+    else:
+        out["p"] = prob_matrix([best], xs)[0].tolist()
+    return out
+
+
+def _survival(srv, params):
+    emp = srv.state.emp
+    if "x" in params:
+        xs = _floats(params["x"])
+        return {"n": emp.n, "x": xs, "S": emp(xs).tolist()}
+    return {"n": emp.n, "t": emp.t.tolist(), "S": emp.S.tolist()}
+
+
+def _append(srv, params):
+    values = _floats(params["values"])
+    added = srv.state.append(values, session_id=str(params.get("session", "api")))
+    return {"added": added, "n": int(srv.state.stats.total.n), "version": srv.state.version}
+
+
+def _pf(srv, params):
+    from .fair import sequence
+    rounds = int(params.get("rounds", 1))
+    if not 1 <= rounds <= MAX_PF_ROUNDS:
+        raise ValueError(f"rounds must be between 1 and {MAX_PF_ROUNDS}")
+    nonce = int(params.get("nonce", 0))
+    vals = sequence(str(params["server"]), str(params["client"]), nonce, rounds,
+                    house_edge=float(params.get("edge", 0.99)), workers=1)
+    return {"nonce": nonce, "multipliers": vals}
+
+
+def _simulate(srv, params):
+    from .simulate import simulate_strategy
+    fits = _fits(srv, params)
+    best = best_model_by_aic(fits)
+    opt = lambda k, cast, default: cast(params[k]) if params.get(k) is not None else default
+    sim = simulate_strategy(best, paths=opt("paths", int, 1000), rounds=opt("rounds", int, 1000),
+                            bankroll=opt("bankroll", float, 100.0), bet=opt("bet", float, 1.0),
+                            target=opt("target", float, 2.0), strategy=opt("strategy", str, "fixed"),
+                            factor=opt("factor", float, 2.0), stop_loss=opt("stop_loss", float, None),
+                            take_profit=opt("take_profit", float, None), seed=opt("seed", int, 0),
+                            workers=opt("workers", int, 1))
+    sim["quantiles"] = {str(k): v for k, v in sim["quantiles"].items()}
+    return sim
+
+
+def _metrics(srv, params):
+    from .writer import metrics
+    return {"latency": srv.latency.snapshot(), "writer": metrics()}
+
+
+ROUTES = {
+    "/": _health,
+    "/health": _health,
+    "/fit": _fit,
+    "/prob": _prob,
+    "/survival": _survival,
+    "/append": _append,
+    "/pf": _pf,
+    "/simulate": _simulate,
+    "/metrics": _metrics,
+}
+
+
+def make_server(state: DatasetState, host: str = "127.0.0.1", port: int = 8765, unix: Optional[str] = None):
+    if unix:
+        if not hasattr(socketserver, "UnixStreamServer"):
+            raise RuntimeError("Unix sockets are not available on this platform; use --port")
+        if os.path.exists(unix):
+            os.remove(unix)
+        return PlaneUnixServer(unix, state)
+    return PlaneServer((host, port), state)
+
+
+def serve(path: str, column: str = "multiplier", session_col: Optional[str] = None, host: str = "127.0.0.1",
+          port: int = 8765, unix: Optional[str] = None, models=None, persist: bool = True) -> None:
+    state = DatasetState(path, column, session_col, models=models, persist=persist)
+    srv = make_server(state, host, port, unix)
+    where = unix or "http://%s:%d" % srv.server_address[:2]
+    print(f"Serving {path} ({state.stats.total.n} rows) on {where}")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.server_close()
+        if unix and os.path.exists(unix):
+            os.remove(unix)
@@ -0,0 +1,166 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
+
+from .fit import make_fit
+
+# Monte Carlo bankroll simulation of cash-out strategies against a fitted model.
+# Paths are split into fixed-size jobs seeded from one SeedSequence (results depend on
+# `seed` only, not on the number of workers). Each job walks its paths through the rounds
+# in (paths x rounds) blocks of at most CHUNK_ELEMS draws: inside a block the bankroll is
+# a cumulative sum and the first stop/ruin is found with argmax, so no per-round Python loop.
+# Stopped paths drop out of later blocks.
+PATH_JOB = 1024
+CHUNK_ELEMS = 1 << 20
+STRATEGIES = ("fixed", "martingale", "stop")
+QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+# Bankroll comparisons allow this fraction of a bet, since cumulative sums round differently
+EPS = 1e-9
+
+# Path status codes
+ACTIVE, RUIN, STOP_LOSS, TAKE_PROFIT = 0, 1, 2, 3
+
+
+def _stakes(win, streak0, bet, factor):
+    # Martingale stake per round: bet * factor**(losses in a row before the round).
+    # Loss streaks carry over from the previous block through streak0.
+    r = win.shape[1]
+    t = np.arange(r)
+    last_win = np.maximum.accumulate(np.where(win, t, -1), axis=1)
+    after = np.where(last_win >= 0, t - last_win, t + 1 + streak0[:, None])
+    before = np.concatenate((streak0[:, None], after[:, :-1]), axis=1)
+    with np.errstate(over="ignore"):
+        return bet * np.power(factor, before.astype(float)), after[:, -1]
+
+
+def _block(sample, rng, bank, streak, spec, r):
+    """Play r rounds for every path; returns (first-event index or -1, event code, bank, staked, streak)."""
+    bet, target = spec["bet"], spec["target"]
+    x = sample(rng, (bank.size, r))
+    win = x >= target
+    if spec["strategy"] == "martingale":
+        stake, streak_end = _stakes(win, streak, bet, spec["factor"])
+    else:
+        stake, streak_end = np.full(win.shape, bet), streak
+    with np.errstate(over="ignore", invalid="ignore"):
+        pnl = np.where(win, stake * (target - 1), -stake)
+        after = bank[:, None] + np.cumsum(pnl, axis=1)
+        before = np.concatenate((bank[:, None], after[:, :-1]), axis=1)
+        staked = np.cumsum(stake, axis=1)
+        # Events are checked before each round: the bankroll can't cover the stake (ruin),
+        # or it has reached the stop-loss / take-profit bound
+        code = np.zeros(win.shape, dtype=np.int8)
+        code[stake > before + EPS * bet] = RUIN
+        if spec["lower"] is not None:
+            code[before <= spec["lower"] + EPS * bet] = STOP_LOSS
+        if spec["upper"] is not None:
+            code[before >= spec["upper"] - EPS * bet] = TAKE_PROFIT
+    hit = code > 0
+    first = np.where(hit.any(axis=1), np.argmax(hit, axis=1), -1)
+    rows = np.arange(bank.size)
+    stopped = first >= 0
+    h = first[stopped]
+    new_bank = after[:, -1].copy()
+    new_bank[stopped] = before[rows[stopped], h]
+    new_staked = staked[:, -1].copy()
+    new_staked[stopped] = np.where(h > 0, staked[rows[stopped], h - 1], 0.0)
+    events = np.zeros(bank.size, dtype=np.int8)
+    events[stopped] = code[rows[stopped], h]
+    return first, events, new_bank, new_staked, streak_end
+
+
+def _final_status(bank, streak, spec):
+    # A path still running after the last round gets the same checks as before a round
+    if spec["strategy"] == "martingale":
+        stake = spec["bet"] * np.power(spec["factor"], streak.astype(float))
+    else:
+        stake = np.full(bank.size, spec["bet"])
+    code = np.zeros(bank.size, dtype=np.int8)
+    eps = EPS * spec["bet"]
+    code[stake > bank + eps] = RUIN
+    if spec["lower"] is not None:
+        code[bank <= spec["lower"] + eps] = STOP_LOSS
+    if spec["upper"] is not None:
+        code[bank >= spec["upper"] - eps] = TAKE_PROFIT
+    return code
+
+
+def _run_job(args):
+    seed, n_paths, spec = args
+    fit = make_fit(spec["model"], spec["params"], spec["ll"])
+    sample = fit["sample"]
+    rng = np.random.default_rng(seed)
+    bank = np.full(n_paths, float(spec["bankroll"]))
+    staked = np.zeros(n_paths)
+    rounds = np.zeros(n_paths, dtype=np.int64)
+    status = np.zeros(n_paths, dtype=np.int8)
+    streak = np.zeros(n_paths, dtype=np.int64)
+    active = np.arange(n_paths)
+    done = 0
+    while active.size and done < spec["rounds"]:
+        r = min(spec["rounds"] - done, max(1, CHUNK_ELEMS // active.size))
+        first, events, b, s, k = _block(sample, rng, bank[active], streak[active], spec, r)
+        bank[active] = b
+        staked[active] += s
+        streak[active] = k
+        rounds[active] += np.where(first >= 0, first, r)
+        status[active] = events
+        active = active[first < 0]
+        done += r
+    if active.size:
+        status[active] = _final_status(bank[active], streak[active], spec)
+    return bank, staked, rounds, status
+
+
+def simulate_strategy(fit: dict, paths: int = 1000, rounds: int = 1000, bankroll: float = 100.0,
+                      bet: float = 1.0, target: float = 2.0, strategy: str = "fixed", factor: float = 2.0,
+                      stop_loss: Optional[float] = None, take_profit: Optional[float] = None,
+                      seed: int = 0, workers: Optional[int] = None) -> dict:
+    """Simulate `paths` bankrolls for up to `rounds` rounds each, cashing out at `target`.
+
+    strategy: "fixed" bets `bet` every round; "martingale" multiplies the stake by `factor`
+    after each loss and resets it after a win; "stop" is the fixed bet that quits once the
+    bankroll has lost `stop_loss` or gained `take_profit` (both limits also apply to the
+    other strategies when given). A path is ruined when its bankroll can't cover the next stake.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy {strategy!r}; choose from {', '.join(STRATEGIES)}")
+    if strategy == "stop" and stop_loss is None and take_profit is None:
+        raise ValueError("The stop strategy needs stop_loss and/or take_profit")
+    if target <= 1:
+        raise ValueError("Cash-out target must be > 1")
+    spec = {"model": fit["name"], "params": fit["params"], "ll": fit["ll"], "strategy": strategy,
+            "rounds": int(rounds), "bankroll": float(bankroll), "bet": float(bet), "target": float(target),
+            "factor": float(factor),
+            "lower": None if stop_loss is None else bankroll - stop_loss,
+            "upper": None if take_profit is None else bankroll + take_profit}
+    sizes = [min(PATH_JOB, paths - lo) for lo in range(0, paths, PATH_JOB)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(s, n, spec) for s, n in zip(seeds, sizes)]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            parts = list(ex.map(_run_job, jobs))
+    else:
+        parts = [_run_job(j) for j in jobs]
+    final, staked, played, status = (np.concatenate(cols) for cols in zip(*parts))
+
+    profit = final - bankroll
+    total_staked = staked.sum()
+    return {
+        "model": fit["name"], "strategy": strategy, "paths": paths, "rounds": rounds, "bankroll": bankroll,
+        "bet": bet, "target": target, "factor": factor, "stop_loss": stop_loss, "take_profit": take_profit,
+        "seed": seed,
+        "ruin_prob": float(np.mean(status == RUIN)),
+        "stop_loss_prob": float(np.mean(status == STOP_LOSS)),
+        "take_profit_prob": float(np.mean(status == TAKE_PROFIT)),
+        "mean_final": float(final.mean()),
+        "std_final": float(final.std()),
+        "expected_return": float(profit.mean() / bankroll),
+        # Money returned per unit staked over all paths (1 = break-even)
+        "rtp": float(1 + profit.sum() / total_staked) if total_staked else float("nan"),
+        "mean_rounds": float(played.mean()),
+        "quantiles": {q: float(v) for q, v in zip(QUANTILES, np.quantile(final, QUANTILES))},
+    }
@@ -0,0 +1,169 @@
+import csv
+import json
+import os
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+from .paths import STORE_SUFFIX, MANIFEST, is_store
+
+# A store is a directory named *.plane holding a manifest plus immutable binary segments:
+#   manifest.json              rows, session dictionary, ordered segment list
+#   seg-00000001.mult.npy      float64 multipliers
+#   seg-00000001.sid.npy       uint32 codes into the manifest's session dictionary
+# Appends write a new segment and then atomically replace the manifest, so readers only
+# ever see complete segments. Segments are memory-mapped on read.
+# Fold all segments into one once an append pushes the count past this
+MAX_SEGMENTS = 256
+
+
+def _empty_manifest() -> dict:
+    return {"format": "plane-segments", "version": 1, "dtype": "<f8",
+            "rows": 0, "sessions": [], "segments": [], "next": 1}
+
+
+def read_manifest(path: str) -> dict:
+    try:
+        with open(os.path.join(path, MANIFEST), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        if os.path.isdir(path):
+            return _empty_manifest()
+        raise
+
+
+def _write_manifest(path: str, manifest: dict) -> None:
+    tmp = os.path.join(path, MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(path, MANIFEST))
+
+
+def _write_segment(path: str, manifest: dict, mult: np.ndarray, codes: np.ndarray) -> None:
+    name = f"seg-{manifest['next']:08d}"
+    for suffix, arr in ((".mult.npy", mult), (".sid.npy", codes)):
+        with open(os.path.join(path, name + suffix), "wb") as f:
+            np.save(f, arr)
+            f.flush()
+            os.fsync(f.fileno())
+    manifest["segments"].append({"name": name, "rows": int(mult.size)})
+    manifest["rows"] += int(mult.size)
+    manifest["next"] += 1
+
+
+def _session_code(manifest: dict, session_id) -> int:
+    sessions = manifest["sessions"]
+    sid = str(session_id)
+    try:
+        return sessions.index(sid)
+    except ValueError:
+        sessions.append(sid)
+        return len(sessions) - 1
+
+
+def append_store(path: str, values, session_id="manual") -> int:
+    """Append multipliers for one session as a new segment; O(batch) regardless of history size."""
+    os.makedirs(path, exist_ok=True)
+    manifest = read_manifest(path)
+    mult = np.asarray(values, dtype=np.float64).ravel()
+    if mult.size == 0:
+        return 0
+    codes = np.full(mult.size, _session_code(manifest, session_id), dtype=np.uint32)
+    _write_segment(path, manifest, mult, codes)
+    _write_manifest(path, manifest)
+    if len(manifest["segments"]) > MAX_SEGMENTS:
+        compact_store(path)
+    return int(mult.size)
+
+
+def _remove_segments(path: str, names) -> None:
+    for name in names:
+        for suffix in (".mult.npy", ".sid.npy"):
+            try:
+                os.remove(os.path.join(path, name + suffix))
+            except OSError:
+                pass
+
+
+def append_store_frame(path: str, multipliers, session_ids, replace: bool = False) -> int:
+    """Append rows carrying their own session ids (used by merge); replace=True swaps out the old contents."""
+    os.makedirs(path, exist_ok=True)
+    manifest = read_manifest(path)
+    old = []
+    if replace:
+        old = [seg["name"] for seg in manifest["segments"]]
+        manifest = dict(_empty_manifest(), next=manifest["next"])
+    mult = np.asarray(multipliers, dtype=np.float64).ravel()
+    if mult.size:
+        uniq, inv = np.unique(np.asarray(session_ids).astype(str), return_inverse=True)
+        lut = np.array([_session_code(manifest, s) for s in uniq], dtype=np.uint32)
+        _write_segment(path, manifest, mult, lut[inv.ravel()])
+    _write_manifest(path, manifest)
+    _remove_segments(path, old)
+    if len(manifest["segments"]) > MAX_SEGMENTS:
+        compact_store(path)
+    return int(mult.size)
+
+
+def iter_segments(path: str) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Yield memory-mapped (multipliers, session codes) per segment, in append order."""
+    manifest = read_manifest(path)
+    for seg in manifest["segments"]:
+        base = os.path.join(path, seg["name"])
+        yield (np.load(base + ".mult.npy", mmap_mode="r"),
+               np.load(base + ".sid.npy", mmap_mode="r"))
+
+
+def read_store(path: str) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """Return (multipliers, session codes, session dictionary).
+
+    A compacted (single-segment) store comes back as read-only memory maps with no copy.
+    """
+    manifest = read_manifest(path)
+    segs = list(iter_segments(path))
+    if not segs:
+        return np.zeros(0), np.zeros(0, dtype=np.uint32), manifest["sessions"]
+    if len(segs) == 1:
+        return segs[0][0], segs[0][1], manifest["sessions"]
+    return (np.concatenate([m for m, _ in segs]),
+            np.concatenate([c for _, c in segs]),
+            manifest["sessions"])
+
+
+def compact_store(path: str) -> None:
+    """Rewrite all segments as one so reads are a single zero-copy memory map."""
+    manifest = read_manifest(path)
+    old = [seg["name"] for seg in manifest["segments"]]
+    if len(old) <= 1:
+        return
+    mult, codes, _ = read_store(path)
+    manifest["segments"] = []
+    manifest["rows"] = 0
+    _write_segment(path, manifest, np.ascontiguousarray(mult), np.ascontiguousarray(codes))
+    _write_manifest(path, manifest)
+    del mult, codes
+    _remove_segments(path, old)
+
+
+def export_store(path: str, out: str) -> int:
+    """Write the store back out as CSV or JSON records (session_id, multiplier)."""
+    manifest = read_manifest(path)
+    sessions = np.array(manifest["sessions"], dtype=object)
+    if out.lower().endswith(".csv"):
+        with open(out, "w", encoding="utf-8", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(["session_id", "multiplier"])
+            for mult, codes in iter_segments(path):
+                w.writerows(zip(sessions[codes].tolist(), mult.tolist()))
+    elif out.lower().endswith(".json"):
+        recs = []
+        for mult, codes in iter_segments(path):
+            recs.extend({"session_id": s, "multiplier": float(v)}
+                        for s, v in zip(sessions[codes].tolist(), mult.tolist()))
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(recs, f)
+    else:
+        raise ValueError("Unsupported output format; use CSV or JSON")
+    return manifest["rows"]
@@ -1,15 +1,66 @@
 import numpy as np
 
 
-def empirical_survival(x: np.ndarray):
-    x = np.asarray(x)
+class EmpiricalSurvival:
+    """Empirical S(t)=P(X>=t) evaluator over the unique sample values and their counts."""
+
+    def __init__(self, t: np.ndarray, counts: np.ndarray):
+        self.t = np.asarray(t, dtype=float)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.n = int(self.counts.sum())
+        # tail[i] = #{x >= t[i]}; the trailing 0 answers thresholds above the max
+        tail = np.zeros(self.t.size + 1, dtype=np.int64)
+        tail[:-1] = np.cumsum(self.counts[::-1])[::-1]
+        self._tail = tail
+        self.S = tail[:-1] / self.n if self.n else np.zeros(0)
+
+    @classmethod
+    def from_sorted(cls, x_sorted: np.ndarray) -> "EmpiricalSurvival":
+        n = x_sorted.size
+        if n == 0:
+            return cls(np.zeros(0), np.zeros(0, dtype=np.int64))
+        # Run starts in the sorted array give the unique values and their counts in O(n)
+        starts = np.flatnonzero(np.concatenate(([True], x_sorted[1:] != x_sorted[:-1])))
+        counts = np.diff(np.append(starts, n))
+        return cls(x_sorted[starts], counts)
+
+    def __call__(self, thresholds):
+        """Vectorized S(t) for a scalar or an array of thresholds."""
+        thr = np.asarray(thresholds, dtype=float)
+        if not self.n:
+            return np.zeros(thr.shape)
+        idx = np.searchsorted(self.t, thr, side="left")
+        return self._tail[idx] / self.n
+
+    def merged(self, x) -> "EmpiricalSurvival":
+        """New evaluator with the values in x added; O(unique values), self is left unchanged."""
+        x = np.asarray(x, dtype=float).ravel()
+        x = x[~np.isnan(x)]
+        x = x[x >= 1]
+        if x.size == 0:
+            return self
+        u, c = np.unique(x, return_counts=True)
+        t, inv = np.unique(np.concatenate((self.t, u)), return_inverse=True)
+        counts = np.bincount(inv, weights=np.concatenate((self.counts, c)), minlength=t.size).astype(np.int64)
+        return EmpiricalSurvival(t, counts)
+
+    def __getitem__(self, key):
+        # Keep the historical dict-style access (emp["t"], emp["S"], emp["n"])
+        if key not in ("t", "S", "n"):
+            raise KeyError(key)
+        return getattr(self, key)
+
+
+def empirical_survival(x: np.ndarray) -> EmpiricalSurvival:
+    x = np.asarray(x, dtype=float)
     x = x[~np.isnan(x)]
     x = x[x >= 1]
-    x_sorted = np.sort(x)
-    n = x_sorted.size
-    # S(t) at unique t values
-    uniq = np.unique(x_sorted)
-    S = []
-    for t in uniq:
-        S.append(np.sum(x_sorted >= t) / n)
-    return {"t": uniq, "S": np.array(S), "n": n}
+    return EmpiricalSurvival.from_sorted(np.sort(x))
+
+
+def empirical_survival_chunks(chunks) -> EmpiricalSurvival:
+    """Build the evaluator from an iterable of arrays, keeping only unique values and counts."""
+    emp = EmpiricalSurvival(np.zeros(0), np.zeros(0, dtype=np.int64))
+    for x in chunks:
+        emp = emp.merged(x)
+    return emp
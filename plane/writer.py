@@ -0,0 +1,390 @@
+import csv
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import List, Optional
+
+from .paths import is_store, stats_path, stats_fingerprint, wal_dir
+from .profiling import span
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Shared appender for dataset files (CSV, JSON and .plane stores). Appends from any number
+# of threads and processes go through a write-ahead log in the dataset's wal directory
+# (<path>.wal/, or wal/ inside a store):
+#   log          JSON lines, one record per append, after a header naming the log generation
+#   ckpt.json    generation and byte offset up to which the log is applied to the dataset,
+#                plus the dataset's size and fingerprint while a batch is being applied and
+#                the byte ranges of the last FAILED_KEEP batches that failed
+#   log.lock     held briefly to add a record
+#   commit.lock  held by the leader applying records
+# An appender adds its record, then takes the commit lock. If an earlier leader already
+# applied the record it returns at once; otherwise it leads and applies every record in the
+# log (its own and all that queued up behind the previous leader) as one batch: one fsync
+# of the log, one append and fsync of the dataset, and the checkpoint. Under contention a
+# batch costs the same fsyncs as a single append.
+# A leader that dies mid-batch leaves its intent in ckpt.json. The next leader drops a
+# partial CSV append (by truncating the file back) or, when the store/JSON write is atomic
+# and went through, marks the batch applied, then carries on from the checkpoint. A fully
+# applied log is reset once it grows past WAL_ROTATE_BYTES.
+# If writing a batch to the dataset fails, the leader undoes it as recovery would and rolls
+# the batch out of the log: ckpt.json marks its byte range as failed and moves past it. The
+# leader re-raises and every other appender in the batch gets an OSError, so nothing of the
+# batch is in the dataset and callers may retry without duplicating rows. A store write
+# that landed before a later step (compaction) raised counts as applied.
+# Bulk writers (merge) hold the commit lock through exclusive(): appends keep logging and
+# are applied by the next leader once the bulk write is done.
+WAL_ROTATE_BYTES = 1 << 20
+FAILED_KEEP = 64
+LATENCY_SAMPLES = 10_000
+
+
+class _Lock:
+    """Exclusive advisory lock on a file; blocks across threads and processes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.f = None
+
+    def __enter__(self):
+        self.f = open(self.path, "a+b")
+        if fcntl is not None:
+            fcntl.flock(self.f.fileno(), fcntl.LOCK_EX)
+        else:
+            self.f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self.f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after about 10 s; keep waiting
+                    pass
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self.f.fileno(), fcntl.LOCK_UN)
+        else:
+            self.f.seek(0)
+            msvcrt.locking(self.f.fileno(), msvcrt.LK_UNLCK, 1)
+        self.f.close()
+        return False
+
+
+class _Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.appends = self.rows = self.commits = self.committed = 0
+        self.fsync_s = 0.0
+        self.first = self.last = None
+        self.latency = deque(maxlen=LATENCY_SAMPLES)
+
+    def add(self, rows: int, start: float, end: float, led: int):
+        with self.lock:
+            self.appends += 1
+            self.rows += rows
+            if led:
+                self.commits += 1
+                self.committed += led
+            self.first = start if self.first is None else min(self.first, start)
+            self.last = end if self.last is None else max(self.last, end)
+            self.latency.append(end - start)
+
+
+_METRICS = _Metrics()
+
+
+def metrics() -> dict:
+    """This process's appends: counts, batches it led, latency percentiles (ms) and throughput."""
+    m = _METRICS
+    with m.lock:
+        lat = sorted(m.latency)
+        span_s = (m.last - m.first) if m.appends else 0.0
+        out = {"appends": m.appends, "rows": m.rows, "commits": m.commits,
+               "records_per_commit": m.committed / m.commits if m.commits else None,
+               "fsync_ms_per_commit": 1000 * m.fsync_s / m.commits if m.commits else None,
+               "rows_per_s": m.rows / span_s if span_s > 0 else None}
+    for q in (50, 90, 99):
+        out[f"latency_p{q}_ms"] = 1000 * lat[min(len(lat) - 1, len(lat) * q // 100)] if lat else None
+    out["latency_max_ms"] = 1000 * lat[-1] if lat else None
+    return out
+
+
+def reset_metrics() -> None:
+    _METRICS.reset()
+
+
+def _fsync_file(path: str) -> None:
+    t0 = time.perf_counter()
+    with open(path, "rb") as f:
+        os.fsync(f.fileno())
+    _METRICS.fsync_s += time.perf_counter() - t0
+
+
+def _csv_header(path: str) -> Optional[List[str]]:
+    try:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            return next(csv.reader(f), None)
+    except FileNotFoundError:
+        return None
+
+
+def _end_line(path: str) -> None:
+    # The last row may lack a line break
+    with open(path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell():
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) not in (b"\n", b"\r"):
+                f.write(os.linesep.encode())
+
+
+def _append_csv(path: str, rows, fsync: bool = False) -> bool:
+    """Append (session_id, value) rows in the file's column order; False if the file needs the pandas path."""
+    header = _csv_header(path)
+    if header is not None and ("session_id" not in header or "multiplier" not in header):
+        return False
+    if header is not None:
+        _end_line(path)
+    with open(path, "a" if header is not None else "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f, lineterminator=os.linesep)
+        if header is None:
+            header = ["session_id", "multiplier"]
+            w.writerow(header)
+        cols = [{"session_id": 0, "multiplier": 1}.get(c) for c in header]
+        w.writerows([("" if c is None else r[c]) for c in cols] for r in rows)
+        if fsync:
+            f.flush()
+            t0 = time.perf_counter()
+            os.fsync(f.fileno())
+            _METRICS.fsync_s += time.perf_counter() - t0
+    return True
+
+
+def _replace_atomic(path: str, write, fsync: bool) -> None:
+    tmp = path + ".tmp"
+    write(tmp)
+    if fsync:
+        _fsync_file(tmp)
+    os.replace(tmp, path)
+
+
+def _atomic_write(path: str) -> bool:
+    # Whether a batch reaches the dataset by an atomic replace rather than an in-place append
+    if is_store(path) or path.lower().endswith(".json"):
+        return True
+    header = _csv_header(path)
+    return header is not None and ("session_id" not in header or "multiplier" not in header)
+
+
+def _apply(path: str, records: List[dict], fsync: bool) -> None:
+    rows = [(r["session_id"], v) for r in records for v in r["values"]]
+    if is_store(path):
+        from .store import append_store_frame
+        # Store segments and manifest are always fsynced
+        append_store_frame(path, [v for _, v in rows], [s for s, _ in rows])
+    elif path.lower().endswith(".csv"):
+        if not _append_csv(path, rows, fsync):
+            import pandas as pd
+            df = pd.concat([pd.read_csv(path), pd.DataFrame(rows, columns=["session_id", "multiplier"])],
+                           ignore_index=True)
+            _replace_atomic(path, lambda p: df.to_csv(p, index=False), fsync)
+    else:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            # A {"records": [...]} document is normalized to a top-level list
+            data = data if isinstance(data, list) else (data.get("records") or [])
+        except FileNotFoundError:
+            data = []
+        data.extend({"session_id": s, "multiplier": v} for s, v in rows)
+
+        def write(p):
+            with open(p, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+        _replace_atomic(path, write, fsync)
+
+
+def _paths(path: str) -> dict:
+    d = wal_dir(path)
+    return {k: os.path.join(d, k) for k in ("log", "ckpt.json", "log.lock", "commit.lock")}
+
+
+def _read_ckpt(p: dict) -> dict:
+    try:
+        with open(p["ckpt.json"], "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {"gen": 0, "applied": 0, "pending": None}
+
+
+def _write_ckpt(p: dict, ck: dict, fsync: bool) -> None:
+    def write(tmp):
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(ck, f)
+    _replace_atomic(p["ckpt.json"], write, fsync)
+
+
+def _header(gen: int) -> bytes:
+    return (json.dumps({"wal": 1, "gen": gen}) + "\n").encode()
+
+
+def _add_record(p: dict, rec: dict):
+    """Append one record to the log; returns (log generation, end offset of the record)."""
+    line = (json.dumps(rec) + "\n").encode()
+    with _Lock(p["log.lock"]), open(p["log"], "a+b") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            gen = _read_ckpt(p)["gen"] + 1
+            f.write(_header(gen))
+        else:
+            f.seek(0)
+            gen = json.loads(f.readline())["gen"]
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                # A torn record from a crashed appender becomes its own (skipped) line
+                f.write(b"\n")
+        f.write(line)
+        f.flush()
+        return gen, f.tell()
+
+
+def _recover(path: str, p: dict, ck: dict, fsync: bool) -> dict:
+    pend = ck["pending"]
+    if pend["atomic"]:
+        done = stats_fingerprint(path) != pend["fingerprint"]
+    else:
+        # A CSV append may have been cut short: drop what it wrote and apply the batch again
+        if pend["size"] is None:
+            if os.path.exists(path):
+                os.remove(path)
+        elif os.path.exists(path) and os.path.getsize(path) > pend["size"]:
+            os.truncate(path, pend["size"])
+        done = False
+    ck = {"gen": ck["gen"], "applied": pend["end"] if done else ck["applied"], "pending": None,
+          "failed": ck.get("failed", [])}
+    _write_ckpt(p, ck, fsync)
+    return ck
+
+
+def _roll_back(path: str, p: dict, ck: dict, fsync: bool) -> bool:
+    """Undo a batch whose write raised; True if it landed after all, else it is rolled out of the log."""
+    pend = ck["pending"]
+    ck = _recover(path, p, ck, fsync)
+    if ck["applied"] == pend["end"]:
+        return True
+    failed = (ck["failed"] + [[ck["gen"], ck["applied"], pend["end"]]])[-FAILED_KEEP:]
+    _write_ckpt(p, {"gen": ck["gen"], "applied": pend["end"], "pending": None, "failed": failed}, fsync)
+    return False
+
+
+def _failed(ck: dict, gen: int, end: int) -> bool:
+    return any(g == gen and lo < end <= hi for g, lo, hi in ck.get("failed", []))
+
+
+def _commit(path: str, p: dict, ck: dict, fsync: bool) -> int:
+    """Apply every complete record in the log past the checkpoint; returns the number applied."""
+    with _Lock(p["log.lock"]):
+        try:
+            with open(p["log"], "rb") as f:
+                head = f.readline()
+                gen = json.loads(head)["gen"]
+                start = ck["applied"] if ck["gen"] == gen else len(head)
+                f.seek(start)
+                data = f.read()
+        except (FileNotFoundError, ValueError):
+            return 0
+    data = data[:data.rfind(b"\n") + 1]
+    end = start + len(data)
+    records = []
+    for line in data.splitlines():
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    if records:
+        if fsync:
+            _fsync_file(p["log"])
+        fp = stats_fingerprint(path)
+        size = os.path.getsize(path) if fp is not None and not is_store(path) else None
+        ck = {"gen": gen, "applied": start, "failed": ck.get("failed", []),
+              "pending": {"end": end, "size": size, "fingerprint": fp, "atomic": _atomic_write(path)}}
+        _write_ckpt(p, ck, fsync)
+        try:
+            _apply(path, records, fsync)
+        except BaseException:
+            if not _roll_back(path, p, ck, fsync):
+                raise
+        if fp is not None and os.path.exists(stats_path(path)):
+            from .incremental import note_appends
+            note_appends(path, [(r["values"], r["session_id"]) for r in records], fp)
+    _write_ckpt(p, {"gen": gen, "applied": end, "pending": None, "failed": ck.get("failed", [])}, fsync)
+    if end > WAL_ROTATE_BYTES:
+        with _Lock(p["log.lock"]), open(p["log"], "r+b") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == end:
+                # Everything is applied: start the next generation. The checkpoint still names
+                # the old one, so the new log counts as unapplied from its header on.
+                f.seek(0)
+                f.truncate()
+                f.write(_header(gen + 1))
+                f.flush()
+                if fsync:
+                    os.fsync(f.fileno())
+    return len(records)
+
+
+def append(path: str, values, session_id="manual", fsync: bool = True) -> int:
+    """Durably append values under one session id; safe against concurrent appenders.
+
+    Returns once the values are in the dataset (fsynced unless fsync=False), possibly
+    written by another appender's batch.
+    If the batch holding them can't be written, raises and writes none of them, so the
+    append can be retried.
+    """
+    if not (is_store(path) or path.lower().endswith((".csv", ".json"))):
+        raise ValueError('Unsupported output format; use CSV, JSON or a .plane store')
+    vals = [float(v) for v in values]
+    if not vals:
+        return 0
+    start = time.perf_counter()
+    p = _paths(path)
+    os.makedirs(wal_dir(path), exist_ok=True)
+    with span("wal", rows=len(vals)):
+        gen, end = _add_record(p, {"session_id": str(session_id), "values": vals})
+    led = 0
+    with span("commit"):
+        with _Lock(p["commit.lock"]):
+            ck = _read_ckpt(p)
+            if ck.get("pending"):
+                ck = _recover(path, p, ck, fsync)
+            if ck["gen"] < gen or (ck["gen"] == gen and ck["applied"] < end):
+                led = _commit(path, p, ck, fsync)
+            elif _failed(ck, gen, end):
+                raise OSError(f"Appending to {path} failed in a batch written by another appender; "
+                              "none of its values were written")
+    _METRICS.add(len(vals), start, time.perf_counter(), led)
+    return len(vals)
+
+
+@contextmanager
+def exclusive(path: str, fsync: bool = True):
+    """Hold off appenders' commits to `path` for a bulk write, with every logged append applied first."""
+    p = _paths(path)
+    os.makedirs(wal_dir(path), exist_ok=True)
+    with _Lock(p["commit.lock"]):
+        ck = _read_ckpt(p)
+        if ck.get("pending"):
+            ck = _recover(path, p, ck, fsync)
+        _commit(path, p, ck, fsync)
+        yield